@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 # Ottieni il percorso assoluto della directory contenente lo script principale
 A_ScriptDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # salgo di un livello rispetto alla cartella dove è contenuto il file constant.py
@@ -30,6 +31,17 @@ required_columns = [
     "idItem", 
     "functionalLocation"
 ]
+# Tipi di dato impostati in lettura (le colonne non elencate mantengono il tipo rilevato;
+# idItem contiene sia numeri che stringhe e viene normalizzato successivamente)
+required_columns_dtypes = {
+    "country": "category",
+    "tecnology": "category",
+    "action": "category",
+}
+# Soglia fra numeri avviso (AdM, idItem < soglia) e numeri ordine (OdM, idItem > soglia)
+OdM_THRESHOLD = 2000000000
+# Motore di lettura del file Excel: "auto" utilizza calamine se installato, altrimenti openpyxl
+EXCEL_READER_ENGINE = "auto"
 
 default_config = {
     "save_directory": os.path.expanduser("~"),
@@ -41,9 +53,268 @@ default_config = {
     "operations": {
         "estrai_AdM": True, 
         "estrai_OdM": True, 
+        "estrai_AFKO": True,
         "elabora_xls": True   
     }   
 }
 
 # timeout operazioni in SAP
 timeoutSeconds = 30
+
+# ----------------------------------------------------
+# Estrazione IW29 in modalità batch
+# ----------------------------------------------------
+# Se True, tutti i prefissi configurati vengono inseriti nella selezione multipla STRNO
+# ed ogni tipo di estrazione (Creazione, Modifica) viene eseguito con un'unica chiamata SAP
+IW29_BATCH_MODE = True
+# Numero massimo di righe accettate per un'estrazione batch:
+# oltre questo limite si ripete l'estrazione con il ciclo per singolo prefisso
+IW29_BATCH_ROW_CAP = 50000
+
+# ----------------------------------------------------
+# Eliminazione dei duplicati IW29
+# ----------------------------------------------------
+# Un avviso presente in più estrazioni viene mantenuto una sola volta: vale la riga del tipo di estrazione
+# che compare per primo in questo elenco
+IW29_TIPO_PRECEDENCE = ["Creazione", "Modifica", "Lista", "ListaSingoli"]
+# Colonna aggiunta con tutti i tipi di estrazione in cui l'avviso è presente (es. "Creazione+Lista")
+IW29_SOURCES_COLUMN = "FontiEstrazione"
+
+# ----------------------------------------------------
+# Selezione multipla degli avvisi (estrazione Lista)
+# ----------------------------------------------------
+# Numero massimo di avvisi inseriti nella selezione multipla QMNUM per ogni esecuzione della lista:
+# le liste più lunghe vengono suddivise in blocchi di dimensione simile, estratti separatamente
+# (in parallelo se è disponibile il pool di sessioni). 0 = nessuna suddivisione
+IW29_LIST_CHUNK_SIZE = 1000
+# Gli avvisi vengono ordinati e le sequenze dense inviate come intervalli (scheda "Intervalli" della selezione):
+# un intervallo contiene almeno SAP_RANGE_MIN_IDS avvisi richiesti e fra due avvisi consecutivi mancano
+# al massimo SAP_RANGE_MAX_GAP numeri. Gli avvisi estratti ma non richiesti vengono eliminati dal risultato.
+SAP_RANGE_COMPRESSION = True
+SAP_RANGE_MIN_IDS = 3
+SAP_RANGE_MAX_GAP = 10
+# Schede della selezione multipla (valori singoli, intervalli)
+SAP_SELECTION_TAB_SINGLE = "wnd[1]/usr/tabsTAB_STRIP/tabpSIVA"
+SAP_SELECTION_TAB_INTERVALS = "wnd[1]/usr/tabsTAB_STRIP/tabpINTL"
+
+# ----------------------------------------------------
+# Schermata di dettaglio dell'avviso (IW29 con un solo risultato)
+# ----------------------------------------------------
+# Quando la selezione restituisce un solo avviso SAP mostra il dettaglio invece della lista:
+# ogni colonna del layout (SAP_LAYOUT_COLUMNS) viene letta dal campo indicato (colonna: id del campo).
+# Se un campo non è presente nella schermata l'avviso viene estratto di nuovo con la lista,
+# in modo da non memorizzare righe con colonne mancanti.
+IW29_DETAIL_FIELDS = {
+    "Avviso": "wnd[0]/usr/subSCREEN_1:SAPLIQS0:1050/txtVIQMEL-QMNUM",
+    "Mod. il": "wnd[0]/usr/tabsTAB_GROUP_10/tabp10\\TAB01/ssubSUB_GROUP_10:SAPLIQS0:7235/subCUSTOM_SCREEN:SAPLIQS0:7212/subSUBSCREEN_4:SAPLIQS0:7710/txtVIQMEL-AEDAT",
+    "Data": "wnd[0]/usr/tabsTAB_GROUP_10/tabp10\\TAB01/ssubSUB_GROUP_10:SAPLIQS0:7235/subCUSTOM_SCREEN:SAPLIQS0:7212/subSUBSCREEN_4:SAPLIQS0:7710/txtVIQMEL-ERDAT",
+    "Descrizione": "wnd[0]/usr/subSCREEN_1:SAPLIQS0:1050/txtVIQMEL-QMTXT",
+    "Tp.": "wnd[0]/usr/subSCREEN_1:SAPLIQS0:1050/ctxtVIQMEL-QMART",
+    "Sede tecnica": "wnd[0]/usr/tabsTAB_GROUP_10/tabp10\\TAB01/ssubSUB_GROUP_10:SAPLIQS0:7235/subCUSTOM_SCREEN:SAPLIQS0:7212/subSUBSCREEN_1:SAPLIQS0:7322/subOBJEKT:SAPLIWO1:0100/ctxtRIWO1-TPLNR",
+    "St.sist.": "wnd[0]/usr/subSCREEN_1:SAPLIQS0:1050/txtRIWO00-STTXT",
+    "Ordine": "wnd[0]/usr/subSCREEN_1:SAPLIQS0:1050/ctxtVIQMEL-AUFNR",
+    "Pse": "wnd[0]/usr/tabsTAB_GROUP_10/tabp10\\TAB01/ssubSUB_GROUP_10:SAPLIQS0:7235/subCUSTOM_SCREEN:SAPLIQS0:7212/subSUBSCREEN_1:SAPLIQS0:7322/subOBJEKT:SAPLIWO1:0100/ctxtRIWO1-LAND1",
+    "Sis.Legacy": "wnd[0]/usr/tabsTAB_GROUP_10/tabp10\\TAB19/ssubSUB_GROUP_10:SAPLIQS0:7235/subCUSTOM_SCREEN:SAPLIQS0:7212/subSUBSCREEN_1:SAPLXQQM:0101/txtVIQMEL-ZZSISLEG",
+}
+
+# ----------------------------------------------------
+# Estrazioni in parallelo su più sessioni SAP GUI
+# ----------------------------------------------------
+# Numero di sessioni SAP utilizzate per le estrazioni indipendenti (1 = esecuzione sequenziale)
+SAP_PARALLEL_SESSIONS = 3
+
+# ----------------------------------------------------
+# Esportazione delle liste SAP
+# ----------------------------------------------------
+# "file": la lista viene salvata in un file locale non convertito e letta dal disco
+# "clipboard": la lista viene copiata nella clipboard (modalità precedente)
+SAP_EXPORT_MODE = "file"
+# Directory temporanea per i file esportati da SAP
+SAP_EXPORT_DIR = os.path.join(tempfile.gettempdir(), "KPI_OFA")
+# Codifica del file esportato (codice SAP 4110 = UTF-8) e codifica utilizzata in lettura
+SAP_EXPORT_ENCODING_CODE = "4110"
+SAP_EXPORT_ENCODING = "utf-8-sig"
+
+# ----------------------------------------------------
+# Attesa adattiva delle risposte SAP (secondi)
+# ----------------------------------------------------
+# Intervallo iniziale fra due controlli di session.Busy, raddoppiato ad ogni controllo fino al valore massimo
+SAP_WAIT_INITIAL_DELAY = 0.02
+SAP_WAIT_MAX_DELAY = 0.25
+# Attesa massima del cambio di finestra/status bar dopo che SAP è tornato disponibile
+SAP_WAIT_CHANGE_TIMEOUT = 2.0
+
+# ----------------------------------------------------
+# Schema dei layout SAP
+# ----------------------------------------------------
+# Layout utilizzati nelle estrazioni
+IW29_LAYOUT = "/KPIOFANO2"
+IW39_LAYOUT = "/KPIOFA2"
+AFKO_LAYOUT = "/OFAKPIWO"
+# Colonne di ogni layout nell'ordine della lista: anche le righe lette dalla schermata di dettaglio
+# (un solo risultato) devono avere tutte queste colonne
+SAP_LAYOUT_COLUMNS = {
+    "/KPIOFANO2": ["Avviso", "Mod. il", "Data", "Descrizione", "Tp.", "Sede tecnica", "St.sist.", "Ordine", "Pse",
+                   "Sis.Legacy"],
+    "/KPIOFA2": ["Ordine", "Avviso", "Data", "Mod. il", "Inizio card.", "Descrizione", "Tp.", "Sede tecnica", "St.sist.",
+                 "Pse", "Sis.Legacy"],
+}
+# Formato delle date nelle liste SAP
+SAP_DATE_FORMAT = "%d.%m.%Y"
+# Tipo di dato di ogni colonna per layout:
+# "int64" = numero sempre presente, "Int64" = numero che può mancare,
+# "date" = data nel formato SAP_DATE_FORMAT, "category" = valori ripetuti.
+# Le colonne non elencate restano stringhe.
+SAP_LAYOUT_SCHEMAS = {
+    "/KPIOFANO2": {
+        "Avviso": "int64",
+        "Mod. il": "date",
+        "Data": "date",
+        "Tp.": "category",
+        "St.sist.": "category",
+        "Ordine": "Int64",
+        "Pse": "category",
+        "Sis.Legacy": "category",
+    },
+    "/KPIOFA2": {
+        "Ordine": "int64",
+        "Avviso": "Int64",
+        "Data": "date",
+        "Mod. il": "date",
+        "Inizio card.": "date",
+        "Tp.": "category",
+        "St.sist.": "category",
+        "Pse": "category",
+        "Sis.Legacy": "category",
+    },
+    "/OFAKPIWO": {
+        "Ordine": "int64",
+        "Inizio card.": "date",
+    },
+}
+
+# ----------------------------------------------------
+# Transazioni delle liste SAP (IW29 avvisi, IW39 ordini)
+# ----------------------------------------------------
+# Precedenza dei tipi di estrazione IW39 nell'eliminazione dei duplicati (chiave Ordine)
+IW39_TIPO_PRECEDENCE = ["Creazione", "Modifica", "InizioCardine", "Lista", "ListaSingoli"]
+# Campi della schermata di dettaglio dell'ordine (IW39 con un solo risultato), uno per ogni colonna del layout
+# (vedi IW29_DETAIL_FIELDS)
+IW39_DETAIL_FIELDS = {
+    "Ordine": "wnd[0]/usr/subSUB_ALL:SAPLCOIH:3001/ssubSUB_LEVEL:SAPLCOIH:1100/subSUB_KOPF:SAPLCOIH:1102/txtCAUFVD-AUFNR",
+    "Avviso": "wnd[0]/usr/subSUB_ALL:SAPLCOIH:3001/ssubSUB_LEVEL:SAPLCOIH:1100/tabsTS_1100/tabpIHKZ/ssubSUB_AUFTRAG:SAPLCOIH:1120/subOBJECT:SAPLCOIH:7010/ctxtCAUFVD-QMNUM",
+    "Data": "wnd[0]/usr/subSUB_ALL:SAPLCOIH:3001/ssubSUB_LEVEL:SAPLCOIH:1100/tabsTS_1100/tabpVERA/ssubSUB_AUFTRAG:SAPLCOIH:1125/txtCAUFVD-ERDAT",
+    "Mod. il": "wnd[0]/usr/subSUB_ALL:SAPLCOIH:3001/ssubSUB_LEVEL:SAPLCOIH:1100/tabsTS_1100/tabpVERA/ssubSUB_AUFTRAG:SAPLCOIH:1125/txtCAUFVD-AEDAT",
+    "Inizio card.": "wnd[0]/usr/subSUB_ALL:SAPLCOIH:3001/ssubSUB_LEVEL:SAPLCOIH:1100/tabsTS_1100/tabpIHKZ/ssubSUB_AUFTRAG:SAPLCOIH:1120/subTERM_AUFK:SAPLCOIH:7100/ctxtCAUFVD-GSTRP",
+    "Descrizione": "wnd[0]/usr/subSUB_ALL:SAPLCOIH:3001/ssubSUB_LEVEL:SAPLCOIH:1100/subSUB_KOPF:SAPLCOIH:1102/txtCAUFVD-KTEXT",
+    "Tp.": "wnd[0]/usr/subSUB_ALL:SAPLCOIH:3001/ssubSUB_LEVEL:SAPLCOIH:1100/subSUB_KOPF:SAPLCOIH:1102/ctxtCAUFVD-AUART",
+    "Sede tecnica": "wnd[0]/usr/subSUB_ALL:SAPLCOIH:3001/ssubSUB_LEVEL:SAPLCOIH:1100/tabsTS_1100/tabpIHKZ/ssubSUB_AUFTRAG:SAPLCOIH:1120/subOBJECT:SAPLCOIH:7010/ctxtCAUFVD-TPLNR",
+    "St.sist.": "wnd[0]/usr/subSUB_ALL:SAPLCOIH:3001/ssubSUB_LEVEL:SAPLCOIH:1100/subSUB_KOPF:SAPLCOIH:1102/txtCAUFVD-STTXT",
+    "Pse": "wnd[0]/usr/subSUB_ALL:SAPLCOIH:3001/ssubSUB_LEVEL:SAPLCOIH:1100/tabsTS_1100/tabpIHKZ/ssubSUB_AUFTRAG:SAPLCOIH:1120/subOBJECT:SAPLCOIH:7010/ctxtCAUFVD-LAND1",
+    "Sis.Legacy": "wnd[0]/usr/subSUB_ALL:SAPLCOIH:3001/ssubSUB_LEVEL:SAPLCOIH:1100/tabsTS_1100/tabpZZ01/ssubSUB_AUFTRAG:SAPLXCO1:0101/txtAUFK-ZZSISLEG",
+}
+# Descrizione delle transazioni eseguite dal motore di estrazione delle liste (SAPDataExtractor.extract_list):
+#   tcode: codice transazione               layout: layout della lista (vedi SAP_LAYOUT_SCHEMAS)
+#   key: colonna identificativo             id_field: campo della selezione multipla degli identificativi
+#   status_checkboxes: stati da includere   fixed_selections: valori singoli sempre inseriti (campo: valori)
+#   date_fields: campo data di ogni tipo di estrazione (selezione per sede tecnica e intervallo di date)
+#   date_columns: colonna della lista con la data di ogni tipo di estrazione (suddivisione locale per periodo)
+#   list_title: titolo della finestra con la lista
+#   single_title: inizio del titolo della schermata di dettaglio (un solo risultato)
+#   detail_fields: campi letti dalla schermata di dettaglio
+#   precedence: priorità dei tipi di estrazione nell'eliminazione dei duplicati
+#   store: True se l'estrazione "Modifica" utilizza l'archivio locale (solo avvisi)
+SAP_LIST_TRANSACTIONS = {
+    "IW29": {
+        "tcode": "IW29",
+        "layout": IW29_LAYOUT,
+        "key": "Avviso",
+        "id_field": "QMNUM",
+        "status_checkboxes": ["DY_OFN", "DY_IAR", "DY_RST", "DY_MAB"],
+        "fixed_selections": {"QMART": ["Z1", "Z2", "Z3", "Z4", "Z5"]},
+        "date_fields": {"Creazione": "ERDAT", "Modifica": "AEDAT"},
+        "date_columns": {"Creazione": "Data", "Modifica": "Mod. il"},
+        "list_title": "Visualizzare avvisi: lista avvisi",
+        "single_title": "Visualizzare avviso PM: Segnalazione guasto",
+        "detail_fields": IW29_DETAIL_FIELDS,
+        "precedence": IW29_TIPO_PRECEDENCE,
+        "store": True,
+    },
+    "IW39": {
+        "tcode": "IW39",
+        "layout": IW39_LAYOUT,
+        "key": "Ordine",
+        "id_field": "AUFNR",
+        "status_checkboxes": ["DY_OFN", "DY_IAR", "DY_MAB", "DY_HIS"],
+        "fixed_selections": {},
+        "date_fields": {"Creazione": "ERDAT", "Modifica": "AEDAT", "InizioCardine": "GSTRP"},
+        "date_columns": {"Creazione": "Data", "Modifica": "Mod. il", "InizioCardine": "Inizio card."},
+        "list_title": "Visualizzare ordini PM: lista ordini",
+        "single_title": "Visualizzare ordine PM",
+        "detail_fields": IW39_DETAIL_FIELDS,
+        "precedence": IW39_TIPO_PRECEDENCE,
+        "store": False,
+    },
+}
+
+# ----------------------------------------------------
+# Data inizio cardine degli ordini (SE16, tabella AFKO)
+# ----------------------------------------------------
+# Gli ordini vengono inseriti nella selezione multipla del campo AUFNR (I1) della tabella AFKO,
+# al massimo AFKO_CHUNK_SIZE ordini per ogni esecuzione. La lista SE16 deve essere visualizzata
+# come lista ALV (impostazioni utente SE16) per l'esportazione con Elenco > Salva > File locale.
+AFKO_TABLE = "AFKO"
+AFKO_ORDER_FIELD = "I1"
+AFKO_CHUNK_SIZE = 5000
+# Numero massimo di righe restituite da SE16 (campo MAX_SEL)
+AFKO_MAX_SEL = "9999999"
+# Colonne del layout AFKO_LAYOUT
+AFKO_ORDER_COLUMN = "Ordine"
+AFKO_START_COLUMN = "Inizio card."
+# Testi della schermata SE16 (il titolo della lista viene confrontato con gli spazi normalizzati)
+AFKO_LIST_TITLE = "Data Browser: tabella AFKO Voci selezionate"
+AFKO_SBAR_NO_DATA = "Non sono state trovate voci di tabella per la chiave indicata"
+# Griglia del popup "Selezionare layout" della lista
+SAP_LAYOUT_GRID = "wnd[1]/usr/ssubD0500_SUBSCREEN:SAPLSLVC_DIALOG:0501/cntlG51_CONTAINER/shellcont/shell"
+
+# ----------------------------------------------------
+# Calcolo dei KPI OFA (modulo kpi)
+# ----------------------------------------------------
+# Valore della colonna Sis.Legacy degli avvisi e degli ordini gestiti con OFA
+KPI_OFA_LEGACY_VALUE = "OFA"
+# Numero di cifre dei numeri avviso considerati nella trace OFA
+KPI_NOTIFICATION_DIGITS = 10
+# Gruppo assegnato ai prefissi non configurati e alle righe senza sede tecnica
+KPI_UNKNOWN_GROUP = "n.d."
+# Riga dei totali nella tabella per tecnologia
+KPI_TOTAL_LABEL = "Totale"
+# Nome del file Excel con le tabelle dei KPI
+KPI_FILE_NAME = "KPI_OFA.xlsx"
+
+# ----------------------------------------------------
+# Cache dei file Excel OFA già elaborati
+# ----------------------------------------------------
+# Sottocartella della cache all'interno di save_directory
+OFA_CACHE_DIRNAME = ".kpi_ofa_cache"
+# Dimensione massima della cache (byte)
+OFA_CACHE_MAX_BYTES = 200 * 1024 * 1024
+# Versione del formato dei DataFrame salvati: da incrementare quando cambia la normalizzazione
+OFA_CACHE_SCHEMA_VERSION = 1
+
+# ----------------------------------------------------
+# Finestra di log
+# ----------------------------------------------------
+# Numero massimo di messaggi mantenuti nella finestra di log
+LOG_MAX_ENTRIES = 100000
+# Intervallo di aggiornamento della finestra di log e della statusBar (millisecondi)
+LOG_FLUSH_INTERVAL_MS = 100
+# Righe disposte dalla vista del log per ogni passo (QListView.Batched)
+LOG_VIEW_BATCH_SIZE = 1000
+
+# ----------------------------------------------------
+# Archivio locale degli avvisi IW29
+# ----------------------------------------------------
+# Se True l'estrazione "Modifica" interroga SAP solo per gli intervalli non ancora sincronizzati
+NOTIFICATION_STORE_ENABLED = True
+# Database SQLite dell'archivio
+NOTIFICATION_STORE_PATH = os.path.join(os.path.expanduser("~"), ".kpi_ofa", "notifications.sqlite")
@@ -0,0 +1,26 @@
+import json
+import os
+
+import Config.constants as constants
+
+
+def load_config(config_file: str = constants.configuration_json) -> tuple[dict, str, str]:
+    """
+    Carica la configurazione dal file JSON o utilizza i valori predefiniti.
+    Non dipende dall'interfaccia grafica: è utilizzata sia dalla finestra principale che dalla riga di comando.
+
+    Args:
+        config_file: Percorso del file di configurazione
+
+    Returns:
+        tuple: (configurazione, livello del messaggio, messaggio da registrare nel log)
+    """
+    if not os.path.exists(config_file):
+        return constants.default_config, "warning", "File di configurazione non trovato, utilizzo valori predefiniti"
+    try:
+        with open(config_file, 'r') as f:
+            config = json.load(f)
+        return config, "success", "Configurazione caricata con successo"
+    except Exception as e:
+        # Se c'è un errore nel caricamento, restituisco la configurazione predefinita
+        return constants.default_config, "warning", f"Errore nel caricamento della configurazione: {str(e)}"
@@ -1,8 +1,14 @@
+import numpy as np
 import pandas as pd
 from collections import Counter
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterable, Iterator
 import os
+import re
+import time
+import importlib.util
 import logging
+from datetime import datetime
+import Config.constants as constants
 from PyQt5.QtCore import QObject, pyqtSignal
 
 # Logger specifico per questo modulo
@@ -53,7 +59,8 @@ class DataFrameTools:
         
         # Emetti il segnale con l'informazione sull'origine
         # Passa origin come parametro aggiuntivo al segnale
-        self.logMessage.emit(message, level, update_status, update_log, min_display_seconds, origin, args, kwargs)
+        # Il messaggio è già formattato: il ricevente non deve formattarlo di nuovo
+        self.logMessage.emit(formatted_message, level, update_status, update_log, min_display_seconds, origin, (), {})
 
     def load_dataframes_from_csv(df_names, base_path="", encoding="utf-8", separator=";"):
         """
@@ -275,119 +282,325 @@ class DataFrameTools:
             print(f"Errore durante la verifica di {name}: {str(e)}")
             return False
 
-    def clean_data(data: pd.DataFrame) -> pd.DataFrame:
+    @staticmethod
+    def iter_lines(text: str) -> Iterator[str]:
         """
-        Verifica e pulisce i dati prima di caricarli in un DataFrame.
+        Restituisce le righe di un testo una alla volta senza creare la lista completa delle righe
         
+        Args:
+            text: Testo da suddividere in righe
+            
+        Yields:
+            str: Righe del testo (senza il carattere di fine riga)
+        """
+        start = 0
+        length = len(text)
+        while start < length:
+            end = text.find('\n', start)
+            if end == -1:
+                end = length
+            yield text[start:end]
+            start = end + 1
+
+    @staticmethod
+    def parse_sap_list(lines: Iterable[str], description_column: str = "Descrizione") -> pd.DataFrame | None:
+        """
+        Converte in DataFrame una lista SAP delimitata da '|' con un'unica passata sulle righe.
+        Unica implementazione della ricomposizione delle righe spezzate delle liste SAP:
+        - scarta le righe vuote e quelle composte solo da trattini;
+        - la prima riga valida è l'intestazione (gli header duplicati/vuoti vengono rinominati);
+        - una riga che non inizia con '|' e contiene meno pipe del previsto è la continuazione
+          della riga precedente e viene unita ad essa, anche se spezzata su più righe;
+        - i pipe in eccesso appartengono alla colonna descrizione e vengono sostituiti con '-'.
+        I valori vengono scritti direttamente nei buffer delle colonne, senza copie intermedie del testo.
+        
+        Args:
+            lines: Iterabile di righe (file aperto, generatore, lista)
+            description_column: Nome della colonna che può contenere pipe spurie
+            
         Returns:
-            DataFrame Pandas pulito o None in caso di errore
+            DataFrame Pandas oppure None in caso di errore
         """
         try:
-            if not data:
-                print("DF non valido")
+            expected_fields = 0
+            expected_pipes = 0
+            description_index = None
+            keep_indexes = []
+            headers = []
+            buffers = []
+            pending = None
+            rows_count = 0
+            merged_count = 0
+            fixed_count = 0
+
+            def flush(row):
+                fields = row.split('|')
+                extra = len(fields) - expected_fields
+                if extra > 0:
+                    # Le pipe in eccesso appartengono alla descrizione
+                    if description_index is None:
+                        raise ValueError(f"La riga ha più separatori del previsto: {row}")
+                    end = description_index + extra + 1
+                    fields[description_index:end] = ['-'.join(fields[description_index:end])]
+                elif extra < 0:
+                    fields.extend([''] * -extra)
+                for buffer, index in zip(buffers, keep_indexes):
+                    buffer.append(fields[index].strip())
+                return extra > 0
+
+            for raw_line in lines:
+                line = raw_line.rstrip('\r\n')
+                stripped = line.strip()
+                # Righe vuote o composte solo da trattini
+                if not stripped or not stripped.replace(' ', '').strip('-'):
+                    continue
+
+                if expected_fields == 0:
+                    # La prima riga valida è l'intestazione
+                    original_headers = stripped.split('|')
+                    unique_headers = DataFrameTools.handle_duplicate_headers(original_headers)
+                    expected_fields = len(original_headers)
+                    expected_pipes = expected_fields - 1
+                    keep_indexes = [i for i, h in enumerate(unique_headers) if not h.startswith('Unnamed_')]
+                    headers = [unique_headers[i] for i in keep_indexes]
+                    buffers = [[] for _ in keep_indexes]
+                    if description_column in unique_headers:
+                        description_index = unique_headers.index(description_column)
+                    continue
+
+                if not line.startswith('|') and line.count('|') < expected_pipes:
+                    # Continuazione della riga precedente
+                    if pending is None:
+                        raise ValueError(f"Non è possibile unire la riga '{line}' con una riga precedente")
+                    last_pipe_index = pending.rfind('|')
+                    pending = pending[:last_pipe_index + 1] + stripped
+                    merged_count += 1
+                    continue
+
+                if pending is not None:
+                    fixed_count += flush(pending)
+                    rows_count += 1
+                pending = stripped
+
+            if pending is not None:
+                fixed_count += flush(pending)
+                rows_count += 1
+
+            if expected_fields == 0:
+                logger.warning("Nessuna riga valida trovata nella lista SAP")
                 return None
 
-            # Divide in righe
-            lines = data.strip().split('\n')
+            logger.info(f"Lista SAP convertita: {rows_count} righe, {merged_count} righe unite, {fixed_count} descrizioni corrette")
+            return pd.DataFrame(dict(zip(headers, buffers)), columns=headers)
+
+        except Exception as e:
+            logger.error(f"Errore durante la conversione della lista SAP: {str(e)}")
+            return None
+
+    @staticmethod
+    def apply_schema(df: pd.DataFrame, layout: str | Dict[str, str]) -> pd.DataFrame:
+        """
+        Converte le colonne di testo di una lista SAP nei tipi definiti per il layout
+        (vedi constants.SAP_LAYOUT_SCHEMAS). Le colonne assenti nello schema restano stringhe.
+        
+        Args:
+            df: DataFrame prodotto da parse_sap_list (tutte colonne stringa)
+            layout: Nome del layout SAP (es. '/KPIOFANO2') oppure dizionario {colonna: tipo}
             
-            # Filtra le righe, escludendo quelle che contengono solo trattini
-            filtered_lines = []
-            for line in lines:
-                # Rimuove spazi bianchi iniziali e finali
-                line = line.strip()
-                # Verifica se la riga è composta solo da trattini
-                if line and not all(c == '-' for c in line.replace(' ', '')):
-                    filtered_lines.append(line)
+        Returns:
+            DataFrame con le colonne convertite
+        """
+        schema = constants.SAP_LAYOUT_SCHEMAS.get(layout, {}) if isinstance(layout, str) else layout
+        for column, dtype in schema.items():
+            if column not in df.columns:
+                continue
+            values = df[column]
+            # nelle liste SAP il valore mancante è una stringa vuota
+            missing = values.isna() | (values == '')
+            if dtype in ("int64", "Int64"):
+                converted = pd.to_numeric(values.mask(missing), errors='coerce')
+                invalid = int((converted.isna() & ~missing).sum())
+                if invalid:
+                    logger.warning(f"Colonna '{column}': {invalid} valori non numerici sostituiti con valori mancanti")
+                # int64 solo se tutti i valori sono presenti, altrimenti intero che ammette valori mancanti
+                df[column] = converted.astype("int64" if dtype == "int64" and not converted.isna().any() else "Int64")
+            elif dtype == "date":
+                converted = pd.to_datetime(values.mask(missing), format=constants.SAP_DATE_FORMAT, errors='coerce')
+                invalid = int((converted.isna() & ~missing).sum())
+                if invalid:
+                    logger.warning(f"Colonna '{column}': {invalid} date non valide sostituite con valori mancanti")
+                df[column] = converted
+            elif dtype == "category":
+                df[column] = values.astype("category")
+        return df
 
-            if not filtered_lines:
-                print("Nessuna riga valida trovata dopo la pulizia")
-                return None
+    @staticmethod
+    def extract_base_ids(values: pd.Series) -> tuple[pd.Series, pd.Series]:
+        """
+        Estrae l'identificativo numerico di base dagli idItem della trace OFA: i valori numerici
+        sono mantenuti, dalle stringhe viene presa la parte prima del primo '-' o '/'
+        (es. '210001141411/0010' -> 210001141411)
+        
+        Args:
+            values: Serie con gli idItem (valori misti numeri/stringhe)
             
-            # La prima riga è l'intestazione
-            original_headers = filtered_lines[0]
-            list_original_headers = original_headers.strip().split('|')
-            print(f"Intestazioni originali: {list_original_headers} - lunghezza: {len(list_original_headers)}")
+        Returns:
+            tuple: (Serie Int64 con gli id di base e NA per i valori non convertibili,
+                    Serie con le parti non convertibili, indicizzata come l'originale)
+        """
+        # la trace contiene molte azioni per lo stesso idItem: la conversione viene eseguita sui valori distinti
+        codes, uniques = pd.factorize(values)
+        uniques = pd.Series(uniques, dtype=object)
+        # i valori già numerici (o stringhe composte solo da cifre) sono convertiti direttamente
+        unique_ids = pd.to_numeric(uniques, errors='coerce')
+        text_mask = unique_ids.isna()
+        base_text = (uniques[text_mask].astype(str)
+                     .str.extract(r'^([^-/]*)', expand=False)
+                     .str.strip())
+        unique_ids[text_mask] = pd.to_numeric(base_text, errors='coerce')
+        # come int(): eventuali decimali vengono troncati
+        unique_ids = np.trunc(unique_ids.to_numpy(dtype='float64'))
+        # i codici -1 corrispondono ai valori mancanti
+        base_ids = pd.Series(np.where(codes >= 0, unique_ids[codes], np.nan), index=values.index)
+        # parti non convertibili, riportate per ogni riga in cui compaiono
+        unparsable = base_text[np.isnan(unique_ids[text_mask.to_numpy()])]
+        row_mask = np.isin(codes, unparsable.index.to_numpy())
+        invalid = pd.Series(unparsable.reindex(codes[row_mask]).to_numpy(), index=values.index[row_mask])
+        return base_ids.astype('Int64'), invalid
 
-            # Gestisci gli header duplicati
-            list_unique_headers = DataFrameTools.handle_duplicate_headers(list_original_headers)
-            print(f"Intestazioni uniche: {list_unique_headers} - lunghezza: {len(list_unique_headers)}")
+    @staticmethod
+    def compress_id_ranges(values: Iterable, min_ids: int = 3, max_gap: int = 0) -> tuple[list, list]:
+        """
+        Riduce una lista di identificativi numerici a valori singoli e intervalli per le selezioni multiple SAP.
+        Gli id vengono ordinati e raggruppati in sequenze in cui fra due id consecutivi mancano al massimo
+        max_gap numeri; le sequenze con almeno min_ids id diventano un intervallo (min, max).
+        Gli id compresi in un intervallo ma non richiesti devono essere eliminati dal risultato dell'estrazione.
 
-            expected_pipes = original_headers.count('|')
-            
-            # Creo un array per memorizzare le righe corrette
-            corrected_lines = []
-            # Correggi le righe con occorrenze extra di pipe
-            for line in filtered_lines[1:]:
-                actual_pipes = line.count('|')
-                
-                if actual_pipes > expected_pipes:
-                    # Calcola quanti pipe extra ci sono
-                    extra_pipes = actual_pipes - expected_pipes
-                    
-                    # Trova l'indice del quarto pipe (che precede la colonna Descrizione)
-                    pipe_indices = [i for i, char in enumerate(line) if char == '|']
-                    if len(pipe_indices) >= 4:
-                        description_start = pipe_indices[3] + 1
-                        description_end = pipe_indices[4 + extra_pipes]
-                        
-                        # Estrai la descrizione
-                        description = line[description_start:description_end]
-                        
-                        # Sostituisci i pipe nella descrizione con trattini
-                        corrected_description = description.replace('|', '-')
-                        print(f"Descrizione corretta: {corrected_description}")
-                        
-                        # Ricostruisci la riga
-                        corrected_line = line[:description_start] + corrected_description + line[description_end:]
-                        
-                        # Verifica che la correzione abbia funzionato
-                        if corrected_line.count('|') == expected_pipes:
-                            corrected_lines.append(corrected_line)
-                        else:
-                            msg = (f"Impossibile correggere la riga: {line}")
-                            # Se la correzione non ha funzionato, segnala l'errore
-                            print(msg)
-                            # Genera un exception
-                            raise ValueError(msg)
-                    else:
-                        msg = (f"La riga non ha abbastanza separatori pipe: {line}")
-                        # Se la correzione non ha funzionato, segnala l'errore
-                        print(msg)
-                        # Genera un exception
-                        raise ValueError(msg)                                            
-                else:
-                    # La riga è già corretta o ha meno pipe del previsto
-                    corrected_lines.append(line)
-            
-            # Ora che abbiamo corretto le righe, le convertiamo in DataFrame
-            data_rows = []
-            for line in corrected_lines:
-                fields = [field.strip() for field in line.split('|')]
-                # Rimuovi i campi vuoti all'inizio e alla fine (dovuti al pipe iniziale/finale)
-                # fields = [field for field in fields if field]
-                data_rows.append(fields)
-            
-            # Estrai gli header e i dati
-            headers = list_unique_headers
-            data = data_rows
-            
-            # Crea il DataFrame
-            df = pd.DataFrame(data, columns=headers)     
-                
-            # Rimuoviamo le colonne senza intestazione
-            unnamed_cols = [col for col in df.columns if col == '' or pd.isna(col) or str(col).startswith('Unnamed_')]
-            df_cleaned = df.drop(columns=unnamed_cols)
+        Args:
+            values: Identificativi (numeri o stringhe numeriche); i valori non numerici restano valori singoli
+            min_ids: Numero minimo di id richiesti per creare un intervallo
+            max_gap: Numero massimo di id non richiesti fra due id consecutivi di un intervallo
+
+        Returns:
+            tuple: (lista dei valori singoli, lista di tuple (minimo, massimo) degli intervalli)
+        """
+        values = pd.Series(list(values), dtype=object)
+        numbers = pd.to_numeric(values, errors='coerce')
+        others = values[numbers.isna()].astype(str).tolist()
+        ids = np.unique(numbers.dropna().to_numpy(dtype='int64'))
+        if len(ids) == 0:
+            return others, []
+        # inizio di ogni sequenza: distanza dall'id precedente oltre il salto consentito
+        starts = np.flatnonzero(np.r_[True, np.diff(ids) > max_gap + 1])
+        ends = np.r_[starts[1:], len(ids)] - 1
+        is_range = (ends - starts + 1) >= max(min_ids, 2)
+        ranges = list(zip(ids[starts[is_range]].tolist(), ids[ends[is_range]].tolist()))
+        # gli id delle sequenze troppo corte restano valori singoli
+        in_range = np.repeat(is_range, ends - starts + 1)
+        return ids[~in_range].tolist() + others, ranges
+
+    @staticmethod
+    def dedupe_by_key(df: pd.DataFrame, key: str, source_column: str, precedence: List[str],
+                      sources_column: str | None = None) -> pd.DataFrame:
+        """
+        Mantiene una sola riga per ogni valore della colonna chiave: fra le righe con la stessa chiave
+        viene scelta quella la cui sorgente (es. TipoEstrazione) compare per prima in `precedence`.
+        Le righe con chiave mancante sono mantenute tutte.
+
+        Args:
+            df: DataFrame unito dalle diverse estrazioni
+            key: Colonna chiave (es. 'Avviso')
+            source_column: Colonna con la sorgente di ogni riga
+            precedence: Sorgenti in ordine di priorità; quelle non elencate hanno priorità minima
+            sources_column: Se indicata, colonna (category) aggiunta con tutte le sorgenti della chiave,
+                            nell'ordine di priorità e separate da '+' (es. 'Creazione+Lista')
+
+        Returns:
+            pd.DataFrame: Una riga per chiave, nell'ordine della chiave
+        """
+        # indice intero della chiave: nessun confronto fra stringhe e nessun hash delle altre colonne
+        codes, _ = pd.factorize(df[key], sort=True)
+        sources = list(dict.fromkeys(list(precedence) + [s for s in pd.unique(df[source_column]) if s not in precedence]))
+        rank = pd.Categorical(df[source_column], categories=sources).codes.astype(np.int64)
+        valid = codes >= 0
+        positions = np.flatnonzero(valid)
+        # ordinamento stabile per chiave e priorità: la prima riga di ogni gruppo è quella da mantenere
+        order = positions[np.lexsort((rank[valid], codes[valid]))]
+        sorted_codes = codes[order]
+        starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]]) if len(order) else order
+        keep = np.r_[order[starts], np.flatnonzero(~valid)]
+        result = df.take(keep).reset_index(drop=True)
+        if sources_column:
+            # maschera di bit delle sorgenti presenti per ogni chiave, convertita una sola volta per ogni combinazione
+            masks = np.bitwise_or.reduceat(np.left_shift(1, rank[order]), starts) if len(order) else rank[:0]
+            masks = np.r_[masks, np.left_shift(1, rank[~valid])]
+            unique_masks, mask_codes = np.unique(masks, return_inverse=True)
+            labels = ["+".join(s for bit, s in enumerate(sources) if mask >> bit & 1) for mask in unique_masks]
+            result[sources_column] = pd.Categorical.from_codes(mask_codes.reshape(-1), categories=labels)
+        return result
+
+    @staticmethod
+    def resolve_excel_engine(engine: str = "auto") -> str:
+        """
+        Restituisce il motore di lettura Excel da utilizzare
+        
+        Args:
+            engine: "auto" (calamine se installato, altrimenti openpyxl) oppure il nome del motore
             
-            # Reset dell'indice
-            df_cleaned = df_cleaned.reset_index(drop=True)
+        Returns:
+            str: Nome del motore da passare a pandas
+        """
+        if engine != "auto":
+            return engine
+        return "calamine" if importlib.util.find_spec("python_calamine") is not None else "openpyxl"
 
+    @staticmethod
+    def read_excel_sheet(file_path: str, sheet_name: str, columns: List[str],
+                         dtypes: Optional[Dict[str, str]] = None, engine: str = "auto") -> tuple[bool, pd.DataFrame | None, dict]:
+        """
+        Legge un solo sheet di un file Excel aprendo il file una volta e caricando solo le colonne richieste
+        
+        Args:
+            file_path: Percorso del file Excel
+            sheet_name: Nome dello sheet da leggere
+            columns: Colonne da caricare
+            dtypes: Tipi di dato delle colonne {colonna: tipo}
+            engine: Motore di lettura ("auto", "calamine", "openpyxl")
             
-            return df_cleaned
+        Returns:
+            tuple: (successo, DataFrame, info)
+                - info (dict): 'engine', 'sheet_names', 'columns' (tutte le intestazioni dello sheet),
+                  'missing_columns' e 'timings' con la durata in secondi di ogni fase
+        """
+        info = {"engine": DataFrameTools.resolve_excel_engine(engine), "sheet_names": [],
+                "columns": [], "missing_columns": [], "timings": {}}
+        start_time = time.perf_counter()
+        with pd.ExcelFile(file_path, engine=info["engine"]) as excel_file:
+            info["sheet_names"] = excel_file.sheet_names
+            info["timings"]["apertura"] = time.perf_counter() - start_time
+            if sheet_name not in excel_file.sheet_names:
+                return False, None, info
+
+            # usecols viene chiamato per ogni intestazione: registro anche quelle scartate
+            def select_column(column):
+                info["columns"].append(column)
+                return column in columns
+
+            # le colonne category sono lette come testo: con valori misti (es. numeri e stringhe)
+            # l'ordinamento delle categorie in lettura non è possibile
+            dtypes = {col: dtype for col, dtype in (dtypes or {}).items() if col in columns}
+            category_columns = [col for col, dtype in dtypes.items() if dtype == "category"]
+            start_time = time.perf_counter()
+            df = excel_file.parse(sheet_name, usecols=select_column,
+                                  dtype={col: str if col in category_columns else dtype for col, dtype in dtypes.items()})
+            for col in category_columns:
+                if col in df.columns:
+                    df[col] = df[col].astype("category")
+            info["timings"]["lettura"] = time.perf_counter() - start_time
+
+        info["missing_columns"] = [col for col in columns if col not in df.columns]
+        return not info["missing_columns"], df, info
 
-        except Exception as e:
-            print(f"Errore durante la pulizia dei dati: {str(e)}")
-            return None
-         
     def handle_duplicate_headers(headers: List[str]) -> List[str]:
         """
         Gestisce le intestazioni duplicate aggiungendo un postfisso numerico
@@ -0,0 +1,289 @@
+import json
+import logging
+import os
+import sqlite3
+from contextlib import closing
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+import pandas as pd
+
+import Config.constants as constants
+import DF_Tools
+
+# Logger specifico per questo modulo
+logger = logging.getLogger("NotificationStore")
+
+
+class NotificationStore:
+    """
+    Archivio locale (SQLite) delle righe IW29 già estratte, una riga per Avviso.
+
+    Per ogni prefisso vengono registrati gli intervalli di data modifica (AEDAT) già sincronizzati
+    con SAP: l'estrazione "Modifica" interroga SAP solo per gli intervalli mancanti, aggiorna
+    l'archivio e restituisce dall'archivio tutte le righe dell'intervallo richiesto.
+
+    L'archivio memorizza anche la data inizio cardine degli ordini letta dalla tabella AFKO:
+    gli ordini già risolti non vengono più richiesti a SAP.
+    """
+
+    def __init__(self, db_path: str = constants.NOTIFICATION_STORE_PATH):
+        """
+        Args:
+            db_path: Percorso del database SQLite (creato se non esiste)
+        """
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with closing(self.connect()) as conn, conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS notifications (
+                                avviso INTEGER PRIMARY KEY,
+                                prefix TEXT NOT NULL,
+                                aedat TEXT,
+                                payload TEXT NOT NULL,
+                                updated_at TEXT NOT NULL)""")
+            self._migrate_aedat(conn)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_notifications_prefix_aedat ON notifications (prefix, aedat)")
+            conn.execute("""CREATE TABLE IF NOT EXISTS sync_windows (
+                                prefix TEXT NOT NULL,
+                                date_from TEXT NOT NULL,
+                                date_to TEXT NOT NULL,
+                                synced_at TEXT NOT NULL)""")
+            conn.execute("""CREATE TABLE IF NOT EXISTS order_starts (
+                                ordine INTEGER PRIMARY KEY,
+                                gstrp TEXT,
+                                updated_at TEXT NOT NULL)""")
+
+    @staticmethod
+    def _migrate_aedat(conn: sqlite3.Connection) -> None:
+        """
+        Archivi creati con aedat NOT NULL: la tabella viene ricreata con aedat nullable
+        e le date di modifica vuote ('') diventano NULL
+        """
+        columns = {row[1]: row[3] for row in conn.execute("PRAGMA table_info(notifications)")}
+        if not columns.get("aedat"):
+            return
+        conn.execute("ALTER TABLE notifications RENAME TO notifications_old")
+        conn.execute("""CREATE TABLE notifications (
+                            avviso INTEGER PRIMARY KEY,
+                            prefix TEXT NOT NULL,
+                            aedat TEXT,
+                            payload TEXT NOT NULL,
+                            updated_at TEXT NOT NULL)""")
+        conn.execute("""INSERT INTO notifications (avviso, prefix, aedat, payload, updated_at)
+                        SELECT avviso, prefix, NULLIF(aedat, ''), payload, updated_at FROM notifications_old""")
+        conn.execute("DROP TABLE notifications_old")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_notifications_prefix_aedat ON notifications (prefix, aedat)")
+        logger.info("Archivio avvisi aggiornato: date di modifica mancanti memorizzate come NULL")
+
+    def connect(self) -> sqlite3.Connection:
+        """
+        Apre una connessione al database (una per operazione, utilizzabile da qualsiasi thread)
+        """
+        return sqlite3.connect(self.db_path)
+
+    @staticmethod
+    def prefix_of(functional_location: str) -> str:
+        """
+        Restituisce il prefisso impianto di una sede tecnica (es. 'ESW-ES19-X1-16' -> 'ESW')
+        """
+        return str(functional_location).split("-", 1)[0]
+
+    def synced_windows(self, prefix: str) -> List[Tuple[date, date]]:
+        """
+        Restituisce gli intervalli già sincronizzati per un prefisso, ordinati per data
+        """
+        with closing(self.connect()) as conn:
+            rows = conn.execute("SELECT date_from, date_to FROM sync_windows WHERE prefix = ? ORDER BY date_from",
+                                (prefix,)).fetchall()
+        return [(date.fromisoformat(date_from), date.fromisoformat(date_to)) for date_from, date_to in rows]
+
+    def missing_windows(self, prefix: str, start: date, end: date) -> List[Tuple[date, date]]:
+        """
+        Calcola gli intervalli di [start, end] non ancora sincronizzati per un prefisso
+
+        Args:
+            prefix: Prefisso impianto
+            start: Data di inizio
+            end: Data di fine
+
+        Returns:
+            list: Intervalli (data_inizio, data_fine) da estrarre da SAP
+        """
+        gaps = []
+        cursor = start
+        for date_from, date_to in self.synced_windows(prefix):
+            if date_to < cursor:
+                continue
+            if date_from > end:
+                break
+            if date_from > cursor:
+                gaps.append((cursor, date_from - timedelta(days=1)))
+            cursor = max(cursor, date_to + timedelta(days=1))
+        if cursor <= end:
+            gaps.append((cursor, end))
+        return gaps
+
+    def mark_synced(self, prefixes: Iterable[str], start: date, end: date, sync_date: date | None = None) -> None:
+        """
+        Registra un intervallo come sincronizzato per i prefissi indicati.
+        L'intervallo viene limitato al giorno precedente la sincronizzazione:
+        gli avvisi possono ancora essere modificati nel giorno corrente.
+
+        Args:
+            prefixes: Prefissi impianto
+            start: Data di inizio
+            end: Data di fine
+            sync_date: Data della sincronizzazione (default: oggi)
+        """
+        sync_date = sync_date or date.today()
+        end = min(end, sync_date - timedelta(days=1))
+        if end < start:
+            return
+        # unione con gli intervalli già registrati (sovrapposti o adiacenti)
+        merged_windows = {}
+        for prefix in set(prefixes):
+            merged = []
+            for date_from, date_to in sorted(self.synced_windows(prefix) + [(start, end)]):
+                if merged and date_from <= merged[-1][1] + timedelta(days=1):
+                    merged[-1] = (merged[-1][0], max(merged[-1][1], date_to))
+                else:
+                    merged.append((date_from, date_to))
+            merged_windows[prefix] = merged
+        synced_at = datetime.now().isoformat(timespec="seconds")
+        with closing(self.connect()) as conn, conn:
+            for prefix, merged in merged_windows.items():
+                conn.execute("DELETE FROM sync_windows WHERE prefix = ?", (prefix,))
+                conn.executemany("INSERT INTO sync_windows (prefix, date_from, date_to, synced_at) VALUES (?, ?, ?, ?)",
+                                 [(prefix, f.isoformat(), t.isoformat(), synced_at) for f, t in merged])
+
+    def upsert(self, df: pd.DataFrame, aedat_column: str = "Mod. il") -> int:
+        """
+        Inserisce o aggiorna le righe di un'estrazione IW29 (chiave: Avviso).
+        Una riga già presente viene sostituita solo da una riga con data modifica uguale o successiva;
+        le righe senza data modifica (NULL) vengono inserite ma non sostituiscono righe già presenti.
+        Le righe senza Avviso non vengono archiviate.
+
+        Args:
+            df: DataFrame IW29 (layout constants.IW29_LAYOUT)
+            aedat_column: Colonna con la data di modifica
+
+        Returns:
+            int: Numero di righe elaborate
+        """
+        if df is None or df.empty:
+            return 0
+        # le righe lette dalla schermata di dettaglio non contengono tutte le colonne del layout: non vengono archiviate
+        if aedat_column not in df.columns or "Sede tecnica" not in df.columns:
+            return 0
+        missing = df["Avviso"].isna()
+        if missing.any():
+            logger.warning(f"{int(missing.sum())} righe senza Avviso non archiviate")
+            df = df[~missing]
+            if df.empty:
+                return 0
+        columns = [col for col in df.columns if col != "TipoEstrazione"]
+        text = pd.DataFrame({col: self._to_text(df[col]) for col in columns})
+        aedat = pd.to_datetime(df[aedat_column], format=constants.SAP_DATE_FORMAT, errors="coerce")
+        # data ISO (confrontabile come testo) oppure NULL se la data di modifica manca
+        aedat = aedat.dt.strftime("%Y-%m-%d").astype(object).where(aedat.notna(), None)
+        updated_at = datetime.now().isoformat(timespec="seconds")
+        records = [
+            (int(avviso), self.prefix_of(sede), modified, json.dumps(payload, ensure_ascii=False), updated_at)
+            for avviso, sede, modified, payload in zip(df["Avviso"], text["Sede tecnica"], aedat, text.to_dict("records"))
+        ]
+        with closing(self.connect()) as conn, conn:
+            conn.executemany("""INSERT INTO notifications (avviso, prefix, aedat, payload, updated_at)
+                                VALUES (?, ?, ?, ?, ?)
+                                ON CONFLICT(avviso) DO UPDATE SET
+                                    prefix = excluded.prefix, aedat = excluded.aedat,
+                                    payload = excluded.payload, updated_at = excluded.updated_at
+                                WHERE excluded.aedat IS NOT NULL
+                                  AND (notifications.aedat IS NULL OR excluded.aedat >= notifications.aedat)""", records)
+        return len(records)
+
+    def load(self, prefixes: Iterable[str], start: date, end: date) -> pd.DataFrame | None:
+        """
+        Restituisce le righe con data modifica nell'intervallo [start, end] per i prefissi indicati
+
+        Returns:
+            DataFrame con i tipi del layout IW29 oppure None se non ci sono righe
+        """
+        prefixes = list(prefixes)
+        placeholders = ", ".join("?" for _ in prefixes)
+        with closing(self.connect()) as conn:
+            rows = conn.execute(f"""SELECT payload FROM notifications
+                                    WHERE prefix IN ({placeholders}) AND aedat BETWEEN ? AND ?
+                                    ORDER BY avviso""",
+                                (*prefixes, start.isoformat(), end.isoformat())).fetchall()
+        if not rows:
+            return None
+        df = pd.DataFrame([json.loads(payload) for (payload,) in rows])
+        return DF_Tools.DataFrameTools.apply_schema(df, constants.IW29_LAYOUT)
+
+    def order_starts(self, orders: Iterable[int]) -> pd.Series:
+        """
+        Restituisce la data inizio cardine memorizzata per gli ordini indicati
+
+        Args:
+            orders: Numeri ordine
+
+        Returns:
+            Serie Ordine (int64) -> Inizio card. (datetime64) dei soli ordini presenti nell'archivio
+        """
+        with closing(self.connect()) as conn:
+            # gli ordini richiesti possono essere molti: vengono confrontati tramite una tabella temporanea
+            conn.execute("CREATE TEMP TABLE requested_orders (ordine INTEGER PRIMARY KEY)")
+            conn.executemany("INSERT OR IGNORE INTO requested_orders (ordine) VALUES (?)", ((int(o),) for o in orders))
+            rows = conn.execute("""SELECT order_starts.ordine, order_starts.gstrp FROM order_starts
+                                   JOIN requested_orders ON requested_orders.ordine = order_starts.ordine
+                                   ORDER BY order_starts.ordine""").fetchall()
+        if not rows:
+            return self.empty_order_starts()
+        ordini, gstrp = zip(*rows)
+        return pd.Series(pd.to_datetime(list(gstrp), format="%Y-%m-%d"),
+                         index=pd.Index(ordini, dtype="int64", name=constants.AFKO_ORDER_COLUMN),
+                         name=constants.AFKO_START_COLUMN)
+
+    def store_order_starts(self, starts: pd.Series) -> int:
+        """
+        Inserisce o aggiorna la data inizio cardine degli ordini
+
+        Args:
+            starts: Serie Ordine -> Inizio card. (datetime64, valori mancanti ammessi)
+
+        Returns:
+            int: Numero di ordini elaborati
+        """
+        updated_at = datetime.now().isoformat(timespec="seconds")
+        gstrp = pd.to_datetime(starts, errors="coerce").dt.strftime("%Y-%m-%d")
+        records = [(int(ordine), None if pd.isna(value) else value, updated_at)
+                   for ordine, value in zip(starts.index, gstrp)]
+        with closing(self.connect()) as conn, conn:
+            conn.executemany("""INSERT INTO order_starts (ordine, gstrp, updated_at) VALUES (?, ?, ?)
+                                ON CONFLICT(ordine) DO UPDATE SET
+                                    gstrp = excluded.gstrp, updated_at = excluded.updated_at""", records)
+        return len(records)
+
+    @staticmethod
+    def empty_order_starts() -> pd.Series:
+        """
+        Serie vuota Ordine -> Inizio card. (stessi tipi di order_starts)
+        """
+        return pd.Series(pd.to_datetime([]), index=pd.Index([], dtype="int64", name=constants.AFKO_ORDER_COLUMN),
+                         name=constants.AFKO_START_COLUMN)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Restituisce il numero di avvisi memorizzati per prefisso
+        """
+        with closing(self.connect()) as conn:
+            return dict(conn.execute("SELECT prefix, COUNT(*) FROM notifications GROUP BY prefix").fetchall())
+
+    @staticmethod
+    def _to_text(values: pd.Series) -> pd.Series:
+        """
+        Riporta una colonna nel formato testo della lista SAP (date gg.mm.aaaa, valori mancanti vuoti)
+        """
+        if pd.api.types.is_datetime64_any_dtype(values):
+            return values.dt.strftime(constants.SAP_DATE_FORMAT).fillna("")
+        return values.astype(object).where(values.notna(), "").astype(str)
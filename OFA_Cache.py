@@ -0,0 +1,176 @@
+import hashlib
+import importlib.util
+import logging
+import os
+import shutil
+from typing import Dict, Optional
+
+import pandas as pd
+
+import Config.constants as constants
+
+# Logger specifico per questo modulo
+logger = logging.getLogger("OFACache")
+
+
+class OFACache:
+    """
+    Cache su disco dei DataFrame AdM/OdM ottenuti dai file Excel della trace OFA.
+
+    Ogni file Excel elaborato viene salvato in una sottocartella identificata da
+    hash del contenuto + dimensione + data di modifica + versione dello schema:
+    se il file viene selezionato di nuovo i DataFrame vengono letti dalla cache
+    senza ripetere lettura, verifica e normalizzazione.
+    I DataFrame sono salvati in formato Feather quando pyarrow è installato, altrimenti con pickle.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = constants.OFA_CACHE_MAX_BYTES,
+                 schema_version: int = constants.OFA_CACHE_SCHEMA_VERSION):
+        """
+        Args:
+            cache_dir: Cartella della cache
+            max_bytes: Dimensione massima della cache, oltre la quale vengono eliminate le voci usate meno di recente
+            schema_version: Versione del formato dei DataFrame; cambiandola le voci precedenti non vengono più utilizzate
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.schema_version = schema_version
+        self.file_format = "feather" if importlib.util.find_spec("pyarrow") is not None else "pkl"
+
+    def key_for(self, file_path: str) -> str:
+        """
+        Calcola la chiave della cache per un file
+
+        Args:
+            file_path: Percorso del file Excel
+
+        Returns:
+            str: Chiave esadecimale
+        """
+        stat = os.stat(file_path)
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        digest.update(f"|{stat.st_size}|{stat.st_mtime_ns}|{self.schema_version}".encode())
+        return digest.hexdigest()
+
+    def load(self, file_path: str) -> Optional[Dict[str, pd.DataFrame]]:
+        """
+        Legge dalla cache i DataFrame relativi a un file
+
+        Args:
+            file_path: Percorso del file Excel
+
+        Returns:
+            dict {nome: DataFrame} oppure None se il file non è presente nella cache
+        """
+        try:
+            entry_dir = os.path.join(self.cache_dir, self.key_for(file_path))
+            if not os.path.isdir(entry_dir):
+                return None
+            frames = {}
+            for file_name in os.listdir(entry_dir):
+                name, ext = os.path.splitext(file_name)
+                path = os.path.join(entry_dir, file_name)
+                if ext == ".feather":
+                    frames[name] = pd.read_feather(path)
+                elif ext == ".pkl":
+                    frames[name] = pd.read_pickle(path)
+            if not frames:
+                return None
+            # aggiorna la data di ultimo utilizzo (usata per l'eliminazione LRU)
+            os.utime(entry_dir)
+            return frames
+        except Exception as e:
+            logger.warning(f"Errore nella lettura della cache per {file_path}: {str(e)}")
+            return None
+
+    def store(self, file_path: str, frames: Dict[str, pd.DataFrame]) -> bool:
+        """
+        Salva nella cache i DataFrame relativi a un file
+
+        Args:
+            file_path: Percorso del file Excel
+            frames: dict {nome: DataFrame}
+
+        Returns:
+            bool: True se il salvataggio è andato a buon fine
+        """
+        # la cartella che contiene la cache (la directory di salvataggio configurata) deve esistere:
+        # un percorso errato o non raggiungibile non viene creato, viene creata solo la cartella della cache
+        parent_dir = os.path.dirname(os.path.abspath(self.cache_dir))
+        if not os.path.isdir(parent_dir):
+            logger.warning(f"Directory {parent_dir} non trovata: i DataFrame di {file_path} non vengono salvati nella cache")
+            return False
+        entry_dir = os.path.join(self.cache_dir, self.key_for(file_path))
+        # i file vengono scritti in una cartella temporanea e resi visibili solo a scrittura completata
+        temp_dir = f"{entry_dir}.tmp{os.getpid()}"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            os.makedirs(temp_dir, exist_ok=True)
+            for name, df in frames.items():
+                path = os.path.join(temp_dir, f"{name}.{self.file_format}")
+                if self.file_format == "feather":
+                    df.reset_index(drop=True).to_feather(path)
+                else:
+                    df.to_pickle(path)
+            if os.path.isdir(entry_dir):
+                shutil.rmtree(entry_dir)
+            os.replace(temp_dir, entry_dir)
+            self.enforce_size_limit()
+            return True
+        except Exception as e:
+            logger.warning(f"Errore nel salvataggio della cache per {file_path}: {str(e)}")
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            return False
+
+    def entries(self) -> list:
+        """
+        Restituisce le voci della cache ordinate dalla meno recente
+
+        Returns:
+            list: [(percorso, ultimo utilizzo, dimensione in byte)]
+        """
+        if not os.path.isdir(self.cache_dir):
+            return []
+        result = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if not os.path.isdir(path) or ".tmp" in name:
+                continue
+            size = sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+            result.append((path, os.stat(path).st_mtime, size))
+        return sorted(result, key=lambda entry: entry[1])
+
+    def enforce_size_limit(self) -> int:
+        """
+        Elimina le voci usate meno di recente finché la cache non rientra nella dimensione massima
+
+        Returns:
+            int: Numero di voci eliminate
+        """
+        entries = self.entries()
+        total = sum(size for _, _, size in entries)
+        removed = 0
+        for path, _, size in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed += 1
+        if removed:
+            logger.info(f"Cache OFA: eliminate {removed} voci meno recenti")
+        return removed
+
+    def clear(self) -> int:
+        """
+        Svuota la cache
+
+        Returns:
+            int: Numero di voci eliminate
+        """
+        entries = self.entries()
+        for path, _, _ in entries:
+            shutil.rmtree(path, ignore_errors=True)
+        return len(entries)
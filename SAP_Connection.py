@@ -1,5 +1,19 @@
-import win32com.client
-from typing import Optional
+import logging
+import queue
+import time
+from contextlib import contextmanager
+from typing import Optional, Callable, List
+import Config.constants as constants
+
+# SAP GUI Scripting è disponibile solo su Windows con pywin32:
+# senza il modulo si può utilizzare soltanto la sessione simulata (SAP_Fake)
+try:
+    import win32com.client
+except ImportError:
+    win32com = None
+
+# Logger specifico per questo modulo
+logger = logging.getLogger("SAPConnection")
 
 class SAPGuiConnection:
     """
@@ -22,6 +36,9 @@ class SAPGuiConnection:
         Returns:
             bool: True se la connessione è stabilita con successo, False altrimenti
         """
+        if win32com is None:
+            print("Errore: pywin32 non installato, SAP GUI non disponibile")
+            return False
         try:
             # Stabilisco una connessione con SAP
             self.SapGuiAuto = win32com.client.GetObject('SAPGUI')
@@ -86,6 +103,12 @@ class SAPGuiConnection:
             return self.session
         return None
 
+    def engine_provider(self) -> object:
+        """
+        Restituisce lo Scripting Engine per il thread corrente (utilizzato da SAPSessionPool)
+        """
+        return get_scripting_engine()
+
     def __enter__(self):
         """
         Permette l'utilizzo del context manager (with statement)
@@ -101,6 +124,195 @@ class SAPGuiConnection:
 
 
 
+def get_scripting_engine():
+    """
+    Restituisce lo Scripting Engine di SAP GUI attivo
+    
+    Returns:
+        object: Oggetto GuiApplication di SAP GUI
+
+    Raises:
+        RuntimeError: Se pywin32 non è installato
+    """
+    if win32com is None:
+        raise RuntimeError("pywin32 non installato, SAP GUI non disponibile")
+    SapGuiAuto = win32com.client.GetObject('SAPGUI')
+    return SapGuiAuto.GetScriptingEngine
+
+
+def co_initialize() -> bool:
+    """
+    Inizializza COM per il thread corrente. Necessario per utilizzare SAP GUI da un thread secondario.
+    
+    Returns:
+        bool: True se COM è stato inizializzato, False se pythoncom non è disponibile
+    """
+    try:
+        import pythoncom
+    except ImportError:
+        return False
+    pythoncom.CoInitialize()
+    return True
+
+
+def co_uninitialize() -> None:
+    """
+    Rilascia COM per il thread corrente
+    """
+    try:
+        import pythoncom
+    except ImportError:
+        return
+    pythoncom.CoUninitialize()
+
+
+class SAPSessionPool:
+    """
+    Pool di sessioni SAP GUI aperte sulla stessa connessione, utilizzato per eseguire
+    estrazioni indipendenti in parallelo.
+    
+    Le sessioni sono identificate dal loro Id (es. '/app/con[0]/ses[1]'): gli oggetti COM
+    non possono essere condivisi fra thread, quindi ogni thread risolve la propria sessione
+    a partire dall'Id tramite il proprio Scripting Engine.
+    """
+
+    # Numero massimo di sessioni consentite da SAP GUI per ogni connessione
+    MAX_SESSIONS = 6
+
+    def __init__(self, size: int = 2, connection_index: int = 0,
+                 engine_provider: Optional[Callable[[], object]] = None,
+                 timeout: int = constants.timeoutSeconds):
+        """
+        Inizializza il pool
+        
+        Args:
+            size: Numero di sessioni desiderate
+            connection_index: Indice della connessione SAP da utilizzare
+            engine_provider: Funzione che restituisce lo Scripting Engine (default: SAP GUI via win32com).
+                             Permette di utilizzare un motore simulato al posto di SAP GUI.
+            timeout: Tempo massimo di attesa in secondi per l'apertura di una nuova sessione
+        """
+        self.size = max(1, min(size, self.MAX_SESSIONS))
+        self.connection_index = connection_index
+        self.engine_provider = engine_provider or get_scripting_engine
+        self.timeout = timeout
+        self.session_ids: List[str] = []
+        self._created_ids: List[str] = []
+        self._available = queue.Queue()
+
+    def __len__(self) -> int:
+        return len(self.session_ids)
+
+    def open(self) -> bool:
+        """
+        Riutilizza le sessioni già aperte sulla connessione e ne apre di nuove fino a raggiungere la dimensione richiesta
+        
+        Returns:
+            bool: True se è disponibile almeno una sessione, False altrimenti
+        """
+        try:
+            engine = self.engine_provider()
+            connection = engine.Children(self.connection_index)
+
+            # Riutilizzo delle sessioni già aperte
+            for i in range(min(connection.Children.Count, self.size)):
+                self.session_ids.append(connection.Children(i).Id)
+
+            # Apertura delle sessioni mancanti
+            while len(self.session_ids) < self.size and connection.Children.Count < self.MAX_SESSIONS:
+                new_id = self._create_session(connection)
+                if new_id is None:
+                    logger.warning("Impossibile aprire una nuova sessione SAP, utilizzo le sessioni disponibili")
+                    break
+                self.session_ids.append(new_id)
+                self._created_ids.append(new_id)
+
+            for session_id in self.session_ids:
+                self._available.put(session_id)
+
+            logger.info(f"Pool di sessioni SAP pronto: {len(self.session_ids)} sessioni")
+            return len(self.session_ids) > 0
+
+        except Exception as e:
+            logger.error(f"Errore durante l'apertura del pool di sessioni SAP: {str(e)}")
+            return False
+
+    def _create_session(self, connection) -> Optional[str]:
+        """
+        Apre una nuova sessione sulla connessione e ne restituisce l'Id
+        
+        Args:
+            connection: Oggetto connessione SAP
+            
+        Returns:
+            str: Id della nuova sessione o None se non è stato possibile aprirla
+        """
+        known_ids = {connection.Children(i).Id for i in range(connection.Children.Count)}
+        base_session = connection.Children(0)
+        try:
+            base_session.CreateSession()
+        except Exception:
+            # In alternativa si utilizza il comando /o dalla barra dei comandi
+            base_session.findById("wnd[0]/tbar[0]/okcd").text = "/oSESSION_MANAGER"
+            base_session.findById("wnd[0]").sendVKey(0)
+
+        # La nuova sessione viene creata in modo asincrono da SAP GUI
+        start_time = time.time()
+        while time.time() - start_time < self.timeout:
+            for i in range(connection.Children.Count):
+                session_id = connection.Children(i).Id
+                if session_id not in known_ids:
+                    # Attendo che la nuova sessione sia pronta
+                    while connection.Children(i).Busy and time.time() - start_time < self.timeout:
+                        time.sleep(0.1)
+                    return session_id
+            time.sleep(0.1)
+        return None
+
+    @contextmanager
+    def session(self):
+        """
+        Preleva una sessione libera dal pool per il thread corrente e la restituisce al termine
+        
+        Yields:
+            object: Oggetto sessione SAP
+        """
+        session_id = self._available.get()
+        com_initialized = co_initialize()
+        try:
+            engine = self.engine_provider()
+            yield engine.findById(session_id)
+        finally:
+            self._available.put(session_id)
+            if com_initialized:
+                co_uninitialize()
+
+    def close(self) -> None:
+        """
+        Chiude le sessioni aperte dal pool (le sessioni riutilizzate restano aperte)
+        """
+        try:
+            if self._created_ids:
+                engine = self.engine_provider()
+                connection = engine.Children(self.connection_index)
+                for session_id in self._created_ids:
+                    connection.CloseSession(session_id)
+        except Exception as e:
+            logger.error(f"Errore durante la chiusura delle sessioni SAP: {str(e)}")
+        finally:
+            self.session_ids = []
+            self._created_ids = []
+            self._available = queue.Queue()
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+
 """ 
 
 def main():
@@ -0,0 +1,681 @@
+"""
+Simulazione di SAP GUI Scripting per eseguire le estrazioni senza SAP (dry-run, benchmark, build senza GUI).
+
+Riproduce gli oggetti utilizzati da SAPDataExtractor e SAPSessionPool (Scripting Engine, connessione,
+sessioni, elementi della schermata) e il comportamento delle transazioni IW29 e IW39: l'esecuzione della lista
+genera una lista sintetica nel formato non convertito (oppure riproduce una lista registrata),
+esportata nel file locale richiesto o nella clipboard, con un tempo di risposta configurabile.
+
+Esempio:
+    sap = FakeSAPConnection(rows_per_list=10000, latency=(0.5, 2.0), recordings=ListRecordings(["testfile.txt"]))
+"""
+import random
+import threading
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import Config.constants as constants
+
+# Larghezza delle colonne della lista avvisi (layout /KPIOFANO2)
+COLUMNS = [
+    ("Avviso", 12), ("Mod. il", 10), ("Data", 10), ("Descrizione", 40), ("Tp.", 3),
+    ("Sede tecnica", 20), ("St.sist.", 9), ("Ordine", 12), ("Pse", 3), ("Sis.Legacy", 10),
+]
+# Larghezza delle colonne della lista ordini (layout /KPIOFA2)
+ORDER_COLUMNS = [
+    ("Ordine", 12), ("Avviso", 12), ("Data", 10), ("Mod. il", 10), ("Inizio card.", 12), ("Descrizione", 40),
+    ("Tp.", 4), ("Sede tecnica", 20), ("St.sist.", 9), ("Pse", 3), ("Sis.Legacy", 10),
+]
+# Larghezza delle colonne della tabella AFKO in SE16 (layout /OFAKPIWO)
+AFKO_COLUMNS = [(constants.AFKO_ORDER_COLUMN, 12), (constants.AFKO_START_COLUMN, 12)]
+
+WORDS = ["ICEBERG-SAS", "WGEN1_Brg2Tmp", "Alarm", "NIVEL", "SISTEMA", "HIDRAULICO",
+         "Rearmes", "varios", "MODIFICACIONES", "MEJORAS", "ENDOSCOPIA", "OK"]
+
+# Testi della schermata SAP riconosciuti da SAPDataExtractor
+TITLE_IW29_SELECTION = "Visualizzare avvisi: selezione avvisi"
+TITLE_IW29_LIST = "Visualizzare avvisi: lista avvisi"
+TITLE_IW29_SINGLE = "Visualizzare avviso PM: Segnalazione guasto"
+TITLE_IW39_SELECTION = "Visualizzare ordini PM: selezione ordini"
+TITLE_IW39_LIST = "Visualizzare ordini PM: lista ordini"
+TITLE_IW39_SINGLE = "Visualizzare ordine PM: Dati centrali"
+TITLE_SE16_START = "Data Browser: videata iniziale"
+SBAR_NO_DATA = "Non sono stati selezionati oggetti"
+# Titoli (selezione, lista, schermata di dettaglio) per transazione
+TITLES = {
+    "IW29": (TITLE_IW29_SELECTION, TITLE_IW29_LIST, TITLE_IW29_SINGLE),
+    "IW39": (TITLE_IW39_SELECTION, TITLE_IW39_LIST, TITLE_IW39_SINGLE),
+}
+# Layout salvati proposti nel popup "Selezionare layout"
+LAYOUTS = ["/STANDARD", constants.IW29_LAYOUT, constants.IW39_LAYOUT, constants.AFKO_LAYOUT]
+
+# Numeri avviso e ordine assegnati alle liste generate, unici fra tutte le sessioni simulate
+# (gli ordini sono oltre constants.OdM_THRESHOLD)
+_next_ids = {"IW29": 1000000000, "IW39": 4100000000}
+_ids_lock = threading.Lock()
+
+
+def _reserve_ids(count: int, transaction: str = "IW29") -> List[int]:
+    with _ids_lock:
+        first = _next_ids[transaction]
+        _next_ids[transaction] = first + count
+    return list(range(first, first + count))
+
+
+def _cell(value: str, width: int, right: bool = False) -> str:
+    value = value[:width]
+    return value.rjust(width) if right else value.ljust(width)
+
+
+def _sap_date(value: date) -> str:
+    return value.strftime(constants.SAP_DATE_FORMAT)
+
+
+def _description(rng: random.Random, pipe_rate: float) -> str:
+    description = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 5)))
+    if rng.random() < pipe_rate:
+        # Pipe all'interno della descrizione, come nei testi inseriti dagli utenti
+        cut = rng.randint(1, len(description) - 1)
+        description = f"{description[:cut]}|{description[cut:]}"
+    return description
+
+
+def _row(rng: random.Random, avviso: int, pipe_rate: float, prefixes: List[str],
+         date_from: date, days: int) -> str:
+    description = _description(rng, pipe_rate)
+    created = date_from + timedelta(days=rng.randint(0, days))
+    modified = created + timedelta(days=rng.randint(0, 3)) if rng.random() < 0.7 else None
+    values = [
+        _cell(str(avviso), 12, right=True),
+        _cell(_sap_date(modified) if modified else "", 10),
+        _cell(_sap_date(created), 10),
+        _cell(description, 40),
+        _cell(rng.choice(["Z2", "Z4"]), 3),
+        _cell(f"{rng.choice(prefixes)}-ES{rng.randint(10, 99)}-X{rng.randint(1, 4)}-{rng.randint(1, 99):02d}", 20),
+        _cell("MAPE", 9),
+        _cell(str(4000000000 + avviso % 1000000000) if rng.random() < 0.3 else "", 12, right=True),
+        _cell("ES", 3),
+        _cell(rng.choice(["", "POM_DRIVEN", "OFA"]), 10),
+    ]
+    return "|" + "|".join(values) + "|"
+
+
+def _order_row(rng: random.Random, ordine: int, pipe_rate: float, prefixes: List[str],
+               date_from: date, days: int) -> str:
+    description = _description(rng, pipe_rate)
+    created = date_from + timedelta(days=rng.randint(0, days))
+    modified = created + timedelta(days=rng.randint(0, 3)) if rng.random() < 0.7 else None
+    start = created + timedelta(days=rng.randint(0, 10))
+    values = [
+        _cell(str(ordine), 12, right=True),
+        _cell(str(1000000000 + ordine % 100000000) if rng.random() < 0.6 else "", 12, right=True),
+        _cell(_sap_date(created), 10),
+        _cell(_sap_date(modified) if modified else "", 10),
+        _cell(_sap_date(start), 12),
+        _cell(description, 40),
+        _cell(rng.choice(["ZPM1", "ZPM2", "ZPM3"]), 4),
+        _cell(f"{rng.choice(prefixes)}-ES{rng.randint(10, 99)}-X{rng.randint(1, 4)}-{rng.randint(1, 99):02d}", 20),
+        _cell(rng.choice(["RIL", "CONF", "TECO"]), 9),
+        _cell("ES", 3),
+        _cell(rng.choice(["", "POM_DRIVEN", "OFA"]), 10),
+    ]
+    return "|" + "|".join(values) + "|"
+
+
+def _afko_row(rng: random.Random, ordine: int, pipe_rate: float, prefixes: List[str],
+              date_from: date, days: int) -> str:
+    start = date_from + timedelta(days=rng.randint(0, days))
+    return "|" + _cell(str(ordine), 12, right=True) + "|" + _cell(_sap_date(start), 12) + "|"
+
+
+# Colonne e generatore di riga della lista di ogni transazione
+LIST_FORMATS = {
+    "IW29": (COLUMNS, _row),
+    "IW39": (ORDER_COLUMNS, _order_row),
+    "SE16": (AFKO_COLUMNS, _afko_row),
+}
+
+
+def generate_sap_list(rows: int, wrap_rate: float = 0.01, pipe_rate: float = 0.02, seed: int = 0,
+                      prefixes: Optional[List[str]] = None, date_from: date = date(2025, 1, 1),
+                      date_to: date = date(2025, 12, 28), ids: Optional[Iterable[int]] = None,
+                      transaction: str = "IW29") -> str:
+    """
+    Genera il testo di una lista SAP con il numero di righe richiesto
+
+    Args:
+        rows: Numero di righe dati
+        wrap_rate: Frazione di righe spezzate su due righe (a capo dopo un separatore)
+        pipe_rate: Frazione di descrizioni contenenti il carattere '|'
+        seed: Seme del generatore casuale, per ottenere sempre lo stesso testo
+        prefixes: Prefissi impianto utilizzati per la sede tecnica (default: ESW)
+        date_from: Prima data di creazione generata
+        date_to: Ultima data di creazione generata
+        ids: Numeri avviso (o ordine) da utilizzare (default: progressivi a partire da 1200000000)
+        transaction: Transazione della lista ('IW29' avvisi, 'IW39' ordini, 'SE16' tabella AFKO)
+
+    Returns:
+        str: Testo della lista, con intestazione e righe di separazione
+    """
+    rng = random.Random(seed)
+    prefixes = prefixes or ["ESW"]
+    days = max((date_to - date_from).days, 0)
+    ids = iter(ids) if ids is not None else iter(range(1200000000, 1200000000 + rows))
+    columns, build_row = LIST_FORMATS[transaction]
+    header = "|" + "|".join(_cell(name, width) for name, width in columns) + "|"
+    separator = "-" * len(header)
+    lines: List[str] = [separator, header, separator]
+    for avviso in ids:
+        if rows <= 0:
+            break
+        rows -= 1
+        row = build_row(rng, int(avviso), pipe_rate, prefixes, date_from, days)
+        if rng.random() < wrap_rate:
+            # SAP interrompe la riga dopo un separatore lasciando spazi in coda
+            positions = [i for i, char in enumerate(row) if char == "|"][2:-2]
+            cut = rng.choice(positions) + 1
+            lines.append(row[:cut] + "   ")
+            lines.append(row[cut:])
+        else:
+            lines.append(row)
+    lines.append(separator)
+    return "\n".join(lines) + "\n"
+
+
+class FakeClipboard:
+    """
+    Clipboard simulata con la stessa interfaccia di pyperclip (copy/paste), condivisa fra le sessioni del motore
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._lock = threading.Lock()
+
+    def copy(self, text: str) -> None:
+        with self._lock:
+            self._text = str(text)
+
+    def paste(self) -> str:
+        with self._lock:
+            return self._text
+
+
+class FakeElement:
+    """
+    Elemento della schermata (campo, pulsante, menu, finestra): le azioni vengono inoltrate alla sessione
+    """
+
+    def __init__(self, session: "FakeSession", element_id: str):
+        self.session = session
+        self.Id = element_id
+        self.text = ""
+        self.selected = False
+        self.caretPosition = 0
+        # Griglia (es. popup di selezione del layout): celle per (riga, colonna)
+        self.cells: Dict[tuple, str] = {}
+        self.RowCount = 0
+        self.currentCellRow = -1
+        self.selectedRows = ""
+
+    def press(self) -> None:
+        self.session.on_action(self.Id, "press")
+
+    def select(self) -> None:
+        self.session.on_action(self.Id, "select")
+
+    def sendVKey(self, key: int) -> None:
+        self.session.on_action(self.Id, f"vkey{key}")
+
+    def GetCellValue(self, row: int, column: str) -> str:
+        return self.cells.get((row, column), "")
+
+    def clickCurrentCell(self) -> None:
+        self.session.on_action(self.Id, "click")
+
+    def setFocus(self) -> None:
+        pass
+
+    def resizeWorkingPane(self, *args) -> None:
+        pass
+
+
+class ListRecordings:
+    """
+    Liste SAP registrate (file esportati da SAP oppure testo copiato dalla clipboard) riprodotte dalle sessioni simulate.
+
+    Il tipo di estrazione viene ricavato dal nome del file come nei file temporanei dell'estrattore
+    (es. IW29_Creazione_<id>.txt, conservati con DEBUG_MODE): ad ogni esecuzione viene restituita,
+    a rotazione, una registrazione della stessa transazione e dello stesso tipo, oppure, in mancanza,
+    una della stessa transazione o una qualsiasi.
+    """
+
+    def __init__(self, paths: Iterable[str]):
+        """
+        Args:
+            paths: File o cartelle (vengono letti i file .txt contenuti) con le liste registrate
+        """
+        self._lists: Dict[str, List[str]] = {}
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        for path in map(Path, paths):
+            files = sorted(path.glob("*.txt")) if path.is_dir() else [path]
+            for file_path in files:
+                parts = file_path.stem.split("_")
+                tipo = f"{parts[0]}_{parts[1]}" if len(parts) > 2 and parts[0] in TITLES else "*"
+                self._lists.setdefault(tipo, []).append(self._read_table(file_path))
+        if not self._lists:
+            raise ValueError("Nessuna lista registrata trovata")
+
+    @staticmethod
+    def _read_table(file_path: Path) -> str:
+        # Le righe che precedono la tabella (data, titolo) vengono scartate
+        with open(file_path, "r", encoding=constants.SAP_EXPORT_ENCODING, errors="replace") as f:
+            lines = f.read().splitlines()
+        start = next((i for i, line in enumerate(lines) if line.startswith("-")), len(lines))
+        return "\n".join(lines[start:]) + "\n"
+
+    def __len__(self) -> int:
+        return sum(len(texts) for texts in self._lists.values())
+
+    def next(self, tipo: str) -> str:
+        """
+        Restituisce la prossima registrazione per il tipo di estrazione indicato (es. 'IW29_Creazione')
+        """
+        transaction = tipo.split("_", 1)[0]
+        same_transaction = [key for key in self._lists if key.startswith(f"{transaction}_")]
+        key = (tipo if tipo in self._lists else same_transaction[0] if same_transaction
+               else "*" if "*" in self._lists else next(iter(self._lists)))
+        with self._lock:
+            index = self._counters.get(key, 0)
+            self._counters[key] = index + 1
+        texts = self._lists[key]
+        return texts[index % len(texts)]
+
+
+class FakeSession:
+    """
+    Sessione SAP simulata.
+
+    Ogni esecuzione della lista (wnd[0]/tbar[1]/btn[8]) produce rows_per_list avvisi (IW29) o ordini (IW39)
+    con i prefissi della selezione STRNO e le date del campo data valorizzato; con la selezione multipla
+    degli identificativi (QMNUM, AUFNR) vengono restituiti gli avvisi o gli ordini richiesti.
+    In SE16 la tabella AFKO restituisce la data inizio cardine degli ordini della selezione I1. Se sono indicate delle liste registrate, vengono riprodotte queste.
+
+    Con una latenza maggiore di zero le azioni che in SAP richiedono un'elaborazione (avvio transazione,
+    esecuzione della lista, esportazione) vengono completate in modo asincrono: nel frattempo Busy è True
+    e titolo e status bar restano invariati, come in SAP GUI.
+    """
+
+    def __init__(self, session_id: str = "/app/con[0]/ses[0]", connection: Optional["FakeGuiConnection"] = None,
+                 rows_per_list: int = 200, seed: int = 0, clipboard: Optional[FakeClipboard] = None,
+                 latency: float | tuple = 0.0, recordings: Optional[ListRecordings] = None,
+                 selection_latency: float = 0.0):
+        """
+        Args:
+            session_id: Id della sessione
+            connection: Connessione a cui appartiene la sessione
+            rows_per_list: Numero di righe restituite da ogni esecuzione della lista
+            seed: Seme del generatore casuale
+            clipboard: Clipboard da cui vengono caricate le selezioni multiple
+            latency: Tempo di risposta simulato in secondi, fisso oppure intervallo (minimo, massimo)
+            recordings: Liste registrate da riprodurre al posto delle liste sintetiche
+            selection_latency: Tempo di caricamento di ogni valore incollato nella selezione multipla (secondi)
+        """
+        self.Id = session_id
+        self.connection = connection
+        self.Busy = False
+        self.clipboard = clipboard or FakeClipboard()
+        self.rows_per_list = rows_per_list
+        self.seed = seed
+        self.latency = latency
+        self.recordings = recordings
+        self.selection_latency = selection_latency
+        # Statistiche delle chiamate ricevute
+        self.executions = 0
+        self.exports = 0
+        self._rng = random.Random(seed)
+        self._elements: Dict[str, FakeElement] = {}
+        # Valori delle selezioni multiple per campo (es. 'STRNO', 'QMNUM')
+        self._multiple: Dict[str, List[str]] = {}
+        # Intervalli delle selezioni multipli per campo (scheda "Intervalli")
+        self._intervals: Dict[str, List[tuple]] = {}
+        self._selection_tab = "SIVA"
+        self._selection_field: Optional[str] = None
+        self._list_text: Optional[str] = None
+        self._transaction = "IW29"
+        self._layout: Optional[str] = None
+        self._export_format = "file"
+        self._lock = threading.RLock()
+
+    def findById(self, element_id: str) -> FakeElement:
+        with self._lock:
+            if element_id not in self._elements:
+                self._elements[element_id] = FakeElement(self, element_id)
+            return self._elements[element_id]
+
+    def CreateSession(self) -> None:
+        if self.connection is None:
+            raise RuntimeError("Sessione non associata ad una connessione")
+        self.connection.CreateSession()
+
+    def field(self, name: str) -> str:
+        """
+        Restituisce il valore di un campo della schermata di selezione
+        """
+        return self.findById(f"wnd[0]/usr/ctxt{name}").text.strip()
+
+    def on_action(self, element_id: str, action: str) -> None:
+        """
+        Riproduce l'effetto delle azioni eseguite sugli elementi della schermata
+        """
+        with self._lock:
+            if element_id == "wnd[0]" and action == "vkey0":
+                command = self.findById("wnd[0]/tbar[0]/okcd").text
+                if command.strip():
+                    self._respond(lambda: self._start_transaction(command))
+                elif self._transaction == "SE16":
+                    # Invio nella videata iniziale: selezione della tabella indicata
+                    self._respond(self._open_table)
+            elif element_id.endswith("-VALU_PUSH"):
+                # es. wnd[0]/usr/btn%_STRNO_%_APP_%-VALU_PUSH
+                self._selection_field = element_id.split("btn%_", 1)[1].split("_%", 1)[0]
+                self._selection_tab = "SIVA"
+            elif element_id.startswith("wnd[1]/usr/tabsTAB_STRIP/tabp") and action == "select":
+                self._selection_tab = element_id.rsplit("tabp", 1)[1]
+            elif element_id == "wnd[1]/tbar[0]/btn[24]" and self._selection_field:
+                field, values = self._selection_field, self._paste_clipboard()
+                if self._selection_tab == "INTL":
+                    # Intervalli: minimo e massimo separati da tabulazione
+                    values = [tuple(int(part) for part in value.split("\t")) for value in values]
+                    target = self._intervals
+                else:
+                    target = self._multiple
+                self._respond(lambda: target.__setitem__(field, values), self.selection_latency * len(values))
+            elif element_id == "wnd[1]/tbar[0]/btn[8]":
+                self._selection_field = None
+            elif element_id == "wnd[0]/tbar[1]/btn[8]":
+                self._respond(self._execute_table if self._transaction == "SE16" else self._execute_list)
+            elif element_id == "wnd[0]/tbar[1]/btn[33]":
+                self._show_layouts()
+            elif element_id == constants.SAP_LAYOUT_GRID and action == "click":
+                grid = self.findById(element_id)
+                self._layout = grid.GetCellValue(grid.currentCellRow, "VARIANT")
+            elif "SPOPLI-SELFLAG" in element_id and action == "select":
+                # [0,0] = file non convertito, [4,0] = clipboard
+                self._export_format = "clipboard" if element_id.endswith("[4,0]") else "file"
+            elif element_id == "wnd[1]/tbar[0]/btn[0]" and self._export_format == "clipboard":
+                self._respond(self._export_to_clipboard)
+            elif element_id == "wnd[1]/tbar[0]/btn[11]":
+                self._respond(self._export_to_file)
+
+    def _respond(self, action, delay: Optional[float] = None) -> None:
+        """
+        Esegue l'azione subito oppure, con latenza, al termine del tempo di risposta simulato
+        (o del tempo indicato)
+        """
+        if delay is None:
+            delay = self.latency if isinstance(self.latency, (int, float)) else self._rng.uniform(*self.latency)
+        if delay <= 0:
+            action()
+            return
+        self.Busy = True
+
+        def complete():
+            with self._lock:
+                try:
+                    action()
+                finally:
+                    self.Busy = False
+
+        timer = threading.Timer(delay, complete)
+        timer.daemon = True
+        timer.start()
+
+    def _start_transaction(self, command: str) -> None:
+        self.findById("wnd[0]/tbar[0]/okcd").text = ""
+        self.findById("wnd[0]/sbar").text = ""
+        # Nuova transazione: i campi della schermata di selezione vengono azzerati
+        for element_id, element in self._elements.items():
+            if element_id.startswith("wnd[0]/usr/"):
+                element.text = ""
+                element.selected = False
+        self._multiple = {}
+        self._intervals = {}
+        self._list_text = None
+        self._layout = None
+        transaction = command.strip().lstrip("/").lstrip("nN").upper()
+        self._transaction = transaction
+        if transaction == "SE16":
+            self.findById("wnd[0]").text = TITLE_SE16_START
+            return
+        self.findById("wnd[0]").text = TITLES[transaction][0] if transaction in TITLES else transaction
+
+    def _open_table(self) -> None:
+        table = self.field("DATABROWSE-TABLENAME").upper()
+        self.findById("wnd[0]").text = f"Data Browser: tabella {table} Videata di selezione"
+
+    def _show_layouts(self) -> None:
+        grid = self.findById(constants.SAP_LAYOUT_GRID)
+        grid.cells = {(row, "VARIANT"): layout for row, layout in enumerate(LAYOUTS)}
+        grid.RowCount = len(LAYOUTS)
+
+    def _paste_clipboard(self) -> List[str]:
+        return [value.strip() for value in self.clipboard.paste().splitlines() if value.strip()]
+
+    def _spec(self) -> dict:
+        return constants.SAP_LIST_TRANSACTIONS.get(self._transaction, constants.SAP_LIST_TRANSACTIONS["IW29"])
+
+    def _selection_dates(self) -> tuple:
+        for name in self._spec()["date_fields"].values():
+            low, high = self.field(f"{name}-LOW"), self.field(f"{name}-HIGH")
+            if low and high:
+                return (datetime.strptime(low, constants.SAP_DATE_FORMAT).date(),
+                        datetime.strptime(high, constants.SAP_DATE_FORMAT).date())
+        today = date.today()
+        return today.replace(day=1), today
+
+    def _selection_prefixes(self) -> List[str]:
+        patterns = self._multiple.get("STRNO") or [self.field("STRNO-LOW")]
+        return [pattern.split("-", 1)[0] for pattern in patterns if pattern] or ["ESW"]
+
+    def _selection_type(self) -> str:
+        """
+        Ricava il tipo di estrazione dai campi valorizzati (come nei nomi dei file dell'estrattore)
+        """
+        spec = self._spec()
+        if self._multiple.get(spec["id_field"]) or self._intervals.get(spec["id_field"]):
+            return f"{spec['tcode']}_Lista"
+        for tipo, name in spec["date_fields"].items():
+            if self.field(f"{name}-LOW"):
+                return f"{spec['tcode']}_{tipo}"
+        return "*"
+
+    def _execute_list(self) -> None:
+        self.executions += 1
+        if self.recordings is not None:
+            self._show_list(self.recordings.next(self._selection_type()))
+            return
+        date_from, date_to = self._selection_dates()
+        spec = self._spec()
+        requested = self._multiple.get(spec["id_field"])
+        intervals = self._intervals.get(spec["id_field"])
+        if requested or intervals:
+            # Con gli intervalli vengono restituiti tutti gli identificativi compresi, anche quelli non richiesti
+            ids = sorted({int(value) for value in requested or [] if value.isdigit()}
+                         | {value for low, high in intervals or [] for value in range(low, high + 1)})
+        else:
+            ids = _reserve_ids(self.rows_per_list, spec["tcode"])
+        self._show_list(generate_sap_list(len(ids), seed=self.seed + self.executions,
+                                          prefixes=self._selection_prefixes(),
+                                          date_from=date_from, date_to=date_to, ids=ids,
+                                          transaction=spec["tcode"]) if ids else None)
+
+    def _execute_table(self) -> None:
+        """
+        Esecuzione SE16 della tabella AFKO: una riga per ogni ordine della selezione I1
+        """
+        self.executions += 1
+        field = constants.AFKO_ORDER_FIELD
+        ids = sorted({int(value) for value in self._multiple.get(field) or [] if value.isdigit()}
+                     | {value for low, high in self._intervals.get(field) or [] for value in range(low, high + 1)})
+        if not ids:
+            self.findById("wnd[0]/sbar").text = constants.AFKO_SBAR_NO_DATA
+            return
+        today = date.today()
+        self._list_text = generate_sap_list(len(ids), wrap_rate=0.0, seed=self.seed + self.executions,
+                                            date_from=today.replace(year=today.year - 1), date_to=today,
+                                            ids=ids, transaction="SE16")
+        self.findById("wnd[0]").text = f"{constants.AFKO_LIST_TITLE} Voci selezionate: {len(ids):>10}"
+
+    def _show_single(self, row: str) -> None:
+        # Colonne della riga: la descrizione può contenere '|', le altre colonne vengono lette dai due estremi
+        spec = self._spec()
+        cells = [cell.strip() for cell in row.split("|")[1:-1]]
+        names = [name for name, _ in LIST_FORMATS[spec["tcode"]][0]]
+        position = names.index("Descrizione")
+        tail = len(names) - position - 1
+        values = dict(zip(names[:position], cells[:position]))
+        values["Descrizione"] = "|".join(cells[position:len(cells) - tail])
+        values.update(zip(names[position + 1:], cells[len(cells) - tail:]))
+        self.findById("wnd[0]").text = TITLES[spec["tcode"]][2]
+        for column, field_id in spec["detail_fields"].items():
+            self.findById(field_id).text = values.get(column, "")
+
+    def _show_list(self, text: Optional[str]) -> None:
+        # Righe dati: righe di tabella escluse l'intestazione e i separatori
+        rows = [line for line in (text or "").splitlines() if line.startswith("|")][1:]
+        if not rows:
+            self.findById("wnd[0]/sbar").text = SBAR_NO_DATA
+            return
+        if len(rows) == 1:
+            self._show_single(rows[0])
+            return
+        self._list_text = text
+        self.findById("wnd[0]").text = TITLES[self._spec()["tcode"]][1]
+
+    def _export_to_clipboard(self) -> None:
+        if self._list_text is None:
+            return
+        self.exports += 1
+        self.clipboard.copy(self._list_text)
+
+    def _export_to_file(self) -> None:
+        if self._list_text is None:
+            return
+        self.exports += 1
+        path = Path(self.findById("wnd[1]/usr/ctxtDY_PATH").text) / self.findById("wnd[1]/usr/ctxtDY_FILENAME").text
+        # Il file non convertito inizia con data e titolo della lista, seguiti dalla tabella
+        with open(path, "w", encoding=constants.SAP_EXPORT_ENCODING, newline="\r\n") as f:
+            title = constants.AFKO_LIST_TITLE if self._transaction == "SE16" else TITLES[self._spec()['tcode']][1]
+            f.write(f"{_sap_date(date.today())}{' ' * 30}{title}{' ' * 10}1\n\n")
+            f.write(self._list_text)
+
+
+class _FakeChildren:
+    """
+    Collezione Children di SAP GUI: richiamabile con l'indice e con l'attributo Count
+    """
+
+    def __init__(self, items: list):
+        self._items = items
+
+    def __call__(self, index: int):
+        return self._items[index]
+
+    @property
+    def Count(self) -> int:
+        return len(self._items)
+
+
+class FakeGuiConnection:
+    """
+    Connessione SAP simulata con le relative sessioni
+    """
+
+    def __init__(self, index: int = 0, clipboard: Optional[FakeClipboard] = None, **session_options):
+        self.Id = f"/app/con[{index}]"
+        self.clipboard = clipboard or FakeClipboard()
+        self.session_options = session_options
+        self._sessions: List[FakeSession] = []
+        self._next_index = 0
+        self._lock = threading.Lock()
+        self.CreateSession()
+
+    @property
+    def Children(self) -> _FakeChildren:
+        return _FakeChildren(list(self._sessions))
+
+    def CreateSession(self) -> None:
+        with self._lock:
+            session = FakeSession(f"{self.Id}/ses[{self._next_index}]", self, seed=self._next_index,
+                                  clipboard=self.clipboard, **self.session_options)
+            self._next_index += 1
+            self._sessions.append(session)
+
+    def CloseSession(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions = [session for session in self._sessions if session.Id != session_id]
+
+
+class FakeScriptingEngine:
+    """
+    Scripting Engine simulato (GuiApplication)
+    """
+
+    def __init__(self, **session_options):
+        self.clipboard = FakeClipboard()
+        self.connections = [FakeGuiConnection(0, self.clipboard, **session_options)]
+
+    @property
+    def Children(self) -> _FakeChildren:
+        return _FakeChildren(self.connections)
+
+    def findById(self, element_id: str):
+        for connection in self.connections:
+            for session in connection._sessions:
+                if element_id == session.Id:
+                    return session
+        raise ValueError(f"Oggetto non trovato: {element_id}")
+
+
+class FakeSAPConnection:
+    """
+    Sostituto di SAP_Connection.SAPGuiConnection basato su FakeScriptingEngine
+    """
+
+    def __init__(self, **session_options):
+        """
+        Args:
+            session_options: Opzioni delle sessioni simulate (es. rows_per_list)
+        """
+        self.engine = FakeScriptingEngine(**session_options)
+        # Clipboard condivisa con le sessioni simulate, da passare a SAPDataExtractor
+        self.clipboard = self.engine.clipboard
+        self.session: Optional[FakeSession] = None
+
+    def connect(self) -> bool:
+        self.session = self.engine.Children(0).Children(0)
+        return True
+
+    def disconnect(self) -> None:
+        self.session = None
+
+    def is_connected(self) -> bool:
+        return self.session is not None
+
+    def get_session(self) -> Optional[FakeSession]:
+        return self.session
+
+    def engine_provider(self) -> FakeScriptingEngine:
+        """
+        Restituisce lo Scripting Engine (utilizzato da SAPSessionPool)
+        """
+        return self.engine
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.disconnect()
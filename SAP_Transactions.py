@@ -1,6 +1,4 @@
 import time
-import pyperclip
-import win32con
 import pandas as pd
 
 from collections import Counter
@@ -10,30 +8,76 @@ import os
 from typing import Dict, Any, Optional
 import logging
 from utils.decorators import error_logger
+from utils.latency import LatencyRecorder
 import DF_Tools
-from PyQt5.QtCore import QObject, pyqtSignal
+import Notification_Store
+from datetime import date, datetime
+import threading
+import uuid
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from PyQt5.QtCore import QDate, QObject, pyqtSignal
+
+# Clipboard di sistema: senza pyperclip (es. su Linux con la sessione simulata) la clipboard va passata all'estrattore
+try:
+    import pyperclip
+except ImportError:
+    pyperclip = None
 
 # Logger specifico per questo modulo
 logger = logging.getLogger("SAPDataExtractor")
 
+# La clipboard è condivisa fra tutte le sessioni SAP: le estrazioni in parallelo la utilizzano una alla volta
+clipboard_lock = threading.RLock()
+
 class SAPDataExtractor(QObject):
     """
     Classe per eseguire estrazioni dati da SAP utilizzando una sessione esistente
     """
 
-    def __init__(self, session, parent=None):
+    def __init__(self, session, parent=None, session_pool=None, clipboard=None, notification_store=None):
         """
         Inizializza la classe con una sessione SAP attiva
         
         Args:
             session: Oggetto sessione SAP attiva
             parent: Oggetto genitore per il sistema di segnali Qt
+            session_pool: Pool di sessioni SAP (SAP_Connection.SAPSessionPool) per le estrazioni in parallelo
+            clipboard: Oggetto con i metodi copy/paste utilizzato per scambiare dati con SAP
+                       (default pyperclip; la sessione simulata SAP_Fake ne fornisce uno proprio)
+            notification_store: Archivio locale degli avvisi (Notification_Store.NotificationStore) creato dal chiamante;
+                                None per gli estrattori senza archivio (es. quelli delle sessioni del pool)
         """
         super().__init__(parent)  # Inizializza QObject
         self.session = session
+        self.session_pool = session_pool
+        self.clipboard = clipboard or pyperclip
         
-        self.tipo_estrazioni = ["Creazione", "Modifica", "Lista"]
+        # Tipi di estrazione di ogni transazione: un'estrazione per ogni campo data e l'estrazione per lista
+        self.tipo_estrazioni = {transaction: [*spec["date_fields"], "Lista"]
+                                for transaction, spec in constants.SAP_LIST_TRANSACTIONS.items()}
+        # Statistiche dei tempi di risposta di SAP (condivise con gli estrattori delle altre sessioni)
+        self.latency = LatencyRecorder()
+        # Esecuzioni SAP effettivamente avviate per transazione (liste IW29/IW39, SE16 AFKO), incluse quelle parallele
+        self.sap_calls = Counter()
+        self._sap_calls_lock = threading.Lock()
+        # Modalità di esportazione della lista SAP ("file" o "clipboard") e directory dei file temporanei
+        self.export_mode = constants.SAP_EXPORT_MODE
+        self.export_dir = constants.SAP_EXPORT_DIR
         self.df_utils = DF_Tools.DataFrameTools()
+        # Modalità batch: un'unica estrazione per tipo con tutti i prefissi nella selezione multipla STRNO
+        self.batch_mode = constants.IW29_BATCH_MODE
+        self.batch_row_cap = constants.IW29_BATCH_ROW_CAP
+        # Numero massimo di avvisi per ogni esecuzione della lista con selezione multipla QMNUM
+        self.list_chunk_size = constants.IW29_LIST_CHUNK_SIZE
+        # Invio delle sequenze dense di avvisi come intervalli della selezione multipla
+        self.range_compression = constants.SAP_RANGE_COMPRESSION
+        # Numero massimo di ordini per ogni esecuzione SE16 della tabella AFKO
+        self.afko_chunk_size = constants.AFKO_CHUNK_SIZE
+        # Richiesta di annullamento, verificata fra un'estrazione e la successiva
+        self.cancel_event = threading.Event()
+        # Archivio locale degli avvisi: l'estrazione "Modifica" interroga SAP solo per gli intervalli mancanti
+        self.notification_store = notification_store
 
     # Definizione aggiornata del segnale nella classe SAPDataExtractor
     logMessage = pyqtSignal(str, str, bool, bool, object, str, tuple, dict)
@@ -71,17 +115,32 @@ class SAPDataExtractor(QObject):
         
         # Emetti il segnale con l'informazione sull'origine
         # Passa origin come parametro aggiuntivo al segnale
-        self.logMessage.emit(message, level, update_status, update_log, min_display_seconds, origin, args, kwargs)
+        # Il messaggio è già formattato: il ricevente non deve formattarlo di nuovo
+        self.logMessage.emit(formatted_message, level, update_status, update_log, min_display_seconds, origin, (), {})
+
+    def cancel(self) -> None:
+        """
+        Richiede l'annullamento delle estrazioni: l'estrazione in corso viene completata,
+        le successive non vengono avviate
+        """
+        self.cancel_event.set()
+
+    def is_cancelled(self) -> bool:
+        """
+        Verifica se è stato richiesto l'annullamento delle estrazioni
+        """
+        return self.cancel_event.is_set()
 
     def copy_values_for_sap_selection(self, values):
         """
         Copia valori formattati nella clipboard per utilizzarli in un campo di selezione multipla SAP.
         
         Args:
-            values: Lista o set di valori da copiare
+            values: Lista o set di valori da copiare; le tuple (minimo, massimo) degli intervalli
+                    vengono copiate come due colonne separate da tabulazione
         """
         try:
-            if values.empty:
+            if len(values) == 0:
                 logger.warning("Nessun valore da copiare")
                 return False
             
@@ -90,10 +149,11 @@ class SAPDataExtractor(QObject):
                 values = list(values)
             
             # Formatta i valori uno per riga (formato accettato da SAP per selezioni multiple)
-            text = '\r\n'.join(str(item) for item in values)
+            text = '\r\n'.join('\t'.join(str(part) for part in item) if isinstance(item, tuple) else str(item)
+                                 for item in values)
             
             # Copia nella clipboard
-            pyperclip.copy(text)
+            self.clipboard.copy(text)
             time.sleep(0.1)
             # Alternativa con win32clipboard
             """
@@ -108,12 +168,178 @@ class SAPDataExtractor(QObject):
         except Exception as e:
             self.log(f"Errore durante la copia nella clipboard: {str(e)}", "error", False, False, 0)
             return False        
+
+    def paste_multiple_selection(self, button_id, values, ranges=None) -> bool:
+        """
+        Apre il popup di selezione multipla associato al pulsante indicato
+        ed incolla i valori (uno per riga) tramite la clipboard.
+        
+        Args:
+            button_id: Id del pulsante che apre la selezione multipla (es. btn%_STRNO_%_APP_%-VALU_PUSH)
+            values: Lista, set o Series di valori da inserire come valori singoli
+            ranges: Lista di tuple (minimo, massimo) da inserire nella scheda degli intervalli
+            
+        Returns:
+            bool: True se i valori sono stati inseriti, False altrimenti
+        """
+        ranges = ranges or []
+        if len(values) == 0 and not ranges:
+            logger.warning("Nessun valore da copiare")
+            return False
+        self.session.findById(button_id).press()
+        self.wait_for_sap(constants.timeoutSeconds, "Selezione multipla")
+        for tab_id, tab_values in ((constants.SAP_SELECTION_TAB_SINGLE, values), (constants.SAP_SELECTION_TAB_INTERVALS, ranges)):
+            if len(tab_values) == 0:
+                continue
+            if tab_values is ranges:
+                self.session.findById(tab_id).select()
+                self.wait_for_sap(constants.timeoutSeconds, "Selezione multipla")
+            # La clipboard è condivisa fra le sessioni solo fino alla lettura dei valori da parte di SAP:
+            # il caricamento nella selezione multipla prosegue senza bloccare le altre sessioni
+            with clipboard_lock:
+                if not self.copy_values_for_sap_selection(tab_values):
+                    return False
+                # Carica da clipboard
+                self.session.findById("wnd[1]/tbar[0]/btn[24]").press()
+            self.wait_for_sap(constants.timeoutSeconds, "Selezione multipla")
+        # Conferma la selezione
+        self.session.findById("wnd[1]/tbar[0]/btn[8]").press()
+        self.wait_for_sap(constants.timeoutSeconds, "Selezione multipla")
+        return True
 # ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
     def extract_IW29(self, dataInizio, dataFine, tech_config, lista_AdM) -> tuple[bool, pd.DataFrame | None]:
+        """
+        Estrae gli avvisi di manutenzione (IW29) creati o modificati nel periodo per i prefissi configurati
+        e gli avvisi della trace OFA
+
+        Args:
+            dataInizio (QDate): Data di inizio
+            dataFine (QDate): Data di fine
+            tech_config (dict): Prefissi configurati per ogni tecnologia
+            lista_AdM: Avvisi della trace OFA (estrazione Lista)
+
+        Returns:
+            tuple: (successo, DataFrame con una riga per Avviso)
+        """
+        return self.extract_list("IW29", dataInizio, dataFine, tech_config, lista_AdM)
+
+    def extract_IW39(self, dataInizio, dataFine, tech_config, lista_OdM) -> tuple[bool, pd.DataFrame | None]:
+        """
+        Estrae gli ordini di manutenzione (IW39) creati, modificati o con inizio cardine nel periodo
+        per i prefissi configurati e gli ordini della trace OFA
+
+        Args:
+            dataInizio (QDate): Data di inizio
+            dataFine (QDate): Data di fine
+            tech_config (dict): Prefissi configurati per ogni tecnologia
+            lista_OdM: Ordini della trace OFA (Series oppure DataFrame con la colonna idItem)
+
+        Returns:
+            tuple: (successo, DataFrame con una riga per Ordine)
+        """
+        if isinstance(lista_OdM, pd.DataFrame):
+            lista_OdM = lista_OdM["idItem"] if "idItem" in lista_OdM.columns else lista_OdM.iloc[:, 0]
+        return self.extract_list("IW39", dataInizio, dataFine, tech_config, lista_OdM)
+
+    def extract_list(self, transaction, dataInizio, dataFine, tech_config, lista_ids) -> tuple[bool, pd.DataFrame | None]:
+        """
+        Motore comune delle estrazioni per lista (IW29, IW39) descritte in constants.SAP_LIST_TRANSACTIONS:
+        un'estrazione per ogni tipo con campo data (per prefisso o in modalità batch), seguita dall'estrazione
+        per lista degli identificativi richiesti e da quelli trovati singolarmente.
+
+        Args:
+            transaction (str): Chiave della transazione in constants.SAP_LIST_TRANSACTIONS (es. 'IW29')
+            dataInizio (QDate): Data di inizio
+            dataFine (QDate): Data di fine
+            tech_config (dict): Prefissi configurati per ogni tecnologia
+            lista_ids: Identificativi da estrarre con la selezione multipla (estrazione Lista)
+
+        Returns:
+            tuple: (successo, DataFrame con una riga per identificativo)
+        """
+        result, frames, _ = self.extract_list_frames(transaction, dataInizio, dataFine, tech_config, lista_ids)
+        if not result:
+            return False, None
+        return self.merge_list_frames(transaction, frames)
+
+    def extract_list_periods(self, transaction, periods, tech_config) -> tuple[bool, list | None]:
+        """
+        Estrazione per lista di più periodi (es. più mesi) con un'unica serie di chiamate SAP:
+        le estrazioni per data vengono eseguite una sola volta sull'intervallo che comprende tutti i periodi
+        e l'estrazione Lista con l'unione degli identificativi; le righe vengono poi assegnate localmente
+        a ogni periodo in base alle colonne data (constants.SAP_LIST_TRANSACTIONS[...]['date_columns'])
+        e agli identificativi del periodo.
+
+        Args:
+            transaction (str): Chiave della transazione in constants.SAP_LIST_TRANSACTIONS (es. 'IW29')
+            periods: Lista di tuple (data inizio, data fine, identificativi dell'estrazione Lista) con date datetime.date
+            tech_config (dict): Prefissi configurati per ogni tecnologia
+
+        Returns:
+            tuple: (successo, lista con un DataFrame per periodo, None se il periodo non ha righe)
+        """
+        spec = constants.SAP_LIST_TRANSACTIONS[transaction]
+        start = min(period[0] for period in periods)
+        end = max(period[1] for period in periods)
+        # identificativi di tutti i periodi, nell'ordine di comparsa
+        lista_ids = list(dict.fromkeys(str(value) for period in periods for value in period[2]))
+        self.log(f"Estrazione {spec['tcode']} di {len(periods)} periodi dal {start:%d.%m.%Y} al {end:%d.%m.%Y}, "
+                 f"{len(lista_ids)} identificativi", "info", True, True, 0)
+        result, frames, single_sources = self.extract_list_frames(
+            transaction, QDate(start.year, start.month, start.day), QDate(end.year, end.month, end.day), tech_config, lista_ids)
+        if not result:
+            return False, None
+        if not frames:
+            return True, [None] * len(periods)
+
+        rows = pd.concat(frames.values(), ignore_index=True)
+        tipo = rows["TipoEstrazione"].astype(object)
+        ids = rows[spec["key"]]
+        is_list = tipo.isin(["Lista", "ListaSingoli"])
+        # tipo dell'estrazione per data in cui gli identificativi dell'estrazione Lista sono stati trovati singolarmente
+        single_tipo = ids.map(single_sources) if single_sources else pd.Series(pd.NA, index=rows.index, dtype=object)
+        results = []
+        for period_start, period_end, period_ids in periods:
+            period_ids = pd.to_numeric(pd.Series(list(period_ids), dtype=object), errors='coerce').dropna().astype('int64')
+            mask = is_list & ids.isin(period_ids)
+            for tipo_estrazione, column in spec["date_columns"].items():
+                in_period = rows[column].between(pd.Timestamp(period_start), pd.Timestamp(period_end))
+                mask |= in_period & (tipo.eq(tipo_estrazione) | (is_list & single_tipo.eq(tipo_estrazione)))
+            mask = mask.to_numpy(dtype=bool)
+            if not mask.any():
+                self.log(f"Nessuna riga {spec['tcode']} per il periodo {period_start:%d.%m.%Y}-{period_end:%d.%m.%Y}",
+                         "warning", True, True, 0)
+                results.append(None)
+                continue
+            result, df = self.merge_list_frames(transaction, {"df_Periodo": rows[mask]}, report=False)
+            if not result:
+                return False, None
+            results.append(df)
+        self.log_latency_report()
+        return True, results
+
+    def extract_list_frames(self, transaction, dataInizio, dataFine, tech_config, lista_ids) -> tuple[bool, dict | None, dict]:
+        """
+        Esegue le estrazioni SAP di extract_list e restituisce le liste estratte prima dell'eliminazione dei duplicati
+
+        Returns:
+            tuple: (successo, dizionario {chiave: DataFrame con la colonna TipoEstrazione},
+                    dizionario {identificativo trovato singolarmente: tipo dell'estrazione per data})
+        """
+        spec = constants.SAP_LIST_TRANSACTIONS[transaction]
+        tcode, key_column = spec["tcode"], spec["key"]
+        tipo_estrazioni = self.tipo_estrazioni[transaction]
         # Crea un dizionario vuoto per memorizzare i DataFrame
-        iw29 = {}
+        frames = {}
         # Inizializzazione di un set per memorizzare dati univoci
         single_value_set = set()
+        # Tipo dell'estrazione per data che ha restituito ogni valore singolo
+        single_sources = {}
+        # Identificativi richiesti nelle estrazioni per lista: filtro delle righe estratte tramite intervalli
+        requested_ids = None
+        # Identificativi dell'estrazione per lista mostrati nella schermata di dettaglio con colonne non leggibili:
+        # vengono estratti di nuovo con una lista
+        detail_fallback_ids = []
         
         # Converti le date in stringhe per riutilizzarle in tutto il metodo
         str_dataInizio = dataInizio.toString("dd.MM.yyyy")  # Formato gg.mm.aaaa
@@ -122,50 +348,70 @@ class SAPDataExtractor(QObject):
         # Funzione interna per gestire il risultato dell'estrazione
         def handle_extraction_result(status_code, result, tipo_estrazione, prefix=None):
             if status_code == 0:  # codice_stato: 0=errore
-                self.log(f"Fallita estrazione IW29 per {prefix or ''} - {tipo_estrazione}", "error", True, True, 0)
+                self.log(f"Fallita estrazione {tcode} per {prefix or ''} - {tipo_estrazione}", "error", True, True, 0)
                 return False
             elif status_code == 1:  # Successo con lista
-                self.log(f"Eseguita estrazione IW29 per {prefix or ''} - {tipo_estrazione}", "success", True, True, 0)
-                # verifico la coerenza delle righe nel risultato (presenza del carattere #)
-                success, fixed_content = self.fix_clipboard_table_content(result)
-                if not success:
-                    self.log(f"Non è stato possibile correggere il contenuto della clipboard.", "error", True, True, 0)
-                    return False                    
+                self.log(f"Eseguita estrazione {tcode} per {prefix or ''} - {tipo_estrazione}", "success", True, True, 0)
                 # La chiave sarà 'df_Creazione', 'df_Modifica', ecc.
                 key = f"df_{tipo_estrazione}{f'_{prefix}' if prefix else ''}"
-                df = self.df_utils.clean_data(fixed_content)
+                # Conversione in un'unica passata: righe spezzate e pipe nella descrizione sono gestite dal parser
+                df = self.parse_exported_list(result)
                 if df is None:
                     self.log(f"DataFrame vuoto per {key}", "error", True, True, 0)
                     return False
+                # conversione delle colonne nei tipi previsti dal layout (numeri, date, categorie)
+                df = self.df_utils.apply_schema(df, spec["layout"])
+                if requested_ids is not None and tipo_estrazione in ("Lista", "ListaSingoli"):
+                    # gli intervalli della selezione possono includere identificativi non richiesti
+                    requested = df[key_column].isin(requested_ids)
+                    if not requested.all():
+                        self.log(f"{int((~requested).sum())} righe non richieste eliminate da {key}", "info", True, True, 0)
+                        df = df[requested].reset_index(drop=True)
                 # aggiungo la colonna con la tipologia di estrazione per tenere traccia
                 df['TipoEstrazione'] = tipo_estrazione
-                iw29[key] = df
+                frames[key] = df
                 self.log(f"DataFrame {key} creato con {len(df)} righe", "success", True, True, 0)
                 return True
             elif status_code == 2:  # Singolo valore
                 self.log(f"Singolo valore trovato per {prefix or ''} - {tipo_estrazione}", "info", True, True, 0)
-                single_value_set.add(result)  # set.add() aggiunge solo se non esiste già
+                if tipo_estrazione in ("Lista", "ListaSingoli"):
+                    # La selezione conteneva gli identificativi da estrarre: la schermata di dettaglio è l'unico risultato
+                    if requested_ids is not None and not requested_ids.isin(pd.to_numeric([result.get(key_column)], errors='coerce')).any():
+                        self.log(f"{key_column} {result.get(key_column)} non richiesto: scartato", "info", True, True, 0)
+                        return True
+                    missing_columns = self.missing_detail_columns(spec["layout"], result)
+                    if missing_columns:
+                        if not result.get(key_column):
+                            self.log(f"{key_column} non leggibile nella schermata di dettaglio", "error", True, True, 0)
+                            return False
+                        # una riga parziale perderebbe i campi utilizzati dai KPI: l'identificativo viene estratto con la lista
+                        self.log(f"Colonne {', '.join(missing_columns)} non leggibili nella schermata di dettaglio: "
+                                 f"{key_column} {result[key_column]} estratto con la lista", "warning", True, True, 0)
+                        detail_fallback_ids.append(str(result[key_column]))
+                        return True
+                    # stesse colonne, nello stesso ordine, di una riga della lista
+                    df = pd.DataFrame([result], columns=constants.SAP_LAYOUT_COLUMNS[spec["layout"]]).replace("", pd.NA)
+                    df = self.df_utils.apply_schema(df, spec["layout"])
+                    df['TipoEstrazione'] = tipo_estrazione
+                    frames[f"df_{tipo_estrazione}{f'_{prefix}' if prefix else ''}"] = df
+                    return True
+                if not result.get(key_column):
+                    self.log(f"{key_column} non leggibile nella schermata di dettaglio", "error", True, True, 0)
+                    return False
+                # L'identificativo viene aggiunto alla successiva estrazione per lista
+                single_value_set.add(result[key_column])  # set.add() aggiunge solo se non esiste già
+                single_id = pd.to_numeric(result[key_column], errors='coerce')
+                if pd.notna(single_id):
+                    single_sources.setdefault(int(single_id), tipo_estrazione)
                 return True
             elif status_code == 3:  # Nessun risultato
                 self.log(f"Nessun dato trovato per {prefix or ''} - {tipo_estrazione}", "info", True, True, 0)
                 return True
             return False
         
-        # Gestisci prima l'estrazione di tipo "Lista", che deve essere eseguita una sola volta
-        if "Lista" in self.tipo_estrazioni:
-            self.log(f"Estrazione IW29_single per tipo 'Lista' con tutti i valori", "info", True, True, 0)
-            # Esegui l'estrazione per il tipo "Lista" senza iterare su tech e prefissi
-            status_code, result = self.extract_IW29_single(str_dataInizio, str_dataFine, "Lista", lista_AdM, "")
-            
-            # Utilizzo della funzione interna per gestire il risultato
-            if not handle_extraction_result(status_code, result, "Lista"):
-                self.log(f"Fallita estrazione IW29_single per 'Lista'", "critical", True, True, 0)
-                return False, None
-        
-        # Itera attraverso le estrazioni, escludendo "Lista" che è già stata gestita
-        for tipo_estrazione in [t for t in self.tipo_estrazioni if t != "Lista"]:
-            self.log(f"Eseguo estrazione: {tipo_estrazione}", "loading", True, True, 0)
-            # Estrazione dati per ogni tecnologia configurata
+        # Funzione interna per costruire un job per ogni prefisso configurato
+        def build_prefix_jobs(tipo_estrazione):
+            jobs = []
             for tech, prefixes in tech_config.items():
                 if not prefixes:
                     self.log(f"Nessun prefisso configurato per {tech}, skip", "warning", True, True, 0)
@@ -175,80 +421,383 @@ class SAPDataExtractor(QObject):
                     if not prefix.strip():
                         self.log(f"Prefisso vuoto per {tech}, skip", "warning", True, True, 0)
                         continue
-                    self.log(f"Estrazione IW29_single per {tech} - {prefix} - {tipo_estrazione}", "loading", True, True, 0)
-                    # Esegui l'estrazione e ottieni una lista di dizionari
-                    status_code, result = self.extract_IW29_single(str_dataInizio, str_dataFine, tipo_estrazione, lista_AdM, prefix)
-                    # Utilizzo della funzione interna per gestire il risultato
-                    if not handle_extraction_result(status_code, result, tipo_estrazione, prefix):
-                        self.log(f"Fallita estrazione IW29_single per {tech} - {prefix} - {tipo_estrazione}", "critical", True, True, 0)
-                        return False, None
+                    jobs.append({"tipo": tipo_estrazione, "prefix": prefix, "label": prefix, "tech": tech})
+            return jobs
+
+        # Funzione interna per eseguire i job e gestirne i risultati nell'ordine di inserimento
+        def process_jobs(jobs):
+            results = self.run_list_jobs(transaction, jobs, str_dataInizio, str_dataFine, lista_ids)
+            if self.is_cancelled():
+                self.log(f"Estrazione {tcode} annullata", "warning", True, True, 0)
+                return False
+            for job, (status_code, result) in zip(jobs, results):
+                if not handle_extraction_result(status_code, result, job["tipo"], job["label"]):
+                    self.log(f"Fallita estrazione {tcode} per {job.get('tech') or ''} - {job['label'] or ''} - {job['tipo']}", "critical", True, True, 0)
+                    return False
+            return True
+
+        # Funzione interna per costruire i job "Modifica" limitati agli intervalli non sincronizzati
+        def build_delta_jobs(windows):
+            jobs = []
+            for (window_start, window_end), prefixes in sorted(windows.items()):
+                str_start = window_start.strftime("%d.%m.%Y")
+                str_end = window_end.strftime("%d.%m.%Y")
+                groups = [prefixes] if self.batch_mode and len(prefixes) > 1 else [[prefix] for prefix in prefixes]
+                for group in groups:
+                    jobs.append({"tipo": "Modifica", "prefix": group if len(group) > 1 else group[0],
+                                 "label": f"{'+'.join(group)} {str_start}-{str_end}",
+                                 "dataInizio": str_start, "dataFine": str_end})
+            return jobs
+
+        # Funzione interna per estrarre con una lista gli identificativi con schermata di dettaglio incompleta:
+        # un identificativo già estratto viene aggiunto alla selezione perché SAP mostri la lista invece del dettaglio
+        def extract_detail_fallback(tipo_lista):
+            fallback_ids = list(dict.fromkeys(detail_fallback_ids))
+            detail_fallback_ids.clear()
+            fallback_index = pd.Index(pd.to_numeric(pd.Series(fallback_ids), errors='coerce').dropna().astype('int64'))
+            extracted = pd.Index([]) if not frames else pd.Index(
+                pd.concat([df[key_column] for df in frames.values()]).dropna().astype('int64').unique())
+            companions = extracted.difference(fallback_index)
+            if len(fallback_ids) < 2 and companions.empty:
+                self.log(f"Nessun {key_column} da aggiungere alla selezione: impossibile estrarre con la lista "
+                         f"{', '.join(fallback_ids)}", "critical", True, True, 0)
+                return False
+            values = fallback_ids + ([str(companions[0])] if len(fallback_ids) < 2 else [])
+            label = "dettaglio incompleto"
+            if not process_jobs([{"tipo": tipo_lista, "prefix": "", "values": values, "label": label,
+                                  "latency_label": f"Estrazione {tcode} {tipo_lista} (blocco)"}]):
+                return False
+            if detail_fallback_ids:
+                self.log(f"Schermata di dettaglio anche per la lista {', '.join(values)}", "critical", True, True, 0)
+                return False
+            key = f"df_{tipo_lista}_{label}"
+            if key in frames:
+                # l'identificativo aggiunto alla selezione è già presente nei risultati
+                frames[key] = frames[key][frames[key][key_column].isin(fallback_index)].reset_index(drop=True)
+            return True
+
+        # Lista di tutti i prefissi validi configurati, utilizzata dalla modalità batch
+        all_prefixes = [prefix.strip() for prefixes in tech_config.values() for prefix in prefixes if prefix.strip()]
+
+        # Costruzione dei job: l'estrazione di tipo "Lista" viene eseguita una sola volta con tutti i valori,
+        # dopo le altre estrazioni per includere anche gli identificativi trovati singolarmente
+        jobs = []
+        batch_tipi = []
+        # Con l'archivio locale l'estrazione "Modifica" è limitata agli intervalli non ancora sincronizzati
+        use_store = spec.get("store", False) and self.notification_store is not None and "Modifica" in tipo_estrazioni
+        delta_windows = {}
+        if use_store:
+            start_date = datetime.strptime(str_dataInizio, "%d.%m.%Y").date()
+            end_date = datetime.strptime(str_dataFine, "%d.%m.%Y").date()
+            for prefix in all_prefixes:
+                for window in self.notification_store.missing_windows(prefix, start_date, end_date):
+                    delta_windows.setdefault(window, []).append(prefix)
+            jobs.extend(build_delta_jobs(delta_windows))
+        for tipo_estrazione in [t for t in tipo_estrazioni if t != "Lista" and not (use_store and t == "Modifica")]:
+            if self.batch_mode and len(all_prefixes) > 1:
+                # Estrazione batch: tutti i prefissi in un'unica selezione multipla STRNO
+                jobs.append({"tipo": tipo_estrazione, "prefix": all_prefixes, "label": None})
+                batch_tipi.append(tipo_estrazione)
+            else:
+                # Estrazione dati per ogni tecnologia configurata
+                jobs.extend(build_prefix_jobs(tipo_estrazione))
+
+        self.log(f"Eseguo {len(jobs)} estrazioni {tcode}", "loading", True, True, 0)
+        if not process_jobs(jobs):
+            return False, None, {}
+
+        # Se un risultato batch supera il limite di righe ripeto l'estrazione per singolo prefisso
+        fallback_jobs = []
+        for tipo_estrazione in batch_tipi:
+            key = f"df_{tipo_estrazione}"
+            if key in frames and len(frames[key]) > self.batch_row_cap:
+                self.log(f"Estrazione batch {tipo_estrazione} con {len(frames[key])} righe oltre il limite di {self.batch_row_cap}: eseguo l'estrazione per prefisso", "warning", True, True, 0)
+                del frames[key]
+                fallback_jobs.extend(build_prefix_jobs(tipo_estrazione))
+        if fallback_jobs and not process_jobs(fallback_jobs):
+            return False, None, {}
         
-        # verifico al termine dei cicli se la lista contenente i valori singoli è vuota
-        if len(single_value_set) == 0:
+        if self.is_cancelled():
+            self.log(f"Estrazione {tcode} annullata", "warning", True, True, 0)
+            return False, None, {}
+
+        # Gli identificativi trovati singolarmente (schermata di dettaglio) sono aggiunti all'estrazione per lista:
+        # nessuna chiamata SAP aggiuntiva quando l'estrazione "Lista" è prevista
+        if single_value_set:
+            self.log(f"{len(single_value_set)} valori singoli trovati: aggiunti all'estrazione per lista", "info", True, True, 0)
+        else:
             self.log(f"Nessun valore singolo trovato", "info", True, True, 0)
-        # Se rilevo un solo valore allora ne prelevo uno fra quelli già presente nel df per eseguire la estrazione di un lista
-        # il valore verrà poi eliminato come duplicato
-        elif len(single_value_set) == 1:
-            self.log(f"Un solo valore singolo trovato: {next(iter(single_value_set))}", "info", True, True, 0)
-            # prelevo un Avviso dalla collezione dei df
-            avviso_singolo = None
-            for key, df in iw29.items():
-                if not df.empty and "Avviso" in df.columns:
-                    # Prendi il primo avviso disponibile e interrompi il ciclo
-                    avviso_singolo = df["Avviso"].iloc[0]
-                    break
-            if avviso_singolo:
-                single_value_set.add(avviso_singolo)
-        
-        # verifico che la lista dei valori singoli contenga più di un valore    
-        if len(single_value_set) > 1:
-            # Converto il set in una lista
-            list_value = list(single_value_set)
-            # ripeto l'estrazione per i valori risultanti
-            status_code, result = self.extract_IW29_single(str_dataInizio, str_dataFine, "ListaSingoli", list_value, None)
-            # Utilizzo della funzione interna per gestire il risultato
-            if not handle_extraction_result(status_code, result, "ListaSingoli"):
-                self.log(f"Fallita estrazione IW29 ListaSingoli", "critical", True, True, 0)
-                return False, None
-        
+        list_values = dict.fromkeys(str(value) for value in lista_ids) if "Lista" in tipo_estrazioni else {}
+        list_values = list(list_values) + [value for value in single_value_set if value not in list_values]
+        if list_values:
+            tipo_lista = "Lista" if "Lista" in tipo_estrazioni else "ListaSingoli"
+            entries = list_values
+            if self.range_compression:
+                # sequenze dense di identificativi inviate come intervalli, le righe non richieste vengono poi eliminate
+                singles, ranges = self.df_utils.compress_id_ranges(list_values, constants.SAP_RANGE_MIN_IDS,
+                                                                   constants.SAP_RANGE_MAX_GAP)
+                entries = singles + ranges
+                requested_ids = pd.Index(pd.to_numeric(pd.Series(list_values), errors='coerce').dropna().astype('int64'))
+                self.log(f"Selezione di {len(list_values)} valori {spec['id_field']} ridotta a {len(singles)} valori singoli e "
+                         f"{len(ranges)} intervalli", "info", True, True, 0)
+            chunks = self.split_selection_values(entries, self.list_chunk_size)
+            if len(chunks) > 1:
+                self.log(f"Estrazione {tipo_lista} di {len(list_values)} valori suddivisa in {len(chunks)} blocchi "
+                         f"(massimo {self.list_chunk_size} valori per blocco)", "info", True, True, 0)
+            list_jobs = [{"tipo": tipo_lista, "prefix": "", "values": chunk,
+                          "label": f"blocco {index}/{len(chunks)}" if len(chunks) > 1 else None,
+                          "latency_label": f"Estrazione {tcode} {tipo_lista} (blocco)"}
+                         for index, chunk in enumerate(chunks, start=1)]
+            if not process_jobs(list_jobs):
+                return False, None, {}
+            if detail_fallback_ids and not extract_detail_fallback(tipo_lista):
+                return False, None, {}
+            if tipo_lista == "Lista" and single_sources:
+                # Gli identificativi trovati singolarmente e non richiesti sono estratti insieme alla Lista:
+                # le loro righe mantengono il tipo "ListaSingoli", come con l'estrazione dedicata
+                requested = pd.to_numeric(pd.Series(list(lista_ids), dtype=object), errors='coerce')
+                singles_only = pd.Index(list(single_sources)).difference(requested.dropna().astype('int64'))
+                for key in [key for key in frames if key.startswith("df_Lista")]:
+                    is_single = frames[key][key_column].isin(singles_only).to_numpy(dtype=bool)
+                    if is_single.any():
+                        frames[key].loc[is_single, 'TipoEstrazione'] = "ListaSingoli"
+
+        # Aggiorna l'archivio con tutte le righe estratte (chiave Avviso) e sostituisce i risultati "Modifica"
+        # con tutte le righe dell'intervallo richiesto presenti nell'archivio
+        if use_store:
+            upserted = sum(self.notification_store.upsert(df) for df in frames.values())
+            for key in [key for key in frames if key.startswith("df_Modifica")]:
+                del frames[key]
+            for (window_start, window_end), prefixes in delta_windows.items():
+                self.notification_store.mark_synced(prefixes, window_start, window_end)
+            df_store = self.notification_store.load(all_prefixes, start_date, end_date)
+            if df_store is not None:
+                df_store['TipoEstrazione'] = "Modifica"
+                frames["df_Modifica"] = df_store
+            self.log(f"Archivio avvisi: {len(delta_windows)} intervalli estratti da SAP, {upserted} righe aggiornate, "
+                     f"{0 if df_store is None else len(df_store)} righe modificate nel periodo", "info", True, True, 0)
+
+        return True, frames, single_sources
+
+    def merge_list_frames(self, transaction, frames: dict, report: bool = True) -> tuple[bool, pd.DataFrame | None]:
+        """
+        Unisce le liste estratte (extract_list_frames) mantenendo una riga per identificativo
+
+        Args:
+            transaction (str): Chiave della transazione in constants.SAP_LIST_TRANSACTIONS
+            frames: Dizionario {chiave: DataFrame con la colonna TipoEstrazione}
+            report: Se True registra il riepilogo dei tempi SAP
+
+        Returns:
+            tuple: (successo, DataFrame con una riga per identificativo)
+        """
+        spec = constants.SAP_LIST_TRANSACTIONS[transaction]
+        tcode, key_column = spec["tcode"], spec["key"]
         # Se il dizionario di DataFrame è vuoto, restituisci False
-        if not iw29:
+        if not frames:
             self.log(f"Nessun DataFrame creato", "critical", True, True, 0)
             return False, None
         
         # Concatena tutti i DataFrame in un unico DataFrame
         self.log(f"Creazione unico DF", "info", True, True, 0)
-        result_df = pd.concat(iw29.values(), ignore_index=True) if iw29 else None
-        # Rimuovi le righe duplicate
-        result_df = result_df.drop_duplicates()
-        self.log(f"Eliminazione duplicati", "info", True, True, 0)
-        self.log(f"Estrazione IW29 terminata", "success", True, True, 0)
+        result_df = pd.concat(frames.values(), ignore_index=True)
+        # Rimuovi i duplicati: una riga per identificativo, scelta secondo la priorità del tipo di estrazione
+        total_rows = len(result_df)
+        result_df = self.df_utils.dedupe_by_key(result_df, key_column, "TipoEstrazione",
+                                                spec["precedence"], constants.IW29_SOURCES_COLUMN)
+        # la colonna è stata aggiunta come stringa ad ogni DataFrame: la converto una sola volta dopo l'unione
+        result_df['TipoEstrazione'] = result_df['TipoEstrazione'].astype('category')
+        self.log(f"Eliminazione duplicati: {total_rows - len(result_df)} righe rimosse, {len(result_df)} righe {key_column}", "info", True, True, 0)
+        if report:
+            self.log_latency_report()
+        self.log(f"Estrazione {tcode} terminata", "success", True, True, 0)
         return True, result_df
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+    def estimate_list_calls(self, transaction, start_date: date, end_date: date, tech_config, lista_ids) -> int:
+        """
+        Stima il numero di esecuzioni della lista SAP di extract_list per un periodo, con le stesse regole
+        di costruzione dei job (modalità batch, archivio avvisi, intervalli e blocchi della selezione).
+        Non sono considerate le estrazioni ripetute per prefisso oltre self.batch_row_cap.
+
+        Args:
+            transaction (str): Chiave della transazione in constants.SAP_LIST_TRANSACTIONS
+            start_date: Data di inizio
+            end_date: Data di fine
+            tech_config (dict): Prefissi configurati per ogni tecnologia
+            lista_ids: Identificativi dell'estrazione Lista
+
+        Returns:
+            int: Numero di esecuzioni della lista
+        """
+        spec = constants.SAP_LIST_TRANSACTIONS[transaction]
+        tipo_estrazioni = self.tipo_estrazioni[transaction]
+        all_prefixes = [prefix.strip() for prefixes in tech_config.values() for prefix in prefixes if prefix.strip()]
+        batch = self.batch_mode and len(all_prefixes) > 1
+        date_tipi = [tipo for tipo in tipo_estrazioni if tipo != "Lista"]
+        calls = 0
+        if spec.get("store", False) and self.notification_store is not None and "Modifica" in date_tipi:
+            date_tipi.remove("Modifica")
+            windows = {}
+            for prefix in all_prefixes:
+                for window in self.notification_store.missing_windows(prefix, start_date, end_date):
+                    windows.setdefault(window, []).append(prefix)
+            calls += sum(1 if self.batch_mode and len(prefixes) > 1 else len(prefixes) for prefixes in windows.values())
+        calls += len(date_tipi) * (1 if batch else len(all_prefixes))
+        return calls + self.estimate_selection_calls(lista_ids, self.list_chunk_size)
+
+    def estimate_selection_calls(self, values, chunk_size: int) -> int:
+        """
+        Numero di blocchi della selezione multipla per gli identificativi indicati (intervalli compresi)
+        """
+        values = list(dict.fromkeys(str(value) for value in values))
+        if not values:
+            return 0
+        if self.range_compression:
+            singles, ranges = self.df_utils.compress_id_ranges(values, constants.SAP_RANGE_MIN_IDS, constants.SAP_RANGE_MAX_GAP)
+            values = singles + ranges
+        return len(self.split_selection_values(values, chunk_size))
+
+    def estimate_AFKO_calls(self, orders) -> int:
+        """
+        Stima il numero di esecuzioni SE16 di extract_AFKO: gli ordini già presenti nell'archivio non sono richiesti a SAP
+        """
+        orders = pd.Index(pd.to_numeric(pd.Series(list(orders), dtype=object), errors='coerce').dropna()
+                          .astype('int64').unique())
+        if self.notification_store is not None:
+            orders = orders.difference(self.notification_store.order_starts(orders).index)
+        return self.estimate_selection_calls(orders.tolist(), self.afko_chunk_size)
+
+    @staticmethod
+    def split_selection_values(values: list, chunk_size: int) -> list:
+        """
+        Suddivide i valori di una selezione multipla in blocchi di dimensione simile,
+        ciascuno con al massimo chunk_size valori
+        
+        Args:
+            values: Valori da suddividere
+            chunk_size: Numero massimo di valori per blocco (0 = nessuna suddivisione)
+            
+        Returns:
+            list: Lista di blocchi (liste di valori)
+        """
+        if chunk_size <= 0 or len(values) <= chunk_size:
+            return [list(values)]
+        # blocchi bilanciati: si evita un ultimo blocco con pochi valori (un solo valore apre la schermata di dettaglio)
+        count = -(-len(values) // chunk_size)
+        size, remainder = divmod(len(values), count)
+        chunks, start = [], 0
+        for index in range(count):
+            end = start + size + (1 if index < remainder else 0)
+            chunks.append(list(values[start:end]))
+            start = end
+        return chunks
+
+    def run_list_jobs(self, transaction, jobs, dataInizio, dataFine, lista_ids) -> list:
+        """
+        Esegue una lista di estrazioni extract_list_single indipendenti.
+        Se è disponibile un pool di sessioni SAP i job vengono distribuiti in parallelo
+        sulle sessioni del pool, altrimenti vengono eseguiti in sequenza sulla sessione principale.
+        
+        Args:
+            transaction (str): Chiave della transazione in constants.SAP_LIST_TRANSACTIONS
+            jobs: Lista di dizionari con le chiavi 'tipo' (tipo di estrazione) e 'prefix' (prefisso o lista di prefissi);
+                le chiavi opzionali 'dataInizio'/'dataFine' sostituiscono l'intervallo comune,
+                la chiave opzionale 'values' sostituisce lista_ids,
+                la chiave opzionale 'latency_label' indica l'operazione con cui registrare il tempo del job
+            dataInizio (str): Data di inizio nel formato 'dd.MM.yyyy'
+            dataFine (str): Data di fine nel formato 'dd.MM.yyyy'
+            lista_ids: Lista degli identificativi per le estrazioni di tipo Lista
+            
+        Returns:
+            list: Lista di tuple (codice_stato, dati) nello stesso ordine dei job
+                  (i job non avviati per annullamento restituiscono codice 0)
+        """
+        default_label = f"Estrazione {constants.SAP_LIST_TRANSACTIONS[transaction]['tcode']} completa"
+        if self.session_pool is None or len(self.session_pool) < 2 or len(jobs) < 2:
+            results = []
+            for job in jobs:
+                if self.is_cancelled():
+                    results.append((0, "Estrazione annullata"))
+                    continue
+                self.count_sap_call(transaction)
+                with self.latency.measure(job.get("latency_label", default_label)):
+                    results.append(self.extract_list_single(transaction, job.get("dataInizio", dataInizio), job.get("dataFine", dataFine),
+                                                            job["tipo"], job.get("values", lista_ids), job["prefix"]))
+            return results
+
+        self.log(f"Distribuzione di {len(jobs)} estrazioni su {len(self.session_pool)} sessioni SAP", "info", True, True, 0)
+        with ThreadPoolExecutor(max_workers=len(self.session_pool)) as executor:
+            futures = [executor.submit(self._run_list_job_on_pool, transaction, job, dataInizio, dataFine, lista_ids, default_label)
+                       for job in jobs]
+            return [future.result() for future in futures]
+
+    def count_sap_call(self, name: str) -> None:
+        """
+        Registra un'esecuzione SAP avviata (thread-safe: i job del pool sono conteggiati dai thread secondari)
+        """
+        with self._sap_calls_lock:
+            self.sap_calls[name] += 1
+
+    def _run_list_job_on_pool(self, transaction, job, dataInizio, dataFine, lista_ids, default_label) -> tuple[int, str | None]:
+        """
+        Esegue un singolo job su una sessione prelevata dal pool (eseguito in un thread secondario)
+        """
+        try:
+            with self.session_pool.session() as session:
+                # Estrattore dedicato alla sessione del thread, i log vengono registrati solo nel logger di modulo
+                worker = SAPDataExtractor(session, clipboard=self.clipboard)
+                worker.latency = self.latency
+                worker.cancel_event = self.cancel_event
+                worker.export_mode = self.export_mode
+                worker.export_dir = self.export_dir
+                if worker.is_cancelled():
+                    return 0, "Estrazione annullata"
+                self.count_sap_call(transaction)
+                with self.latency.measure(job.get("latency_label", default_label)):
+                    return worker.extract_list_single(transaction, job.get("dataInizio", dataInizio), job.get("dataFine", dataFine),
+                                                      job["tipo"], job.get("values", lista_ids), job["prefix"])
+        except Exception as e:
+            logger.error(f"Errore nell'esecuzione del job {job['tipo']} - {job.get('label') or ''}: {str(e)}")
+            return 0, str(e)
 # ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
     def extract_IW29_single(self, dataInizio, dataFine, tipo_estrazione, lista_AdM, prefix=None) -> tuple[int, str | None]:
         """
-        Estrae dati relativi agli avvisi di manutenzione utilizzando la transazione IW29
+        Esegue una singola estrazione IW29 (vedi extract_list_single)
+        """
+        return self.extract_list_single("IW29", dataInizio, dataFine, tipo_estrazione, lista_AdM, prefix)
+
+    def extract_list_single(self, transaction, dataInizio, dataFine, tipo_estrazione, lista_ids, prefix=None) -> tuple[int, str | None]:
+        """
+        Esegue una singola estrazione per lista (IW29, IW39) secondo la descrizione in constants.SAP_LIST_TRANSACTIONS
 
         Args:
+            transaction (str): Chiave della transazione (es. 'IW29')
             dataInizio (str): Data di inizio nel formato 'dd.MM.yyyy'
             dataFine (str): Data di fine nel formato 'dd.MM.yyyy'
-            tipo_estrazione (str): Tipo di estrazione (Creazione, Modifica, Lista)
-            prefix (str, optional): Prefisso che indica l'impianto da considerare.        
+            tipo_estrazione (str): Tipo di estrazione (un tipo con campo data, es. Creazione o Modifica, oppure Lista)
+            lista_ids: Identificativi per l'estrazione di tipo Lista; le tuple (minimo, massimo) sono intervalli
+            prefix (str | list, optional): Prefisso che indica l'impianto da considerare.
+                Se è una lista, tutti i prefissi vengono inseriti nella selezione multipla STRNO (modalità batch).
             
         Returns:
             tuple: (codice_stato, dati) dove:
                 - codice_stato: 0=errore, 1=successo con lista, 2=singolo valore, 3=nessun risultato
-                - dati: lista di dizionari o messaggio di errore
+                - dati: percorso del file esportato (Path), contenuto della clipboard, campi del singolo risultato (dict)
+                  o messaggio di errore
 
         Raises:
             DataReturnedError: Errori durante l'estrazione dei dati
             ConnectionError: Se ci sono problemi di connessione con SAP
         """       
+        spec = constants.SAP_LIST_TRANSACTIONS[transaction]
+        tcode = spec["tcode"]
         try:
-            # Svuota la clipboard prima dell'estrazione
+            # Svuota la clipboard prima dell'estrazione (solo se la lista viene esportata nella clipboard)
             # Svuota la clipboard copiando una stringa vuota
-            pyperclip.copy("")
-            time.sleep(0.1)
+            if self.export_mode == "clipboard":
+                with clipboard_lock:
+                    self.clipboard.copy("")
+                    time.sleep(0.1)
             # Alternativa con win32clipboard
             """ 
             win32clipboard.OpenClipboard()
@@ -256,141 +805,92 @@ class SAPDataExtractor(QObject):
             win32clipboard.CloseClipboard()
              """
             #self.session.findById("wnd[0]").resizeWorkingPane(173, 49, False)
-            self.session.findById("wnd[0]/tbar[0]/okcd").text = "/nIW29"
+            self.session.findById("wnd[0]/tbar[0]/okcd").text = f"/n{tcode}"
             self.session.findById("wnd[0]").sendVKey(0)
+            self.wait_for_sap(constants.timeoutSeconds, "Avvio transazione")
         # tutti gli stati
-            self.session.findById("wnd[0]/usr/chkDY_OFN").selected = True
-            self.session.findById("wnd[0]/usr/chkDY_IAR").selected = True
-            self.session.findById("wnd[0]/usr/chkDY_RST").selected = True
-            self.session.findById("wnd[0]/usr/chkDY_MAB").selected = True
-        # elimino data avviso
+            for checkbox in spec["status_checkboxes"]:
+                self.session.findById(f"wnd[0]/usr/chk{checkbox}").selected = True
+        # elimino il periodo
             self.session.findById("wnd[0]/usr/ctxtDATUV").text = ""
             self.session.findById("wnd[0]/usr/ctxtDATUB").text = ""
-            #self.session.findById("wnd[0]/usr/ctxtDATUB").setFocus()
-            #self.session.findById("wnd[0]/usr/ctxtDATUB").caretPosition = 0
-        # tipologia avvisi            
-            self.session.findById("wnd[0]/usr/btn%_QMART_%_APP_%-VALU_PUSH").press()
-            time.sleep(0.25)
-            self.session.findById("wnd[1]/usr/tabsTAB_STRIP/tabpSIVA/ssubSCREEN_HEADER:SAPLALDB:3010/tblSAPLALDBSINGLE/ctxtRSCSEL_255-SLOW_I[1,0]").text = "Z1"
-            self.session.findById("wnd[1]/usr/tabsTAB_STRIP/tabpSIVA/ssubSCREEN_HEADER:SAPLALDB:3010/tblSAPLALDBSINGLE/ctxtRSCSEL_255-SLOW_I[1,1]").text = "Z2"
-            self.session.findById("wnd[1]/usr/tabsTAB_STRIP/tabpSIVA/ssubSCREEN_HEADER:SAPLALDB:3010/tblSAPLALDBSINGLE/ctxtRSCSEL_255-SLOW_I[1,2]").text = "Z3"
-            self.session.findById("wnd[1]/usr/tabsTAB_STRIP/tabpSIVA/ssubSCREEN_HEADER:SAPLALDB:3010/tblSAPLALDBSINGLE/ctxtRSCSEL_255-SLOW_I[1,3]").text = "Z4"
-            self.session.findById("wnd[1]/usr/tabsTAB_STRIP/tabpSIVA/ssubSCREEN_HEADER:SAPLALDB:3010/tblSAPLALDBSINGLE/ctxtRSCSEL_255-SLOW_I[1,4]").text = "Z5"
-            #self.session.findById("wnd[1]/usr/tabsTAB_STRIP/tabpSIVA/ssubSCREEN_HEADER:SAPLALDB:3010/tblSAPLA++++LDBSINGLE/ctxtRSCSEL_255-SLOW_I[1,4]").setFocus()
-            self.session.findById("wnd[1]/tbar[0]/btn[8]").press()
-            # rimuovo il valore dal data avviso
+        # selezioni fisse (es. tipologia avvisi)
+            for field, values in spec["fixed_selections"].items():
+                self.set_fixed_selection(field, values)
+            # rimuovo il valore dal periodo
             self.session.findById("wnd[0]/usr/ctxtDATUB").text = ""
             self.session.findById("wnd[0]/usr/ctxtDATUV").text = ""
 
-
-            if (tipo_estrazione == "Creazione"):
-                if(prefix == None):
-                    raise ValueError("Atteso un prefisso per l'estrazione di tipo Creazione")
-                # Sede tecnica    WSB
-                self.session.findById("wnd[0]/usr/ctxtSTRNO-LOW").text = f"{prefix}-++++*"                
-                # Data Creazione - inizio e fine mese
-                self.session.findById("wnd[0]/usr/ctxtERDAT-LOW").text = dataInizio 
-                self.session.findById("wnd[0]/usr/ctxtERDAT-HIGH").text =  dataFine
-                # Data Modifica - inizio e fine mese
-                self.session.findById("wnd[0]/usr/ctxtAEDAT-LOW").text = ""
-                self.session.findById("wnd[0]/usr/ctxtAEDAT-HIGH").text = ""
-            elif (tipo_estrazione == "Modifica"):
-                # Sede tecnica    WSB
-                self.session.findById("wnd[0]/usr/ctxtSTRNO-LOW").text = f"{prefix}-++++*"
-                # Data Creazione - inizio e fine mese
-                self.session.findById("wnd[0]/usr/ctxtERDAT-LOW").text = "" 
-                self.session.findById("wnd[0]/usr/ctxtERDAT-HIGH").text =  ""
-                # Data Modifica - inizio e fine mese
-                self.session.findById("wnd[0]/usr/ctxtAEDAT-LOW").text = dataInizio
-                self.session.findById("wnd[0]/usr/ctxtAEDAT-HIGH").text = dataFine
+            date_fields = spec["date_fields"]
+            if tipo_estrazione in date_fields:
+                if not prefix:
+                    raise ValueError(f"Atteso un prefisso per l'estrazione di tipo {tipo_estrazione}")
+                # Sede tecnica
+                self.set_STRNO_selection(prefix)
+                # Solo il campo data del tipo di estrazione è valorizzato (inizio e fine periodo)
+                for tipo, field in date_fields.items():
+                    self.session.findById(f"wnd[0]/usr/ctxt{field}-LOW").text = dataInizio if tipo == tipo_estrazione else ""
+                    self.session.findById(f"wnd[0]/usr/ctxt{field}-HIGH").text = dataFine if tipo == tipo_estrazione else ""
             elif (tipo_estrazione == "Lista") or (tipo_estrazione == "ListaSingoli"):
                 # Copia i valori della lista nella clipboard per l'uso in SAP
-                if len(lista_AdM) == 0:
-                    self.log("Nessun valore nella lista AdM da copiare nella clipboard", "critical", True, True, 0)
-                    raise ValueError("Nessun valore nella lista AdM da copiare nella clipboard")
-                else:
-                    if not(self.copy_values_for_sap_selection(lista_AdM)):
-                        self.log("Errore durante la copia dei valori nella clipboard", "critical", True, True, 0)
-                        raise ValueError("Errore durante la copia dei valori nella clipboard")
-                self.log("Valori singoli copiati nella clipboard per SAP", "info", True, True, 0)
+                if len(lista_ids) == 0:
+                    self.log(f"Nessun valore {spec['id_field']} da copiare nella clipboard", "critical", True, True, 0)
+                    raise ValueError(f"Nessun valore {spec['id_field']} da copiare nella clipboard")
 
                 self.session.findById("wnd[0]/usr/ctxtSTRNO-LOW").text = ""                
-                self.session.findById("wnd[0]/usr/ctxtDATUV").text = ""
-                self.session.findById("wnd[0]/usr/ctxtDATUB").text = ""
-                self.session.findById("wnd[0]/usr/ctxtAEDAT-LOW").text = ""
-                self.session.findById("wnd[0]/usr/ctxtAEDAT-HIGH").text = ""
-                # incollo i valori nella clipboard
-                self.session.findById("wnd[0]/usr/btn%_QMNUM_%_APP_%-VALU_PUSH").press()
-                time.sleep(0.25)
-                self.session.findById("wnd[1]/tbar[0]/btn[24]").press()
-                time.sleep(0.25)
-                self.session.findById("wnd[1]/tbar[0]/btn[8]").press()
-                time.sleep(0.25)
+                for field in date_fields.values():
+                    self.session.findById(f"wnd[0]/usr/ctxt{field}-LOW").text = ""
+                    self.session.findById(f"wnd[0]/usr/ctxt{field}-HIGH").text = ""
+                # incollo i valori nella clipboard: il tempo di caricamento cresce con il numero di valori
+                # (le tuple (minimo, massimo) sono inserite nella scheda degli intervalli)
+                ranges = [value for value in lista_ids if isinstance(value, tuple)]
+                singles = [value for value in lista_ids if not isinstance(value, tuple)]
+                start_time = time.perf_counter()
+                with self.latency.measure(f"Selezione multipla {spec['id_field']}"):
+                    pasted = self.paste_multiple_selection(f"wnd[0]/usr/btn%_{spec['id_field']}_%_APP_%-VALU_PUSH", singles, ranges)
+                if not pasted:
+                    self.log("Errore durante la copia dei valori nella clipboard", "critical", True, True, 0)
+                    raise ValueError("Errore durante la copia dei valori nella clipboard")
+                elapsed = time.perf_counter() - start_time
+                self.log(f"{len(singles)} valori singoli e {len(ranges)} intervalli inseriti nella selezione multipla "
+                         f"in {elapsed:.2f} s ({elapsed * 1000 / len(lista_ids):.1f} ms per valore)", "info", True, True, 0)
             else:
                 raise ValueError(f"Tipo di estrazione non valido: {tipo_estrazione}")
             #self.session.findById("wnd[0]").sendVKey(0)
 
         # Layout
 
-            self.session.findById("wnd[0]/usr/ctxtVARIANT").text = "/KPIOFANO2"
+            self.session.findById("wnd[0]/usr/ctxtVARIANT").text = spec["layout"]
             #self.session.findById("wnd[0]/usr/ctxtVARIANT").setFocus()
             #self.session.findById("wnd[0]/usr/ctxtVARIANT").caretPosition = 10
             #self.session.findById("wnd[0]").sendVKey(0)
 
         # Esegui
 
+            # Stato della schermata prima dell'esecuzione, per rilevare il cambio di finestra o di status bar
+            previous_state = self.sap_state()
             self.session.findById("wnd[0]/tbar[1]/btn[8]").press()
             # Attendi che SAP sia pronto
-            if not self.wait_for_sap(30):
-                msg = "Timeout durante l'esecuzione della transazione SAP IW29"
+            if not self.wait_for_sap(30, "Esecuzione lista", previous_state):
+                msg = f"Timeout durante l'esecuzione della transazione SAP {tcode}"
                 self.log(msg, "warning", True, True, 0)
                 return 0, msg # codice_stato: 0=errore, 1=successo con lista, 2=singolo valore, 3=nessun risultato
-            time.sleep(0.5)
             # Verifico che siano stati estratti dei dati
             if self.session.findById("wnd[0]/sbar").text == "Non sono stati selezionati oggetti":
                 msg =  "Nessun dato trovato"
                 self.log(msg, "warning", True, True, 0)
                 return 3, msg # codice_stato: 0=errore, 1=successo con lista, 2=singolo valore, 3=nessun risultato
+            title = self.session.findById("wnd[0]").text
             # Verifico se è stato estratto un solo valore
-            if self.session.findById("wnd[0]").text == "Visualizzare avviso PM: Segnalazione guasto":
+            if title.startswith(spec["single_title"]):
                 msg = "Un solo valore trovato"
                 self.log(msg, "info", True, True, 0)
-                AdM = self.session.findById("wnd[0]/usr/subSCREEN_1:SAPLIQS0:1050/txtVIQMEL-QMNUM").text
-                return 2, AdM # codice_stato: 0=errore, 1=successo con lista, 2=singolo valore, 3=nessun risultato            
-            if (self.session.findById("wnd[0]").text == "Visualizzare avvisi: lista avvisi"):      # Titolo della finestra
-                # Salvo i dati nella clipboard
-                self.session.findById("wnd[0]/mbar/menu[0]/menu[11]/menu[2]").select()
-                time.sleep(0.25)
-                self.session.findById("wnd[1]/usr/subSUBSCREEN_STEPLOOP:SAPLSPO5:0150/sub:SAPLSPO5:0150/radSPOPLI-SELFLAG[4,0]").select()
-                time.sleep(0.25)
-                self.session.findById("wnd[1]/usr/subSUBSCREEN_STEPLOOP:SAPLSPO5:0150/sub:SAPLSPO5:0150/radSPOPLI-SELFLAG[4,0]").setFocus()
-                time.sleep(0.25)
-                # Svuota la clipboard per rilevare la corretta scrittura di nuovi dati
-                try:
-                    self.log(f"Elimino il contenuto della clipboard", "info", False, False, 0)
-                    pyperclip.copy("")
-                    time.sleep(0.1)
-                except Exception as e:
-                    self.log(f"Errore durante lo svuotamento della clipboard: {str(e)}", "error", True, True, 0)
-                    return 0, e
-                self.session.findById("wnd[1]/tbar[0]/btn[0]").press()
-                # Attendi che SAP sia pronto
-                if not self.wait_for_sap(30):
-                    msg = "Timeout durante il caricamento dei dati nella clipboard"
-                    self.log(msg, "error", True, True, 0)
-                    return 0, msg # codice_stato: 0=errore, 1=successo con lista, 2=singolo valore, 3=nessun risultato
-                time.sleep(1)
-                # Attendi che la clipboard sia riempita
-                if not self.wait_for_write_clipboard_data(30):
-                    # Gestisci il caso in cui non sono stati trovati dati
-                    msg = "Errore durante il caricamento dei dati nella clipboard"
-                    self.log(msg, "error", True, True, 0)
-                    return 0, msg # codice_stato: 0=errore, 1=successo con lista, 2=singolo valore, 3=nessun risultato
-                # Leggo il contenuto della clipboard
-                data = pyperclip.paste() # Il tipo di dato è una stringa
-                if data: #
-                    self.log("Dati prelevati dalla clipboard", "info", True, True, 0)
-                    return 1, data
+                return 2, self.read_detail_fields(spec["detail_fields"]) # codice_stato: 0=errore, 1=successo con lista, 2=singolo valore, 3=nessun risultato            
+            if title == spec["list_title"]:      # Titolo della finestra
+                # Esporto la lista in un file locale oppure, in alternativa, nella clipboard
+                if self.export_mode == "file":
+                    return self.export_list_to_file(f"{tcode}_{tipo_estrazione}_{uuid.uuid4().hex}.txt")
+                return self.export_list_to_clipboard()
             # Se arriviamo qui, la condizione della finestra non è stata riconosciuta
             msg = "Stato SAP non riconosciuto"
             self.log(msg, "error", True, True, 0)
@@ -398,41 +898,462 @@ class SAPDataExtractor(QObject):
             
         except Exception as e:
             # Gestione generale degli errori
-            msg = (f"Errore nell'estrazione IW29_single: {str(e)}")
+            msg = (f"Errore nell'estrazione {tcode}: {str(e)}")
+            self.log(msg, "error", True, True, 0)
+            return 0, str(e)
+
+    def set_fixed_selection(self, field, values) -> None:
+        """
+        Inserisce i valori indicati come valori singoli nel popup di selezione multipla del campo
+        
+        Args:
+            field: Nome del campo (es. 'QMART')
+            values: Valori da inserire, uno per riga della tabella
+        """
+        self.session.findById(f"wnd[0]/usr/btn%_{field}_%_APP_%-VALU_PUSH").press()
+        self.wait_for_sap(constants.timeoutSeconds, "Selezione multipla")
+        for row, value in enumerate(values):
+            self.session.findById(f"{constants.SAP_SELECTION_TAB_SINGLE}/ssubSCREEN_HEADER:SAPLALDB:3010/tblSAPLALDBSINGLE/ctxtRSCSEL_255-SLOW_I[1,{row}]").text = value
+        self.session.findById("wnd[1]/tbar[0]/btn[8]").press()
+        self.wait_for_sap(constants.timeoutSeconds, "Selezione multipla")
+
+    def read_detail_fields(self, fields: dict) -> dict:
+        """
+        Legge dalla schermata di dettaglio (un solo risultato) i campi indicati
+        (es. constants.IW29_DETAIL_FIELDS)
+        
+        Args:
+            fields: {colonna del layout: id del campo}
+            
+        Returns:
+            dict: {colonna del layout: valore}; i campi non presenti nella schermata sono esclusi
+                  (vedi missing_detail_columns)
+        """
+        detail = {}
+        for column, field_id in fields.items():
+            try:
+                detail[column] = self.session.findById(field_id).text.strip()
+            except Exception as e:
+                logger.warning(f"Campo {field_id} ({column}) non disponibile nella schermata di dettaglio: {str(e)}")
+        return detail
+
+    @staticmethod
+    def missing_detail_columns(layout: str, detail: dict) -> list:
+        """
+        Colonne della lista (constants.SAP_LAYOUT_COLUMNS) assenti nella riga letta dalla schermata di dettaglio:
+        una riga di dettaglio è utilizzabile solo se ha le stesse colonne di una riga della lista
+        """
+        return [column for column in constants.SAP_LAYOUT_COLUMNS[layout] if column not in detail]
+
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+    def extract_AFKO(self, lista_OdM) -> tuple[bool, pd.Series | None]:
+        """
+        Restituisce la data inizio cardine degli ordini (SE16, tabella AFKO, layout constants.AFKO_LAYOUT).
+        Gli ordini già risolti nelle estrazioni precedenti vengono letti dall'archivio locale,
+        i rimanenti vengono richiesti a SAP in blocchi di al massimo self.afko_chunk_size ordini
+        e memorizzati nell'archivio.
+
+        Args:
+            lista_OdM: Ordini da risolvere (Series, lista oppure DataFrame con la colonna idItem)
+
+        Returns:
+            tuple: (successo, Serie Ordine (int64) -> Inizio card. (datetime64)); gli ordini non presenti in AFKO sono esclusi
+        """
+        if isinstance(lista_OdM, pd.DataFrame):
+            lista_OdM = lista_OdM["idItem"] if "idItem" in lista_OdM.columns else lista_OdM.iloc[:, 0]
+        orders = pd.Index(pd.to_numeric(pd.Series(list(lista_OdM), dtype=object), errors='coerce').dropna()
+                          .astype('int64').unique()).sort_values()
+        cached = (self.notification_store.order_starts(orders) if self.notification_store is not None
+                  else Notification_Store.NotificationStore.empty_order_starts())
+        missing = orders.difference(cached.index)
+        self.log(f"Inizio cardine di {len(orders)} ordini: {len(cached)} dall'archivio, {len(missing)} da estrarre da SAP",
+                 "info", True, True, 0)
+
+        frames = []
+        if len(missing):
+            entries = missing.tolist()
+            if self.range_compression:
+                # sequenze dense di ordini inviate come intervalli: gli ordini non richiesti vengono comunque archiviati
+                singles, ranges = self.df_utils.compress_id_ranges(entries, constants.SAP_RANGE_MIN_IDS,
+                                                                   constants.SAP_RANGE_MAX_GAP)
+                entries = singles + ranges
+            chunks = self.split_selection_values(entries, self.afko_chunk_size)
+            for index, chunk in enumerate(chunks, start=1):
+                if self.is_cancelled():
+                    self.log("Estrazione AFKO annullata", "warning", True, True, 0)
+                    return False, None
+                self.count_sap_call("AFKO")
+                with self.latency.measure("Estrazione AFKO (blocco)"):
+                    status_code, result = self.extract_AFKO_single(chunk)
+                if status_code == 0:
+                    self.log(f"Fallita estrazione AFKO per il blocco {index}/{len(chunks)}", "critical", True, True, 0)
+                    return False, None
+                if status_code == 3:
+                    self.log(f"Nessun ordine trovato in AFKO per il blocco {index}/{len(chunks)}", "info", True, True, 0)
+                    continue
+                df = self.parse_exported_list(result)
+                if df is None or constants.AFKO_ORDER_COLUMN not in df.columns or constants.AFKO_START_COLUMN not in df.columns:
+                    self.log(f"Lista AFKO non valida per il blocco {index}/{len(chunks)} (layout {constants.AFKO_LAYOUT})",
+                             "error", True, True, 0)
+                    return False, None
+                df = self.df_utils.apply_schema(df, constants.AFKO_LAYOUT)
+                frames.append(df[[constants.AFKO_ORDER_COLUMN, constants.AFKO_START_COLUMN]])
+                self.log(f"Estrazione AFKO blocco {index}/{len(chunks)}: {len(df)} ordini", "success", True, True, 0)
+
+        if frames:
+            df_afko = pd.concat(frames, ignore_index=True).drop_duplicates(constants.AFKO_ORDER_COLUMN)
+            fetched = df_afko.set_index(constants.AFKO_ORDER_COLUMN)[constants.AFKO_START_COLUMN]
+            if self.notification_store is not None:
+                self.notification_store.store_order_starts(fetched)
+            fetched = fetched[fetched.index.isin(missing)]
+        else:
+            fetched = Notification_Store.NotificationStore.empty_order_starts()
+        result = pd.concat([cached, fetched]).sort_index()
+        self.log(f"Estrazione AFKO terminata: inizio cardine di {len(result)} ordini, "
+                 f"{len(orders) - len(result)} ordini non trovati", "success", True, True, 0)
+        return True, result
+
+    def extract_AFKO_single(self, orders) -> tuple[int, str | None]:
+        """
+        Esegue una singola estrazione SE16 della tabella AFKO per gli ordini indicati
+
+        Args:
+            orders: Ordini da inserire nella selezione multipla; le tuple (minimo, massimo) sono intervalli
+
+        Returns:
+            tuple: (codice_stato, dati) dove:
+                - codice_stato: 0=errore, 1=successo con lista, 3=nessun risultato
+                - dati: percorso del file esportato (Path), contenuto della clipboard o messaggio di errore
+        """
+        try:
+            self.session.findById("wnd[0]/tbar[0]/okcd").text = "/nSE16"
+            self.session.findById("wnd[0]").sendVKey(0)
+            self.wait_for_sap(constants.timeoutSeconds, "Avvio transazione")
+            self.session.findById("wnd[0]/usr/ctxtDATABROWSE-TABLENAME").text = constants.AFKO_TABLE
+            self.session.findById("wnd[0]").sendVKey(0)
+            self.wait_for_sap(constants.timeoutSeconds, "Avvio transazione")
+
+            # ordini nella selezione multipla del campo AUFNR, nessun limite al numero di righe
+            self.session.findById(f"wnd[0]/usr/ctxt{constants.AFKO_ORDER_FIELD}-LOW").text = ""
+            ranges = [value for value in orders if isinstance(value, tuple)]
+            singles = [value for value in orders if not isinstance(value, tuple)]
+            with self.latency.measure("Selezione multipla AUFNR"):
+                pasted = self.paste_multiple_selection(f"wnd[0]/usr/btn%_{constants.AFKO_ORDER_FIELD}_%_APP_%-VALU_PUSH",
+                                                       singles, ranges)
+            if not pasted:
+                raise ValueError("Errore durante l'inserimento degli ordini nella selezione multipla")
+            self.session.findById("wnd[0]/usr/txtMAX_SEL").text = constants.AFKO_MAX_SEL
+
+            # Esegui
+            previous_state = self.sap_state()
+            self.session.findById("wnd[0]/tbar[1]/btn[8]").press()
+            if not self.wait_for_sap(30, "Esecuzione lista", previous_state):
+                msg = "Timeout durante l'esecuzione della transazione SAP SE16"
+                self.log(msg, "warning", True, True, 0)
+                return 0, msg
+            if self.session.findById("wnd[0]/sbar").text == constants.AFKO_SBAR_NO_DATA:
+                return 3, "Nessun dato trovato"
+            if not " ".join(self.session.findById("wnd[0]").text.split()).startswith(constants.AFKO_LIST_TITLE):
+                msg = "Stato SAP non riconosciuto"
+                self.log(msg, "error", True, True, 0)
+                return 0, msg
+
+            # Layout con le sole colonne Ordine e Inizio cardine
+            if not self.select_list_layout(constants.AFKO_LAYOUT):
+                msg = f"Layout {constants.AFKO_LAYOUT} non trovato"
+                self.log(msg, "error", True, True, 0)
+                return 0, msg
+            if self.export_mode == "file":
+                return self.export_list_to_file(f"AFKO_{uuid.uuid4().hex}.txt")
+            return self.export_list_to_clipboard()
+
+        except Exception as e:
+            msg = f"Errore nell'estrazione AFKO: {str(e)}"
             self.log(msg, "error", True, True, 0)
             return 0, str(e)
 
+    def select_list_layout(self, layout: str) -> bool:
+        """
+        Seleziona un layout salvato della lista visualizzata (popup "Selezionare layout")
+
+        Args:
+            layout: Nome del layout (es. '/OFAKPIWO')
+
+        Returns:
+            bool: True se il layout è stato selezionato, False se non è presente nel popup
+        """
+        self.session.findById("wnd[0]/tbar[1]/btn[33]").press()
+        self.wait_for_sap(constants.timeoutSeconds, "Selezione layout")
+        grid = self.session.findById(constants.SAP_LAYOUT_GRID)
+        for row in range(grid.RowCount):
+            if grid.GetCellValue(row, "VARIANT") == layout:
+                grid.currentCellRow = row
+                grid.selectedRows = str(row)
+                grid.clickCurrentCell()
+                self.wait_for_sap(constants.timeoutSeconds, "Selezione layout")
+                return True
+        self.session.findById("wnd[1]/tbar[0]/btn[12]").press()
+        return False
+
+    def export_list_to_clipboard(self) -> tuple[int, str | None]:
+        """
+        Esporta la lista visualizzata nella clipboard e ne restituisce il contenuto
+        
+        Returns:
+            tuple: (codice_stato, dati) dove:
+                - codice_stato: 0=errore, 1=successo con lista
+                - dati: contenuto della clipboard o messaggio di errore
+        """
+        # La clipboard è condivisa con le altre sessioni: l'esportazione avviene in modo esclusivo
+        with clipboard_lock:
+            # Salvo i dati nella clipboard
+            self.session.findById("wnd[0]/mbar/menu[0]/menu[11]/menu[2]").select()
+            self.wait_for_sap(constants.timeoutSeconds, "Esportazione lista")
+            self.session.findById("wnd[1]/usr/subSUBSCREEN_STEPLOOP:SAPLSPO5:0150/sub:SAPLSPO5:0150/radSPOPLI-SELFLAG[4,0]").select()
+            self.session.findById("wnd[1]/usr/subSUBSCREEN_STEPLOOP:SAPLSPO5:0150/sub:SAPLSPO5:0150/radSPOPLI-SELFLAG[4,0]").setFocus()
+            # Svuota la clipboard per rilevare la corretta scrittura di nuovi dati
+            try:
+                self.log(f"Elimino il contenuto della clipboard", "info", False, False, 0)
+                self.clipboard.copy("")
+                time.sleep(0.1)
+            except Exception as e:
+                self.log(f"Errore durante lo svuotamento della clipboard: {str(e)}", "error", True, True, 0)
+                return 0, e
+            self.session.findById("wnd[1]/tbar[0]/btn[0]").press()
+            # Attendi che SAP sia pronto
+            if not self.wait_for_sap(30, "Esportazione lista"):
+                msg = "Timeout durante il caricamento dei dati nella clipboard"
+                self.log(msg, "error", True, True, 0)
+                return 0, msg # codice_stato: 0=errore, 1=successo con lista, 2=singolo valore, 3=nessun risultato
+            # Attendi che la clipboard sia riempita
+            if not self.wait_for_write_clipboard_data(30):
+                # Gestisci il caso in cui non sono stati trovati dati
+                msg = "Errore durante il caricamento dei dati nella clipboard"
+                self.log(msg, "error", True, True, 0)
+                return 0, msg # codice_stato: 0=errore, 1=successo con lista, 2=singolo valore, 3=nessun risultato
+            # Leggo il contenuto della clipboard
+            data = self.clipboard.paste() # Il tipo di dato è una stringa
+            if data: #
+                self.log("Dati prelevati dalla clipboard", "info", True, True, 0)
+                return 1, data
+        msg = "Nessun dato presente nella clipboard"
+        self.log(msg, "error", True, True, 0)
+        return 0, msg
+
+    def export_list_to_file(self, file_name: str) -> tuple[int, Path | str]:
+        """
+        Esporta la lista visualizzata in un file locale non convertito nella directory temporanea
+        dell'estrattore. Evita il passaggio dalla clipboard, condivisa con l'utente e con le altre sessioni.
+        
+        Args:
+            file_name: Nome del file da creare
+            
+        Returns:
+            tuple: (codice_stato, dati) dove:
+                - codice_stato: 0=errore, 1=successo con lista
+                - dati: percorso del file esportato (Path) o messaggio di errore
+        """
+        os.makedirs(self.export_dir, exist_ok=True)
+        file_path = Path(self.export_dir) / file_name
+        if file_path.exists():
+            file_path.unlink()
+        # Elenco > Salva > File locale
+        self.session.findById("wnd[0]/mbar/menu[0]/menu[11]/menu[2]").select()
+        self.wait_for_sap(constants.timeoutSeconds, "Esportazione lista")
+        # Formato non convertito
+        self.session.findById("wnd[1]/usr/subSUBSCREEN_STEPLOOP:SAPLSPO5:0150/sub:SAPLSPO5:0150/radSPOPLI-SELFLAG[0,0]").select()
+        self.session.findById("wnd[1]/tbar[0]/btn[0]").press()
+        self.wait_for_sap(constants.timeoutSeconds, "Esportazione lista")
+        # Directory, nome e codifica del file
+        self.session.findById("wnd[1]/usr/ctxtDY_PATH").text = str(self.export_dir)
+        self.session.findById("wnd[1]/usr/ctxtDY_FILENAME").text = file_name
+        self.session.findById("wnd[1]/usr/ctxtDY_FILE_ENCODING").text = constants.SAP_EXPORT_ENCODING_CODE
+        # Sostituisci
+        self.session.findById("wnd[1]/tbar[0]/btn[11]").press()
+        # Attendi che SAP sia pronto
+        if not self.wait_for_sap(30, "Esportazione lista"):
+            msg = "Timeout durante l'esportazione della lista nel file locale"
+            self.log(msg, "error", True, True, 0)
+            return 0, msg
+        # Attendi che il file sia stato scritto completamente
+        if not self.wait_for_export_file(file_path, 30):
+            msg = f"File esportato non trovato: {file_path}"
+            self.log(msg, "error", True, True, 0)
+            return 0, msg
+        self.log(f"Lista esportata nel file {file_path.name}", "info", True, True, 0)
+        return 1, file_path
+
+    def parse_exported_list(self, result) -> pd.DataFrame | None:
+        """
+        Converte in DataFrame la lista esportata da SAP in un'unica passata sulle righe
+        
+        Args:
+            result: Percorso del file esportato (Path) oppure contenuto della clipboard
+            
+        Returns:
+            DataFrame Pandas oppure None in caso di errore
+        """
+        if isinstance(result, Path):
+            # Lista esportata su file: il contenuto viene letto riga per riga dal disco
+            try:
+                return self.df_utils.parse_sap_list(self.iter_exported_file(result))
+            finally:
+                self.remove_exported_file(result)
+        return self.df_utils.parse_sap_list(self.df_utils.iter_lines(result))
+
+    def wait_for_export_file(self, file_path: Path, timeout: int = 30) -> bool:
+        """
+        Attende che il file esportato da SAP esista e che la sua dimensione sia stabile
+        
+        Args:
+            file_path: Percorso del file atteso
+            timeout: Tempo massimo di attesa in secondi
+            
+        Returns:
+            bool: True se il file è stato scritto, False se è scaduto il timeout
+        """
+        start_time = time.time()
+        last_size = -1
+        while time.time() - start_time <= timeout:
+            if file_path.exists():
+                size = file_path.stat().st_size
+                if size > 0 and size == last_size:
+                    return True
+                last_size = size
+            time.sleep(0.1)
+        return False
+
+    def iter_exported_file(self, file_path: Path):
+        """
+        Legge riga per riga il file esportato da SAP senza caricarlo interamente in memoria.
+        Le righe che precedono la tabella (titolo, data, ecc.) vengono scartate, così il contenuto
+        ha la stessa struttura di quello copiato nella clipboard.
+        
+        Args:
+            file_path: Percorso del file esportato
+            
+        Yields:
+            str: Righe della tabella senza terminatori di riga
+        """
+        table_started = False
+        with open(file_path, "r", encoding=constants.SAP_EXPORT_ENCODING, errors="replace") as f:
+            for line in f:
+                line = line.rstrip("\r\n")
+                if not table_started:
+                    # La tabella inizia con la prima riga di trattini
+                    if not line.startswith("-"):
+                        continue
+                    table_started = True
+                yield line
+
+    def remove_exported_file(self, file_path: Path) -> None:
+        """
+        Elimina il file temporaneo esportato da SAP (mantenuto in modalità debug)
+        """
+        if constants.DEBUG_MODE:
+            return
+        try:
+            file_path.unlink()
+        except OSError as e:
+            logger.warning(f"Impossibile eliminare il file temporaneo {file_path}: {str(e)}")
+
+    def set_STRNO_selection(self, prefix) -> None:
+        """
+        Imposta la selezione della sede tecnica (STRNO) a partire da uno o più prefissi.
+        Con un solo prefisso viene valorizzato il campo STRNO-LOW, con più prefissi
+        i pattern vengono incollati nel popup di selezione multipla.
+        
+        Args:
+            prefix: Prefisso singolo (str) oppure lista di prefissi
+        
+        Raises:
+            ValueError: Se non è stato possibile inserire i valori nella selezione multipla
+        """
+        prefixes = [prefix] if isinstance(prefix, str) else list(prefix)
+        patterns = [f"{p}-++++*" for p in prefixes]
+        if len(patterns) == 1:
+            self.session.findById("wnd[0]/usr/ctxtSTRNO-LOW").text = patterns[0]
+            return
+        self.session.findById("wnd[0]/usr/ctxtSTRNO-LOW").text = ""
+        if not self.paste_multiple_selection("wnd[0]/usr/btn%_STRNO_%_APP_%-VALU_PUSH", patterns):
+            raise ValueError("Errore durante l'inserimento dei prefissi nella selezione multipla STRNO")
+
 # ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
-    def wait_for_sap(self, timeout: int = 30):  # timeout in secondi
+    def sap_state(self) -> tuple[str, str]:
         """
-        Attende che SAP finisca le operazioni in corso
+        Restituisce lo stato corrente della schermata SAP (titolo della finestra e testo della status bar)
+        
+        Returns:
+            tuple: (titolo finestra, testo status bar)
+        """
+        return (self.session.findById("wnd[0]").text, self.session.findById("wnd[0]/sbar").text)
+
+    def wait_for_sap(self, timeout: int = 30, label: str = "Attesa SAP", previous_state: tuple | None = None):  # timeout in secondi
+        """
+        Attende che SAP finisca le operazioni in corso.
+        Il controllo è adattivo: l'intervallo fra due verifiche parte da SAP_WAIT_INITIAL_DELAY e raddoppia
+        fino a SAP_WAIT_MAX_DELAY, così le operazioni rapide non pagano un'attesa fissa.
+        Se viene indicato lo stato precedente, l'attesa prosegue finché il titolo della finestra
+        o la status bar non cambiano (al massimo per SAP_WAIT_CHANGE_TIMEOUT secondi dopo che SAP è libero).
+        Ogni attesa viene registrata in self.latency distinguendo il tempo SAP dall'attesa in eccesso.
         
         Args:
             timeout: Tempo massimo di attesa in secondi
+            label: Nome dell'operazione per le statistiche di latenza
+            previous_state: Stato della schermata (sap_state) prima dell'azione
         
         Returns:
             bool: True se SAP è diventato disponibile, False se è scaduto il timeout
         """
-        start_time = time.time()
+        start_time = time.perf_counter()
+        delay = constants.SAP_WAIT_INITIAL_DELAY
+        last_delay = 0.0
+        polls = 0
+        idle_since = None
         
         try:
-            while self.session.Busy:
+            while True:
+                now = time.perf_counter()
+                if not self.session.Busy:
+                    if previous_state is None or self.sap_state() != previous_state:
+                        break
+                    # SAP è libero ma la schermata non è ancora cambiata
+                    if idle_since is None:
+                        idle_since = now
+                    elif now - idle_since > constants.SAP_WAIT_CHANGE_TIMEOUT:
+                        break
+                else:
+                    idle_since = None
+                    
                 # Verifica timeout
-                if time.time() - start_time > timeout:
+                if now - start_time > timeout:
                     msg = (f"Timeout dopo {timeout} secondi di attesa")
                     self.log(msg, "error", True, True, 0)
+                    self.latency.record(label, now - start_time, 0.0, polls)
                     return False
                     
-                time.sleep(0.5)
-                print("SAP is busy")
+                time.sleep(delay)
+                last_delay = delay
+                polls += 1
+                delay = min(delay * 2, constants.SAP_WAIT_MAX_DELAY)
             
+            # L'ultimo intervallo di attesa è il limite superiore del tempo perso dopo che SAP era pronto
+            elapsed = time.perf_counter() - start_time
+            self.latency.record(label, max(elapsed - last_delay, 0.0), last_delay, polls)
             return True
             
         except Exception as e:
             msg = (f"Errore durante l'attesa: {str(e)}")
             self.log(msg, "error", True, True, 0)
             return False
+
+    def log_latency_report(self) -> None:
+        """
+        Registra nel log il riepilogo dei tempi SAP raccolti durante l'estrazione
+        """
+        for line in self.latency.report_lines():
+            self.log(f"Tempi SAP - {line}", "info", False, True, 0)
             
     def wait_for_write_clipboard_data(self, timeout: int = 30) -> bool:
         """
@@ -460,7 +1381,7 @@ class SAPDataExtractor(QObject):
             
             try:
                 # Controlla il contenuto della clipboard
-                data = pyperclip.paste()
+                data = self.clipboard.paste()
                 
                 # Verifica se ci sono dati nella clipboard
                 if data and data.strip():
@@ -481,116 +1402,6 @@ class SAPDataExtractor(QObject):
                 time.sleep(0.5)  # Attesa più lunga in caso di errore
                 continue 
 
-# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
-    
-    def fix_clipboard_table_content(self, result: str) -> tuple[bool, str]:
-        """
-        Elabora il contenuto della tabella proveniente dalla clipboard.
-        A partire dalla quarta riga, verifica che ogni riga inizi con il carattere '|'.
-        Se una riga non inizia con '|', unisce il suo contenuto alla riga precedente.
-        
-        Args:
-            result: Il contenuto della clipboard da elaborare
-            
-        Returns:
-            tuple: (successo, contenuto_elaborato)
-                - successo (bool): True se l'elaborazione è andata a buon fine, False altrimenti
-                - contenuto_elaborato (str): Il contenuto elaborato se successo, altrimenti il contenuto originale
-        """
-        try:
-            # Dividi il testo in righe
-            lines = result.split('\n')
-            # Conta il numero di righe
-            num_lines = len(lines)
-            
-            # Verifica se ci sono almeno 4 righe
-            if len(lines) < 4:
-                msg = ("Il contenuto ha meno di 4 righe. Impossibile procedere.")
-                self.log(msg, "error", True, True, 0)
-                return False, result
-            
-            # Preserva le prime 3 righe
-            processed_lines = lines[:3]
-            
-            # Rilevo quanti "|" sono presenti nella seconda riga (intestazione), nella righe seguenti non possono essercene meno
-            expected_pipes = lines[1].count('|')
-
-            # Contatore delle sostituzioni
-            replacements_count = 0
-            
-            # Elabora a partire dalla quarta riga
-            i = 3
-            while i < len(lines):
-                current_line = lines[i]
-                # verifico il numero di pipe presente nella riga corrente
-                current_pipes = current_line.count('|')
-                # Verifica se la riga inizia con '|' e se contiene meno pipe del previsto
-                if (not current_line.startswith('|')) and (current_pipes < expected_pipes):
-                    # Verifica se c'è una riga precedente da modificare
-                    if i > 0 and len(processed_lines) > 0:
-                        prev_line = processed_lines[-1]
-                        
-                        # Trova l'ultima occorrenza di '|' nella riga precedente
-                        last_pipe_index = prev_line.rfind('|')
-                        
-                        if last_pipe_index != -1:
-                            # Estrai la parte iniziale fino all'ultimo '|'
-                            prefix = prev_line[:last_pipe_index + 1]
-                            
-                            # Unisci con la riga corrente
-                            merged_line = prefix + current_line.strip()
-
-                            # verifico che il numero di "|" sia coerente
-                            merged_pipes = merged_line.count('|')
-                            if merged_pipes < expected_pipes:
-                                msg = (f"Attenzione: il numero di '|' non è coerente nella riga unita: {merged_line}")
-                                self.log(msg, "error", True, True, 0)
-                                return False, msg
-                            else: # se in lnumero di pipe è maggiore o uguale allora la riga, presumibilmente, è corretta.
-                                # La sostituisco alla riga
-                                processed_lines[-2] = merged_line
-                                # Elimino la riga corrente
-                                processed_lines.pop()
-                                # Incrementa il contatore delle sostituzioni
-                                replacements_count += 1
-                        else:
-                            # Se non troviamo '|' nella riga precedente allora genera un errore
-                            msg = (f"Errore: non è possibile unire la riga corrente '{current_line}' con una riga precedente.")
-                            self.log(msg, "error", True, True, 0)
-                            return False, msg
-                    else:
-                        # Se non c'è una riga precedente allora genera un errore
-                        msg = (f"Errore: non è possibile unire la riga corrente '{current_line}' con una riga precedente.")
-                        self.log(msg, "error", True, True, 0)
-                        return False, msg
-
-                else:
-                    # La riga inizia con '|' ed ha una lunghezza coerente, aggiungila normalmente
-                    processed_lines.append(current_line)
-                
-                # Passa alla riga successiva
-                i += 1
-            
-            # Ricostruisci il testo elaborato
-            processed_result = '\n'.join(processed_lines)
-            # Conta il numero di righe
-            processed_result_lines = len(processed_lines)
-
-            
-            # Stampa il numero di sostituzioni
-            msg = (f"Elaborazione completata. Sono state eseguite {replacements_count} sostituzioni.")
-            self.log(msg, "success", True, True, 0)
-            # Stampa il numero di sostituzioni
-            msg = (f"Righe iniziali: {num_lines} - Righe finali: {processed_result_lines}.")
-            self.log(msg, "success", True, True, 0)            
-            # Restituisci il risultato dell'elaborazione
-            return True, processed_result
-            
-        except Exception as e:
-            msg = (f"Errore durante l'elaborazione del contenuto: {str(e)}")
-            self.log(msg, "error", True, True, 0)
-            return False, msg
-
 """ 
 def main():
 
@@ -0,0 +1,176 @@
+"""
+Benchmark del calcolo dei KPI OFA (modulo kpi) su un anno di dati sintetici: avvisi IW29 e ordini IW39
+generati dalla simulazione SAP, inizio cardine degli ordini e trace delle azioni degli utenti OFA.
+
+Vengono misurate anche le fasi della trace OFA indicizzata (ofa_trace.OFATrace): normalizzazione,
+collegamento con le estrazioni SAP e KPI per utente e per azione.
+Il calcolo vettoriale viene confrontato con un'implementazione di riferimento riga per riga
+(su un sottoinsieme dei dati) per verificare che i risultati siano identici.
+
+Esecuzione (dalla cartella del progetto):
+    python -m benchmarks.bench_kpi
+    python -m benchmarks.bench_kpi --notifications 600000 --orders 300000 --actions 1500000
+"""
+import argparse
+import time
+from collections import defaultdict
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+import Config.constants as constants
+import kpi
+from ofa_trace import OFATrace
+from DF_Tools import DataFrameTools
+from SAP_Fake import generate_sap_list
+
+YEAR_START = date(2024, 1, 1)
+YEAR_END = date(2024, 12, 31)
+
+
+def synthetic_list(rows: int, transaction: str, layout: str, first_id: int, prefixes: list, seed: int) -> pd.DataFrame:
+    text = generate_sap_list(rows, wrap_rate=0.0, seed=seed, prefixes=prefixes, date_from=YEAR_START,
+                             date_to=YEAR_END, ids=range(first_id, first_id + rows), transaction=transaction)
+    return DataFrameTools.apply_schema(DataFrameTools.parse_sap_list(DataFrameTools.iter_lines(text)), layout)
+
+
+def synthetic_trace(actions: int, notifications: pd.Series, orders: pd.Series, prefixes: list, seed: int) -> pd.DataFrame:
+    """
+    Trace OFA sintetica: azioni su avvisi (anche con suffisso), ordini con operazione e id non presenti in SAP,
+    distribuite sull'anno
+    """
+    rng = np.random.default_rng(seed)
+    kind = rng.random(actions)
+    notification_ids = rng.choice(notifications.to_numpy(), actions)
+    order_ids = rng.choice(orders.to_numpy(), actions)
+    ids = np.where(kind < 0.6, notification_ids, np.where(kind < 0.9, order_ids, 1100000000 + rng.integers(0, 10 ** 6, actions)))
+    id_item = pd.Series(ids, dtype=object)
+    suffixed = kind > 0.97
+    id_item[suffixed] = id_item[suffixed].astype(str) + "-A"
+    users = np.array([f"U{index:05d}" for index in range(2000)])
+    prefix = rng.choice(np.array(prefixes), actions)
+    action_names = np.array(["DETAIL PTW", "DETAIL WORK ORDER", "DETAIL NOTIFICATION", "CREATE WORKORDER",
+                             "CREATE NOTIFICATION", "CREATE TIME CONFERMATION", "WORKORDER UPDATE TECO"])
+    seconds = rng.integers(0, 366 * 86400, actions)
+    return pd.DataFrame({
+        "user": rng.choice(users, actions),
+        "creationDate": (pd.Timestamp(YEAR_START) + pd.to_timedelta(seconds, unit="s")).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+        "country": pd.Series(prefix).str[:2].astype("category"),
+        "tecnology": pd.Series(prefix).str[2].astype("category"),
+        "action": pd.Series(rng.choice(action_names, actions)).astype("category"),
+        "idItem": id_item,
+    })
+
+
+def reference_kpi(df_IW29, df_IW39, df_ofa, tech_config, start, end) -> pd.DataFrame:
+    """
+    Implementazione di riferimento riga per riga dei KPI per prefisso
+    """
+    prefix_to_tech = {prefix: tech for tech, prefixes in tech_config.items() for prefix in prefixes}
+    notification_ids, order_ids = set(), set()
+    for value in df_ofa["idItem"]:
+        text = str(value).split("-")[0].split("/")[0].strip()
+        if text.isdigit():
+            number = int(text)
+            if len(text) == constants.KPI_NOTIFICATION_DIGITS and number < constants.OdM_THRESHOLD:
+                notification_ids.add(number)
+            elif number > constants.OdM_THRESHOLD:
+                order_ids.add(number)
+    counts = defaultdict(lambda: dict.fromkeys(kpi.COUNT_COLUMNS, 0))
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    for avviso, sede, legacy, planned_start in zip(df_IW29["Avviso"], df_IW29["Sede tecnica"], df_IW29["Sis.Legacy"],
+                                                   df_IW29[constants.AFKO_START_COLUMN]):
+        prefix = str(sede).split("-")[0]
+        group = counts[(prefix_to_tech.get(prefix, constants.KPI_UNKNOWN_GROUP), prefix[:2], prefix)]
+        is_ofa = legacy == constants.KPI_OFA_LEGACY_VALUE or avviso in notification_ids
+        planned = pd.notna(planned_start) and start <= planned_start <= end
+        group["Avvisi"] += 1
+        group["Avvisi OFA"] += is_ofa
+        group["Avvisi pianificati"] += planned
+        group["Avvisi pianificati OFA"] += planned and is_ofa
+    for ordine, sede, legacy in zip(df_IW39["Ordine"], df_IW39["Sede tecnica"], df_IW39["Sis.Legacy"]):
+        prefix = str(sede).split("-")[0]
+        group = counts[(prefix_to_tech.get(prefix, constants.KPI_UNKNOWN_GROUP), prefix[:2], prefix)]
+        group["Ordini"] += 1
+        group["Ordini OFA"] += legacy == constants.KPI_OFA_LEGACY_VALUE or ordine in order_ids
+    table = pd.DataFrame([{"Tecnologia": key[0], "Paese": key[1], "Prefisso": key[2], **value}
+                          for key, value in sorted(counts.items())])
+    return kpi.add_rates(table)
+
+
+def best_of(func, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start_time)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del calcolo dei KPI OFA su un anno di dati sintetici")
+    parser.add_argument("--notifications", type=int, default=300000, help="Avvisi IW29 dell'anno")
+    parser.add_argument("--orders", type=int, default=150000, help="Ordini IW39 dell'anno")
+    parser.add_argument("--actions", type=int, default=750000, help="Azioni della trace OFA dell'anno")
+    parser.add_argument("--reference-rows", type=int, default=20000,
+                        help="Avvisi e ordini utilizzati per il confronto con il calcolo riga per riga")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    tech_config = constants.default_config["technologies"]
+    prefixes = [prefix for values in tech_config.values() for prefix in values]
+    start_time = time.perf_counter()
+    df_IW29 = synthetic_list(args.notifications, "IW29", constants.IW29_LAYOUT, 1200000000, prefixes, seed=1)
+    df_IW39 = synthetic_list(args.orders, "IW39", constants.IW39_LAYOUT, 4000000000, prefixes, seed=2)
+    # inizio cardine degli ordini associati agli avvisi (come extract_AFKO)
+    orders = df_IW29["Ordine"].dropna().astype("int64").unique()
+    days = np.random.default_rng(3).integers(0, 400, len(orders))
+    order_starts = pd.Series(pd.Timestamp(YEAR_START) + pd.to_timedelta(days, unit="D"),
+                             index=pd.Index(orders, name=constants.AFKO_ORDER_COLUMN), name=constants.AFKO_START_COLUMN)
+    df_IW29[constants.AFKO_START_COLUMN] = df_IW29["Ordine"].map(order_starts)
+    df_ofa = synthetic_trace(args.actions, df_IW29["Avviso"], df_IW39["Ordine"], prefixes, seed=4)
+    print(f"Dati sintetici: {len(df_IW29)} avvisi, {len(df_IW39)} ordini, {len(df_ofa)} azioni "
+          f"({time.perf_counter() - start_time:.1f} s)")
+
+    elapsed, tables = best_of(lambda: kpi.compute_kpi(df_IW29, df_IW39, df_ofa, tech_config, YEAR_START, YEAR_END),
+                              args.repeat)
+    print(f"compute_kpi: {elapsed:.3f} s "
+          f"({(len(df_IW29) + len(df_IW39) + len(df_ofa)) / elapsed:,.0f} righe/s)")
+    for name, table in tables.items():
+        print(f"  {name:<12} {len(table):>6} righe")
+
+    # fasi della trace indicizzata: la normalizzazione è eseguita una sola volta, le sezioni riutilizzano il join
+    trace_time, trace = best_of(lambda: OFATrace(df_ofa), args.repeat)
+    join_time, joined = best_of(lambda: trace.join(df_IW29, df_IW39, columns=[constants.AFKO_START_COLUMN]),
+                                args.repeat)
+    users_time, users = best_of(lambda: OFATrace.slice_kpi(joined, kpi.USER_COLUMNS, YEAR_START, YEAR_END),
+                                args.repeat)
+    actions_time, actions = best_of(lambda: OFATrace.slice_kpi(joined, ["action"], YEAR_START, YEAR_END),
+                                    args.repeat)
+    print(f"Trace OFA: normalizzazione {trace_time:.3f} s, join {join_time:.3f} s, "
+          f"KPI per utente {users_time:.3f} s ({len(users)} righe), "
+          f"KPI per azione {actions_time:.3f} s ({len(actions)} righe)")
+
+    # confronto con il calcolo riga per riga su un sottoinsieme
+    sub_IW29, sub_IW39 = df_IW29.head(args.reference_rows), df_IW39.head(args.reference_rows)
+    sub_ofa = df_ofa.head(args.reference_rows * 2)
+    sub_trace = OFATrace(sub_ofa)
+    reference_time, reference = best_of(
+        lambda: reference_kpi(sub_IW29, sub_IW39, sub_ofa, tech_config, YEAR_START, YEAR_END), 1)
+    vector_time, vector = best_of(
+        lambda: kpi.aggregate(kpi.item_flags(sub_IW29, sub_IW39, sub_trace.notification_ids, sub_trace.order_ids,
+                                             tech_config, YEAR_START, YEAR_END), kpi.GROUP_COLUMNS), 1)
+    try:
+        # i gruppi sono category nel risultato vettoriale, stringhe nel riferimento
+        pd.testing.assert_frame_equal(reference, vector[reference.columns], check_dtype=False, check_categorical=False)
+        same = True
+    except AssertionError:
+        same = False
+    print(f"Confronto su {len(sub_IW29)} avvisi e {len(sub_IW39)} ordini: riga per riga {reference_time:.3f} s, "
+          f"vettoriale {vector_time:.3f} s (x{reference_time / vector_time:.1f}), risultati identici: {same}")
+
+
+if __name__ == "__main__":
+    main()
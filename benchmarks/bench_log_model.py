@@ -0,0 +1,68 @@
+"""
+Benchmark del modello dei messaggi di log (log_model.LogListModel) collegato a una QListView,
+senza la finestra principale: main.py non viene importato, quindi nessun messaggio viene scritto in app.log.
+
+Ogni aggiornamento simula il timer della finestra (constants.LOG_FLUSH_INTERVAL_MS): flush del modello
+e scorrimento della vista all'ultima riga.
+
+Esecuzione (dalla cartella del progetto, anche senza display):
+    QT_QPA_PLATFORM=offscreen python -m benchmarks.bench_log_model
+    QT_QPA_PLATFORM=offscreen python -m benchmarks.bench_log_model --messages 500000 --flush-every 1000
+"""
+import argparse
+import sys
+import time
+
+from PyQt5.QtWidgets import QApplication, QListView, QStyle
+
+import log_model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del modello dei messaggi di log")
+    parser.add_argument("--messages", type=int, default=100000, help="Numero di messaggi")
+    parser.add_argument("--flush-every", type=int, default=0,
+                        help="Messaggi fra due aggiornamenti della vista (0 = un solo aggiornamento finale)")
+    parser.add_argument("--repeat-rate", type=float, default=0.1,
+                        help="Frazione di messaggi identici al precedente (uniti in una sola riga)")
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    style = app.style()
+    model = log_model.LogListModel({
+        'info': style.standardIcon(QStyle.SP_MessageBoxInformation),
+        'error': style.standardIcon(QStyle.SP_MessageBoxCritical),
+    })
+    # stessa configurazione della vista della finestra principale
+    view = QListView()
+    log_model.configure_view(view)
+    view.setModel(model)
+    view.resize(400, 300)
+    view.show()
+
+    repeat_every = int(1 / args.repeat_rate) if args.repeat_rate > 0 else 0
+    flushes = 0
+    start_time = time.perf_counter()
+    message = ""
+    for index in range(args.messages):
+        if not repeat_every or index % repeat_every:
+            message = f"messaggio {index}"
+        model.append(message, 'error' if index % 100 == 0 else 'info')
+        if args.flush_every and (index + 1) % args.flush_every == 0:
+            if model.flush():
+                view.scrollToBottom()
+            # la finestra ridisegna la vista fra due scatti del timer
+            app.processEvents()
+            flushes += 1
+    if model.flush():
+        view.scrollToBottom()
+    flushes += 1
+    app.processEvents()
+    elapsed = time.perf_counter() - start_time
+
+    print(f"{args.messages} messaggi, {flushes} aggiornamenti della vista, {model.rowCount()} righe: "
+          f"{elapsed:.3f} s ({args.messages / elapsed:,.0f} messaggi/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Confronto fra la normalizzazione degli idItem con Series.apply (implementazione precedente di
+MainWindow.normalize_df) e la versione vettoriale DataFrameTools.extract_base_ids,
+sui file della trace OFA presenti nella cartella del progetto.
+
+Esecuzione (dalla cartella del progetto):
+    python -m benchmarks.bench_normalize
+"""
+import argparse
+import glob
+import time
+
+import pandas as pd
+
+import Config.constants as constants
+from DF_Tools import DataFrameTools
+
+
+def legacy_extract_base_id(id_text):
+    """
+    Implementazione di riferimento: estrazione valore per valore con Series.apply
+    """
+    if not isinstance(id_text, str):
+        try:
+            return int(id_text)
+        except (ValueError, TypeError):
+            return None
+    dash_pos = id_text.find('-')
+    slash_pos = id_text.find('/')
+    if dash_pos >= 0 and (slash_pos < 0 or dash_pos < slash_pos):
+        base_id = id_text[:dash_pos]
+    elif slash_pos >= 0:
+        base_id = id_text[:slash_pos]
+    else:
+        base_id = id_text
+    try:
+        return int(base_id)
+    except ValueError:
+        return None
+
+
+def best_of(func, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start_time)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark della normalizzazione degli idItem")
+    parser.add_argument("files", nargs="*", help="File Excel della trace OFA (default: attivita_utenti_*.xlsx)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for file_path in args.files or sorted(glob.glob("attivita_utenti_*.xlsx")):
+        values = pd.read_excel(file_path, sheet_name=constants.required_sheet, usecols=["idItem"])["idItem"].dropna()
+        legacy_time, legacy = best_of(lambda: values.apply(legacy_extract_base_id), args.repeat)
+        vector_time, (vector, invalid) = best_of(lambda: DataFrameTools.extract_base_ids(values), args.repeat)
+        # i due metodi devono produrre gli stessi id (None/NA per i valori non convertibili)
+        expected = pd.array(legacy.tolist(), dtype="Int64")
+        same = bool((pd.Series(expected, index=values.index).fillna(-1) == vector.fillna(-1)).all())
+        print(f"{file_path}: {len(values)} idItem, apply {legacy_time * 1000:.1f} ms, "
+              f"vettoriale {vector_time * 1000:.1f} ms (x{legacy_time / vector_time:.1f}), "
+              f"{len(invalid)} non convertibili, risultati identici: {same}")
+
+
+if __name__ == "__main__":
+    main()
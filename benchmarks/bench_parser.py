@@ -0,0 +1,58 @@
+"""
+Benchmark del parser a passaggio singolo DataFrameTools.parse_sap_list su una lista sintetica
+con righe spezzate e pipe spurie nella descrizione: tempo, picco di memoria e righe convertite
+(devono coincidere con le righe generate).
+
+Esecuzione (dalla cartella del progetto):
+    python -m benchmarks.bench_parser --rows 100000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from DF_Tools import DataFrameTools
+from benchmarks.sap_list_generator import generate_sap_list
+
+
+def single_pass(text):
+    return DataFrameTools.parse_sap_list(DataFrameTools.iter_lines(text))
+
+
+def measure(func, text, repeat):
+    """
+    Restituisce il tempo migliore su `repeat` esecuzioni e il picco di memoria allocata
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start_time = time.perf_counter()
+        df = func(text)
+        best = min(best, time.perf_counter() - start_time)
+    gc.collect()
+    tracemalloc.start()
+    func(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del parser delle liste SAP")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--wrap-rate", type=float, default=0.01)
+    parser.add_argument("--pipe-rate", type=float, default=0.02)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    text = generate_sap_list(args.rows, args.wrap_rate, args.pipe_rate)
+    print(f"Lista sintetica: {args.rows} righe, {len(text) / 1e6:.1f} MB")
+    elapsed, peak, df = measure(single_pass, text, args.repeat)
+    rows = 0 if df is None else len(df)
+    print(f"parse_sap_list: {elapsed:.3f} s, picco memoria {peak / 1e6:.1f} MB, {rows} righe")
+    if rows != args.rows:
+        print(f"Attenzione: {args.rows - rows} righe perse nella conversione")
+
+
+if __name__ == "__main__":
+    main()
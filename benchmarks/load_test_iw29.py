@@ -0,0 +1,105 @@
+"""
+Prova di carico dell'estrazione IW29 completa (SAPDataExtractor.extract_IW29) sulla sessione SAP simulata:
+nessuna dipendenza da SAP GUI, win32com o dalla clipboard di sistema, eseguibile anche su Linux.
+
+Esecuzione (dalla cartella del progetto):
+    python -m benchmarks.load_test_iw29 --rows 100000 --prefixes 20 --sessions 3 --latency 0.2 1.0
+    python -m benchmarks.load_test_iw29 --replay testfile.txt
+    python -m benchmarks.load_test_iw29 --adm 20000 --selection-latency 0.001 --chunk-size 500 1000 5000 0
+    python -m benchmarks.load_test_iw29 --adm 20000 --selection-latency 0.001 --no-ranges
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from PyQt5.QtCore import QDate
+
+import Config.constants as constants
+import Notification_Store
+import SAP_Connection
+import SAP_Fake
+from SAP_Transactions import SAPDataExtractor
+
+
+def run(args, chunk_size: int) -> None:
+    recordings = SAP_Fake.ListRecordings(args.replay) if args.replay else None
+    latency = tuple(args.latency) if len(args.latency) == 2 else args.latency[0]
+    tech_config = {"WIND": [f"W{index:02d}" for index in range(args.prefixes)]}
+    # avvisi del file OFA: sequenza con una parte degli id mancanti (come gli avvisi di altri impianti)
+    rng = np.random.default_rng(0)
+    candidates = np.arange(1100000000, 1100000000 + int(args.adm / (1 - args.adm_sparsity)) + 1)
+    lista_AdM = pd.Series(np.sort(rng.choice(candidates, size=args.adm, replace=False)))
+
+    with tempfile.TemporaryDirectory() as work_dir, \
+            SAP_Fake.FakeSAPConnection(rows_per_list=args.rows, latency=latency, recordings=recordings,
+                                       selection_latency=args.selection_latency) as sap:
+        session_pool = None
+        if args.sessions > 1:
+            session_pool = SAP_Connection.SAPSessionPool(size=args.sessions, engine_provider=sap.engine_provider)
+            session_pool.open()
+        try:
+            notification_store = (None if args.no_store else
+                                  Notification_Store.NotificationStore(os.path.join(work_dir, "store.sqlite")))
+            extractor = SAPDataExtractor(sap.get_session(), None, session_pool, sap.clipboard, notification_store)
+            extractor.export_dir = os.path.join(work_dir, "export")
+            extractor.batch_mode = not args.no_batch
+            extractor.list_chunk_size = chunk_size
+            extractor.range_compression = not args.no_ranges
+
+            # tracemalloc rallenta sensibilmente l'esecuzione: il picco di memoria viene misurato solo su richiesta
+            if args.memory:
+                tracemalloc.start()
+            start_time = time.perf_counter()
+            result, df = extractor.extract_IW29(QDate(2025, 4, 1), QDate(2025, 4, 30), tech_config, lista_AdM)
+            elapsed = time.perf_counter() - start_time
+            peak = tracemalloc.get_traced_memory()[1] if args.memory else None
+            tracemalloc.stop()
+            sessions = sap.engine.Children(0).Children
+            executions = [sessions(i).executions for i in range(sessions.Count)]
+        finally:
+            if session_pool is not None:
+                session_pool.close()
+
+        rows = 0 if df is None else len(df)
+        print(f"Blocchi della selezione QMNUM: {chunk_size or 'nessuna suddivisione'}")
+        print(f"Esito: {'OK' if result else 'ERRORE'}, {rows} righe in {elapsed:.2f} s "
+              f"({rows / elapsed if elapsed else 0:,.0f} righe/s)"
+              + (f", picco memoria {peak / 1e6:.1f} MB" if peak is not None else ""))
+        print(f"Esecuzioni della lista SAP: {sum(executions)} su {len(executions)} sessioni {executions}")
+        for line in extractor.latency.report_lines():
+            print(f"  {line}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prova di carico dell'estrazione IW29 sulla sessione SAP simulata")
+    parser.add_argument("--rows", type=int, default=10000, help="Righe di ogni lista sintetica")
+    parser.add_argument("--prefixes", type=int, default=10, help="Numero di prefissi configurati")
+    parser.add_argument("--adm", type=int, default=5000, help="Numero di avvisi del file OFA (estrazione Lista)")
+    parser.add_argument("--sessions", type=int, default=1, help="Sessioni SAP simulate in parallelo")
+    parser.add_argument("--latency", type=float, nargs="+", default=[0.0],
+                        help="Tempo di risposta SAP in secondi: valore fisso oppure minimo e massimo")
+    parser.add_argument("--replay", nargs="+", help="Liste registrate (file o cartelle) da riprodurre")
+    parser.add_argument("--selection-latency", type=float, default=0.0,
+                        help="Tempo SAP simulato per ogni valore della selezione multipla, in secondi")
+    parser.add_argument("--chunk-size", type=int, nargs="+", default=[constants.IW29_LIST_CHUNK_SIZE],
+                        help="Avvisi per blocco della selezione QMNUM (0 = nessuna suddivisione); più valori vengono confrontati")
+    parser.add_argument("--adm-sparsity", type=float, default=0.1,
+                        help="Frazione di id mancanti nella sequenza degli avvisi del file OFA")
+    parser.add_argument("--no-ranges", action="store_true", help="Avvisi inviati solo come valori singoli")
+    parser.add_argument("--no-batch", action="store_true", help="Estrazione per singolo prefisso")
+    parser.add_argument("--no-store", action="store_true", help="Senza archivio locale degli avvisi")
+    parser.add_argument("--memory", action="store_true", help="Misura il picco di memoria (tracemalloc)")
+    args = parser.parse_args()
+    # Solo avvisi ed errori dell'estrattore
+    logging.basicConfig(level=logging.WARNING)
+    for chunk_size in args.chunk_size:
+        run(args, chunk_size)
+
+
+if __name__ == "__main__":
+    main()
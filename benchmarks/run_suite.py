@@ -0,0 +1,208 @@
+"""
+Suite di benchmark della catena di elaborazione: conversione della lista SAP (parse_sap_list) -> normalizzazione
+-> unione/eliminazione duplicati (per riga completa e per Avviso) -> esportazione Excel, su liste sintetiche di dimensione crescente.
+
+Per ogni fase e dimensione viene misurato il tempo migliore su più esecuzioni e il picco di memoria allocata.
+I risultati possono essere salvati come riferimento e confrontati nelle esecuzioni successive:
+una fase più lenta (o che alloca più memoria) del riferimento oltre la tolleranza è una regressione
+e il comando termina con codice 1.
+
+Esecuzione (dalla cartella del progetto):
+    python -m benchmarks.run_suite                                   # 1k, 10k, 100k righe
+    python -m benchmarks.run_suite --sizes 1000 10000 100000 1000000
+    python -m benchmarks.run_suite --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run_suite --compare benchmarks/baseline.json --tolerance 1.25
+"""
+import argparse
+import contextlib
+import gc
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import pandas as pd
+
+import Config.constants as constants
+from DF_Tools import DataFrameTools
+from benchmarks.sap_list_generator import COLUMNS, generate_sap_list
+
+
+class _Silent:
+    """
+    Sostituisce estrattore e finestra principale nelle chiamate ai loro metodi: i messaggi non vengono mostrati
+    """
+    def log(self, *args, **kwargs):
+        pass
+
+    def log_unified(self, *args, **kwargs):
+        pass
+
+
+def generate_ofa_ids(rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Genera la colonna idItem di una trace OFA sintetica: avvisi e ordini numerici, ordini con operazione
+    ('4000000123/0010'), avvisi con suffisso ('1200000123-A') e pochi valori non validi.
+    Ogni idItem compare più volte, come le azioni degli utenti sullo stesso oggetto.
+    """
+    rng = random.Random(seed)
+    distinct = max(rows // 3, 1)
+    values = []
+    for _ in range(rows):
+        index = rng.randrange(distinct)
+        kind = rng.random()
+        if kind < 0.55:
+            values.append(1200000000 + index)
+        elif kind < 0.85:
+            values.append(4000000000 + index)
+        elif kind < 0.93:
+            values.append(f"{4000000000 + index}/00{rng.randint(1, 9)}0")
+        elif kind < 0.995:
+            values.append(f"{1200000000 + index}-A")
+        else:
+            values.append("n.d.")
+    return pd.DataFrame({"idItem": pd.Series(values, dtype=object)})
+
+
+def measure(func: Callable, repeat: int) -> tuple[float, int, object]:
+    """
+    Restituisce il tempo migliore su `repeat` esecuzioni, il picco di memoria allocata e il risultato
+    """
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        gc.collect()
+        start_time = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start_time)
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def run_size(rows: int, args, work_dir: str) -> Dict[str, dict]:
+    """
+    Esegue tutte le fasi per una dimensione e restituisce {fase: {'seconds', 'peak_mb'}}
+    """
+    # finestra principale: vengono utilizzati solo i metodi di normalizzazione, senza creare widget
+    # (il logging deve essere già configurato, vedi main())
+    import main
+
+    silent = _Silent()
+    results: Dict[str, dict] = {}
+
+    def stage(name, func, repeat=args.repeat):
+        # le funzioni precedenti stampano i dettagli dell'elaborazione: l'output viene scartato durante la misura
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            seconds, peak, result = measure(func, repeat)
+        results[name] = {"seconds": round(seconds, 6), "peak_mb": round(peak / 1e6, 3)}
+        print(f"  {name:<30} {seconds:>9.4f} s {peak / 1e6:>9.1f} MB")
+        return result
+
+    text = generate_sap_list(rows, args.wrap_rate, args.pipe_rate, seed=rows)
+    df_list = stage("parse_sap_list", lambda: DataFrameTools.parse_sap_list(DataFrameTools.iter_lines(text)))
+    headers = [name for name, _ in COLUMNS] * max(rows // len(COLUMNS), 1) + ["", " "]
+    stage("handle_duplicate_headers", lambda: DataFrameTools.handle_duplicate_headers(headers))
+    df_list = DataFrameTools.apply_schema(df_list, "/KPIOFANO2")
+
+    df_ofa = generate_ofa_ids(rows, seed=rows)
+    _, df_norm = stage("normalize_df", lambda: main.MainWindow.normalize_df(silent, df_ofa))
+    stage("Estrai_AdM", lambda: main.MainWindow.Estrai_AdM(silent, df_norm))
+    stage("Estrai_OdM", lambda: main.MainWindow.Estrai_OdM(silent, df_norm))
+
+    # Unione dei risultati delle estrazioni IW29 (Creazione, Modifica, Lista si sovrappongono in parte)
+    frames = [df_list.assign(TipoEstrazione=tipo) for tipo in ("Creazione", "Modifica", "Lista")]
+    frames[1] = frames[1].sample(frac=0.5, random_state=1)
+
+    def concat_dedupe():
+        result_df = pd.concat(frames, ignore_index=True).drop_duplicates()
+        result_df['TipoEstrazione'] = result_df['TipoEstrazione'].astype('category')
+        return result_df
+    stage("concat_drop_duplicates", concat_dedupe)
+
+    def concat_dedupe_by_key():
+        result_df = DataFrameTools.dedupe_by_key(pd.concat(frames, ignore_index=True), "Avviso", "TipoEstrazione",
+                                                 constants.IW29_TIPO_PRECEDENCE, constants.IW29_SOURCES_COLUMN)
+        result_df['TipoEstrazione'] = result_df['TipoEstrazione'].astype('category')
+        return result_df
+    stage("concat_dedupe_by_key", concat_dedupe_by_key)
+
+    if rows <= args.excel_max_rows:
+        output_path = os.path.join(work_dir, f"export_{rows}.xlsx")
+        stage("export_df_to_excel", lambda: DataFrameTools.export_df_to_excel(df_list, output_path), repeat=1)
+    else:
+        print(f"  {'export_df_to_excel':<30} saltato (oltre {args.excel_max_rows} righe)")
+    return results
+
+
+def compare(results: Dict[str, Dict[str, dict]], baseline: Dict[str, Dict[str, dict]],
+            tolerance: float, min_seconds: float) -> List[str]:
+    """
+    Confronta i risultati con il riferimento
+
+    Returns:
+        list: Descrizione delle regressioni trovate
+    """
+    regressions = []
+    for size, stages in results.items():
+        for name, current in stages.items():
+            reference = baseline.get(size, {}).get(name)
+            if reference is None:
+                continue
+            # i tempi molto brevi sono dominati dal rumore di misura
+            if current["seconds"] > max(reference["seconds"], min_seconds) * tolerance:
+                regressions.append(f"{name} ({size} righe): {current['seconds']:.4f} s, riferimento {reference['seconds']:.4f} s")
+            if current["peak_mb"] > max(reference["peak_mb"], 1.0) * tolerance:
+                regressions.append(f"{name} ({size} righe): {current['peak_mb']:.1f} MB, riferimento {reference['peak_mb']:.1f} MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suite di benchmark della catena di elaborazione delle liste SAP")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Numero di righe delle liste")
+    parser.add_argument("--wrap-rate", type=float, default=0.01)
+    parser.add_argument("--pipe-rate", type=float, default=0.02)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--excel-max-rows", type=int, default=100000, help="Dimensione massima per l'esportazione Excel")
+    parser.add_argument("--save-baseline", help="Salva i risultati come riferimento (JSON)")
+    parser.add_argument("--compare", help="Confronta i risultati con il riferimento indicato (JSON)")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="Rapporto massimo rispetto al riferimento")
+    parser.add_argument("--min-seconds", type=float, default=0.01, help="Tempo sotto il quale le differenze sono ignorate")
+    args = parser.parse_args()
+    # logging della suite configurato prima dell'importazione di main: la configurazione di main.py
+    # (FileHandler su app.log) non viene applicata e le misure non scrivono nel log dell'applicazione
+    logging.basicConfig(level=logging.WARNING, handlers=[logging.StreamHandler()])
+    # i messaggi informativi delle funzioni misurate non vengono mostrati
+    logging.disable(logging.INFO)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        for rows in args.sizes:
+            print(f"Lista sintetica: {rows} righe")
+            results[str(rows)] = run_size(rows, args, work_dir)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=4)
+        print(f"Riferimento salvato in {args.save_baseline}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_seconds)
+        for regression in regressions:
+            print(f"REGRESSIONE: {regression}")
+        if regressions:
+            sys.exit(1)
+        print("Nessuna regressione rispetto al riferimento")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+"""
+Generatore di liste SAP sintetiche (formato testo non convertito della lista avvisi IW29)
+utilizzato dai benchmark del parser. Il generatore è condiviso con la simulazione di SAP (SAP_Fake).
+"""
+from SAP_Fake import COLUMNS, generate_sap_list
+
+__all__ = ["COLUMNS", "generate_sap_list"]
@@ -42,11 +42,13 @@ class ConfigDialog(QDialog):
         # Crea le checkbox
         self.cb_estrai_adm = QCheckBox("Estrai AdM")
         self.cb_estrai_odm = QCheckBox("Estrai OdM")
+        self.cb_estrai_afko = QCheckBox("Inizio cardine OdM (AFKO)")
         self.cb_elabora_xls = QCheckBox("Elabora File XLS")
 
         # Aggiungi le checkbox al layout
         op_layout.addWidget(self.cb_estrai_adm)
         op_layout.addWidget(self.cb_estrai_odm)
+        op_layout.addWidget(self.cb_estrai_afko)
         op_layout.addWidget(self.cb_elabora_xls)
         # Imposta il layout del gruppo
         op_group.setLayout(op_layout)
@@ -193,6 +195,7 @@ class ConfigDialog(QDialog):
         new_config["operations"] = {
             "estrai_AdM": self.cb_estrai_adm.isChecked(),
             "estrai_OdM": self.cb_estrai_odm.isChecked(),
+            "estrai_AFKO": self.cb_estrai_afko.isChecked(),
             "elabora_xls": self.cb_elabora_xls.isChecked()
         }
 
@@ -255,6 +258,7 @@ class ConfigDialog(QDialog):
             if "operations" in config:
                 self.cb_estrai_adm.setChecked(config["operations"].get("estrai_AdM", False))
                 self.cb_estrai_odm.setChecked(config["operations"].get("estrai_OdM", False))
+                self.cb_estrai_afko.setChecked(config["operations"].get("estrai_AFKO", True))
                 self.cb_elabora_xls.setChecked(config["operations"].get("elabora_xls", False))
         
         except Exception as e:
@@ -0,0 +1,274 @@
+import os
+import logging
+import threading
+import pandas as pd
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+import SAP_Connection
+import SAP_Transactions
+import Notification_Store
+import Config.constants as constants
+
+# Logger specifico per questo modulo
+logger = logging.getLogger("ExtractionWorker")
+
+
+class ExtractionWorker(QObject):
+    """
+    Esegue l'intera sequenza di estrazioni SAP in un thread secondario (QThread),
+    in modo che l'interfaccia resti reattiva durante le estrazioni.
+
+    I messaggi di log arrivano alla finestra principale tramite il segnale logMessage,
+    con la stessa firma di SAPDataExtractor.logMessage.
+    """
+
+    # (message, level, update_status, update_log, min_display_seconds, origin, args, kwargs)
+    logMessage = pyqtSignal(str, str, bool, bool, object, str, tuple, dict)
+    # (successo, messaggio finale)
+    finished = pyqtSignal(bool, str)
+
+    def __init__(self, start_date, end_date, tech_config, lista_AdM, lista_OdM, save_dir,
+                 operations=None, connection_factory=None, parallel_sessions=constants.SAP_PARALLEL_SESSIONS,
+                 store_path=None, periods=None):
+        """
+        Args:
+            start_date: Data di inizio (QDate)
+            end_date: Data di fine (QDate)
+            tech_config: Dizionario {tecnologia: [prefissi]}
+            lista_AdM: Serie degli avvisi del file OFA
+            lista_OdM: DataFrame degli ordini del file OFA
+            save_dir: Directory in cui salvare i file Excel
+            operations: Operazioni abilitate nella configurazione ({'estrai_AdM': bool, 'estrai_OdM': bool,
+                        'estrai_AFKO': bool}, default tutte)
+            connection_factory: Classe della connessione SAP (default SAP_Connection.SAPGuiConnection,
+                                SAP_Fake.FakeSAPConnection per le esecuzioni simulate)
+            parallel_sessions: Numero di sessioni SAP utilizzate per le estrazioni in parallelo
+            store_path: Database dell'archivio avvisi alternativo a quello predefinito
+            periods: Periodi della modalità batch, dizionari con le chiavi 'label' (sottodirectory dei file),
+                     'start', 'end' (datetime.date), 'AdM', 'OdM' (avvisi e ordini della trace OFA del periodo);
+                     se indicati start_date, end_date, lista_AdM e lista_OdM non vengono utilizzati
+        """
+        super().__init__()
+        self.start_date = start_date
+        self.end_date = end_date
+        self.tech_config = tech_config
+        self.lista_AdM = lista_AdM
+        self.lista_OdM = lista_OdM
+        self.save_dir = save_dir
+        self.operations = operations or {}
+        self.connection_factory = connection_factory or SAP_Connection.SAPGuiConnection
+        self.parallel_sessions = parallel_sessions
+        self.store_path = store_path
+        self.periods = periods
+        # Riepilogo delle chiamate SAP della modalità batch:
+        # {estrazione: (chiamate stimate con estrazioni separate per periodo, chiamate stimate batch, chiamate eseguite)}
+        self.call_plan = {}
+        # Token di annullamento condiviso con l'estrattore
+        self.cancel_event = threading.Event()
+
+    def log(self, message, level='info', update_status=True, update_log=True, min_display_seconds=None, origin="ExtractionWorker", *args, **kwargs):
+        """
+        Registra il messaggio nel logger di modulo e lo invia alla finestra principale
+        """
+        logger_method = getattr(logger, level) if hasattr(logger, level) else logger.info
+        logger_method(message)
+        self.logMessage.emit(message, level, update_status, update_log, min_display_seconds, origin, args, kwargs)
+
+    def cancel(self) -> None:
+        """
+        Richiede l'annullamento: viene verificato fra un'estrazione e la successiva
+        """
+        self.cancel_event.set()
+        self.log("Annullamento richiesto, attendo il termine dell'estrazione in corso", "warning", True, True, 0)
+
+    @pyqtSlot()
+    def run(self):
+        """
+        Esegue le estrazioni (da collegare al segnale started del QThread)
+        """
+        # COM deve essere inizializzato nel thread che utilizza SAP GUI
+        com_initialized = SAP_Connection.co_initialize()
+        try:
+            success, message = self.run_extractions()
+        except Exception as e:
+            success, message = False, f"Estrazione dati SAP: Errore: {str(e)}"
+        finally:
+            if com_initialized:
+                SAP_Connection.co_uninitialize()
+        self.finished.emit(success, message)
+
+    def run_extractions(self) -> tuple[bool, str]:
+        """
+        Sequenza delle estrazioni: IW29 (avvisi) e IW39 (ordini), con salvataggio dei file Excel
+        (di un unico intervallo oppure dei periodi della modalità batch)
+
+        Returns:
+            tuple: (successo, messaggio finale)
+        """
+        with self.connection_factory() as sap:
+            if not sap.is_connected():
+                return False, "Connessione SAP NON attiva"
+            session = sap.get_session()
+            if not session:
+                return False, "Sessione SAP non disponibile"
+            self.log("Connessione SAP attiva")
+            # Pool di sessioni per eseguire in parallelo le estrazioni indipendenti
+            session_pool = None
+            if self.parallel_sessions > 1:
+                session_pool = SAP_Connection.SAPSessionPool(size=self.parallel_sessions, engine_provider=sap.engine_provider)
+                if session_pool.open():
+                    self.log(f"Sessioni SAP disponibili: {len(session_pool)}")
+                else:
+                    self.log("Pool di sessioni non disponibile, estrazione sequenziale", "warning")
+                    session_pool = None
+            try:
+                # La connessione simulata fornisce la propria clipboard, le altre utilizzano quella di sistema
+                # L'archivio avvisi viene aperto una sola volta e utilizzato solo dall'estrattore principale
+                notification_store = (Notification_Store.NotificationStore(self.store_path or constants.NOTIFICATION_STORE_PATH)
+                                      if constants.NOTIFICATION_STORE_ENABLED else None)
+                extractor = SAP_Transactions.SAPDataExtractor(session, None, session_pool, getattr(sap, "clipboard", None),
+                                                              notification_store)
+                extractor.cancel_event = self.cancel_event
+                # I messaggi dell'estrattore vengono inoltrati alla finestra principale
+                extractor.logMessage.connect(self.logMessage)
+
+                if self.periods:
+                    return self.extract_periods(extractor)
+                return self.extract_period(extractor)
+            finally:
+                # Chiude le sessioni aperte dal pool
+                if session_pool is not None:
+                    session_pool.close()
+
+    def extract_period(self, extractor) -> tuple[bool, str]:
+        """
+        Estrazioni IW29/AFKO e IW39 dell'intervallo start_date - end_date con salvataggio dei file Excel
+
+        Returns:
+            tuple: (successo, messaggio finale)
+        """
+        # Estrazione dati AdM
+        if self.operations.get("estrai_AdM", True):
+            self.log("Estrazione dati IW29", "info", True, True, 0)
+            result, df_IW29 = extractor.extract_IW29(self.start_date, self.end_date, self.tech_config, self.lista_AdM)
+            if not result:
+                return False, "Estrazione annullata" if extractor.is_cancelled() else "Errore: Estrazione IW29 fallita"
+            # Data inizio cardine degli ordini associati agli avvisi (SE16, tabella AFKO)
+            if self.operations.get("estrai_AFKO", True):
+                self.log("Estrazione inizio cardine AFKO", "info", True, True, 0)
+                result, order_starts = extractor.extract_AFKO(df_IW29["Ordine"].dropna())
+                if not result:
+                    return False, "Estrazione annullata" if extractor.is_cancelled() else "Errore: Estrazione AFKO fallita"
+                df_IW29[constants.AFKO_START_COLUMN] = df_IW29["Ordine"].map(order_starts)
+            success, message = self.save_excel(df_IW29, "IW29_AdM.xlsx")
+            if not success:
+                return False, message
+            if extractor.is_cancelled():
+                return False, "Estrazione annullata"
+
+        # Estrazione dati OdM
+        if self.operations.get("estrai_OdM", True):
+            self.log("Estrazione dati IW39", "info", True, True, 0)
+            result, df_IW39 = extractor.extract_IW39(self.start_date, self.end_date, self.tech_config, self.lista_OdM)
+            if not result:
+                return False, "Estrazione annullata" if extractor.is_cancelled() else "Errore: Estrazione IW39 fallita"
+            success, message = self.save_excel(df_IW39, "IW39_OdM.xlsx")
+            if not success:
+                return False, message
+        return True, "Estrazione completata con successo"
+
+    def extract_periods(self, extractor) -> tuple[bool, str]:
+        """
+        Modalità batch: estrazioni di tutti i periodi con un'unica serie di chiamate SAP
+        (SAPDataExtractor.extract_list_periods) e salvataggio dei file Excel di ogni periodo
+        nella sottodirectory 'label' della directory di salvataggio.
+        Le chiamate SAP eseguite (SAPDataExtractor.sap_calls) sono riportate in self.call_plan insieme alla stima
+        delle chiamate delle estrazioni separate per periodo, che non vengono eseguite.
+
+        Returns:
+            tuple: (successo, messaggio finale)
+        """
+        start = min(period["start"] for period in self.periods)
+        end = max(period["end"] for period in self.periods)
+        transactions = [(transaction, column, file_name) for operation, transaction, column, file_name in
+                        (("estrai_AdM", "IW29", "AdM", "IW29_AdM.xlsx"), ("estrai_OdM", "IW39", "OdM", "IW39_OdM.xlsx"))
+                        if self.operations.get(operation, True)]
+        # le stime precedono le estrazioni, che aggiornano l'archivio avvisi
+        estimates = {}
+        for transaction, column, _ in transactions:
+            union = dict.fromkeys(str(value) for period in self.periods for value in period[column])
+            estimates[transaction] = (
+                sum(extractor.estimate_list_calls(transaction, period["start"], period["end"], self.tech_config, period[column])
+                    for period in self.periods),
+                extractor.estimate_list_calls(transaction, start, end, self.tech_config, union))
+
+        for transaction, column, file_name in transactions:
+            self.log(f"Estrazione dati {transaction} di {len(self.periods)} periodi", "info", True, True, 0)
+            calls_before = extractor.sap_calls[transaction]
+            result, frames = extractor.extract_list_periods(
+                transaction, [(period["start"], period["end"], period[column]) for period in self.periods], self.tech_config)
+            if not result:
+                return False, "Estrazione annullata" if extractor.is_cancelled() else f"Errore: Estrazione {transaction} fallita"
+            self.call_plan[transaction] = (*estimates[transaction], extractor.sap_calls[transaction] - calls_before)
+            if transaction == "IW29" and self.operations.get("estrai_AFKO", True):
+                # un'unica estrazione AFKO con gli ordini di tutti i periodi
+                orders = [df["Ordine"].dropna() for df in frames if df is not None]
+                orders = pd.concat(orders).unique() if orders else []
+                estimate = (sum(extractor.estimate_AFKO_calls(df["Ordine"].dropna()) for df in frames if df is not None),
+                            extractor.estimate_AFKO_calls(orders))
+                self.log("Estrazione inizio cardine AFKO", "info", True, True, 0)
+                calls_before = extractor.sap_calls["AFKO"]
+                result, order_starts = extractor.extract_AFKO(orders)
+                if not result:
+                    return False, "Estrazione annullata" if extractor.is_cancelled() else "Errore: Estrazione AFKO fallita"
+                self.call_plan["AFKO"] = (*estimate, extractor.sap_calls["AFKO"] - calls_before)
+                for df in frames:
+                    if df is not None:
+                        df[constants.AFKO_START_COLUMN] = df["Ordine"].map(order_starts)
+            for period, df in zip(self.periods, frames):
+                if df is None:
+                    continue
+                directory = os.path.join(self.save_dir, period["label"])
+                os.makedirs(directory, exist_ok=True)
+                success, message = self.save_excel(df, file_name, directory)
+                if not success:
+                    return False, message
+            if extractor.is_cancelled():
+                return False, "Estrazione annullata"
+
+        for line in self.call_plan_lines():
+            self.log(line, "info", True, True, 0)
+        naive = sum(calls for calls, _, _ in self.call_plan.values())
+        executed = sum(calls for _, _, calls in self.call_plan.values())
+        return True, (f"Estrazione di {len(self.periods)} periodi completata con successo: {executed} chiamate SAP eseguite, "
+                      f"stima con estrazioni separate per periodo {naive} ({naive - executed} risparmiate, stima)")
+
+    def call_plan_lines(self) -> list:
+        """
+        Righe del riepilogo delle chiamate SAP della modalità batch: chiamate eseguite (misurate),
+        stima a priori della modalità batch e stima delle estrazioni separate per periodo
+        """
+        lines = []
+        for name, (naive, planned, executed) in self.call_plan.items():
+            saved = naive - executed
+            lines.append(f"Chiamate SAP {name}: {executed} eseguite in modalità batch (stima {planned}), "
+                         f"stima con estrazioni separate per periodo {naive} "
+                         f"({saved} risparmiate, stima{f', {saved / naive:.0%}' if naive else ''})")
+        return lines
+
+    def save_excel(self, df: pd.DataFrame, file_name: str, directory: str | None = None) -> tuple[bool, str]:
+        """
+        Salva il DataFrame in un file Excel nella directory di salvataggio (o nella directory indicata)
+
+        Returns:
+            tuple: (successo, messaggio)
+        """
+        output_file = os.path.join(directory or self.save_dir, file_name)
+        try:
+            # to_excel non restituisce alcun valore: l'esito si verifica tramite eccezioni e presenza del file
+            df.to_excel(output_file, index=False)
+        except Exception as e:
+            return False, f"Errore: Salvataggio file {file_name} fallito: {str(e)}"
+        if not os.path.exists(output_file):
+            return False, f"Errore: Salvataggio file {file_name} fallito"
+        self.log(f"File salvato in: {output_file}", "success", True, True, 0)
+        return True, output_file
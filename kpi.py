@@ -0,0 +1,217 @@
+"""
+Calcolo dei KPI OFA sulle tabelle estratte da SAP (avvisi IW29, ordini IW39, inizio cardine AFKO)
+e sulla trace delle azioni degli utenti OFA.
+
+KPI per tecnologia, prefisso impianto e paese:
+    Avvisi                   avvisi SAP del periodo (una riga per Avviso, risultato di extract_IW29)
+    Avvisi OFA               avvisi gestiti con OFA: Sis.Legacy uguale a constants.KPI_OFA_LEGACY_VALUE
+                             oppure avviso presente nella trace OFA (idItem di 10 cifre)
+    Avvisi pianificati       avvisi con ordine il cui inizio cardine (AFKO) è compreso nel periodo
+    Avvisi pianificati OFA   avvisi pianificati gestiti con OFA
+    Ordini / Ordini OFA      ordini SAP del periodo (extract_IW39), gestiti con OFA con le stesse regole
+    % ...                    percentuale OFA sul totale del gruppo
+KPI per utente e per azione: azioni della trace e avvisi/ordini distinti presenti nelle estrazioni SAP
+(trace collegata alle estrazioni con ofa_trace.OFATrace.join).
+
+Tutti i calcoli sono eseguiti con operazioni vettoriali (isin, merge, groupby), senza cicli sulle righe.
+"""
+import logging
+from datetime import date
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+import Config.constants as constants
+from ofa_trace import OFATrace
+
+# Logger specifico per questo modulo
+logger = logging.getLogger("KPI")
+
+# Colonne dei gruppi, dalla più generale alla più specifica
+GROUP_COLUMNS = ["Tecnologia", "Paese", "Prefisso"]
+# Colonne conteggiate e percentuali calcolate come (numeratore, denominatore)
+COUNT_COLUMNS = ["Avvisi", "Avvisi OFA", "Avvisi pianificati", "Avvisi pianificati OFA", "Ordini", "Ordini OFA"]
+RATE_COLUMNS = {
+    "% Avvisi OFA": ("Avvisi OFA", "Avvisi"),
+    "% Avvisi pianificati OFA": ("Avvisi pianificati OFA", "Avvisi pianificati"),
+    "% Ordini OFA": ("Ordini OFA", "Ordini"),
+}
+# Colonne della trace OFA che identificano l'utente
+USER_COLUMNS = ["user", "country", "tecnology"]
+
+
+def site_groups(functional_locations: pd.Series, tech_config: Dict[str, List[str]]) -> pd.DataFrame:
+    """
+    Ricava prefisso impianto, paese e tecnologia dalle sedi tecniche (es. 'ESW-ES19-X1-16' -> ESW, ES, WIND).
+    Il prefisso viene estratto dalle sedi tecniche distinte, i gruppi dai pochi prefissi distinti:
+    le righe ricevono solo i codici delle categorie.
+
+    Args:
+        functional_locations: Colonna Sede tecnica
+        tech_config: Prefissi configurati per ogni tecnologia
+
+    Returns:
+        DataFrame con le colonne di GROUP_COLUMNS (category ordinate), indicizzato come functional_locations
+    """
+    codes, uniques = pd.factorize(functional_locations)
+    prefixes = pd.Series(uniques, dtype=object).astype(str).str.extract(r'^([^-]*)', expand=False)
+    prefix_codes, prefix_values = pd.factorize(prefixes)
+    prefix_values = pd.Series(prefix_values, dtype=object).str.strip().replace("", np.nan)
+    prefix_to_tech = {prefix.strip(): tech for tech, prefixes in tech_config.items() for prefix in prefixes if prefix.strip()}
+    table = pd.DataFrame({
+        "Tecnologia": prefix_values.map(prefix_to_tech),
+        "Paese": prefix_values.str[:2],
+        "Prefisso": prefix_values,
+    }).astype(object)
+    # ultima riga: sedi tecniche mancanti
+    table.loc[len(table)] = np.nan
+    table = table.fillna(constants.KPI_UNKNOWN_GROUP)
+    rows = np.where(codes >= 0, prefix_codes[codes], len(table) - 1)
+    groups = {}
+    for column in GROUP_COLUMNS:
+        category_codes, categories = pd.factorize(table[column], sort=True)
+        groups[column] = pd.Categorical.from_codes(category_codes[rows], categories=categories)
+    return pd.DataFrame(groups, index=functional_locations.index)
+
+
+def _is_ofa(df: pd.DataFrame, key: str, ofa_ids: pd.Index) -> np.ndarray:
+    """
+    Righe gestite con OFA: Sis.Legacy uguale al valore OFA oppure identificativo presente nella trace
+    """
+    in_trace = df[key].isin(ofa_ids).to_numpy(dtype=bool)
+    if "Sis.Legacy" not in df.columns:
+        return in_trace
+    return df["Sis.Legacy"].astype(object).eq(constants.KPI_OFA_LEGACY_VALUE).to_numpy(dtype=bool) | in_trace
+
+
+def item_flags(df_IW29: Optional[pd.DataFrame], df_IW39: Optional[pd.DataFrame], notification_ids: pd.Index,
+               order_ids: pd.Index, tech_config: Dict[str, List[str]], start: date, end: date,
+               order_starts: Optional[pd.Series] = None) -> pd.DataFrame:
+    """
+    Costruisce una riga per ogni avviso e ordine con i gruppi e gli indicatori (0/1) di COUNT_COLUMNS
+
+    Args:
+        df_IW29: Avvisi (extract_IW29), eventualmente con la colonna Inizio card.
+        df_IW39: Ordini (extract_IW39)
+        notification_ids: Avvisi presenti nella trace OFA (OFATrace.notification_ids)
+        order_ids: Ordini presenti nella trace OFA (OFATrace.order_ids)
+        tech_config: Prefissi configurati per ogni tecnologia
+        start: Data di inizio del periodo
+        end: Data di fine del periodo
+        order_starts: Inizio cardine degli ordini (extract_AFKO), utilizzato se df_IW29 non contiene la colonna
+
+    Returns:
+        DataFrame con le colonne di GROUP_COLUMNS e COUNT_COLUMNS
+    """
+    df_IW29 = df_IW29 if df_IW29 is not None else pd.DataFrame(columns=["Avviso", "Ordine", "Sede tecnica"])
+    df_IW39 = df_IW39 if df_IW39 is not None else pd.DataFrame(columns=["Ordine", "Sede tecnica"])
+    n_notifications, n_orders = len(df_IW29), len(df_IW39)
+    # avvisi seguiti dagli ordini: ogni indicatore è un vettore unico, nullo nelle righe dell'altro tipo
+    counts = {column: np.zeros(n_notifications + n_orders, dtype="int64") for column in COUNT_COLUMNS}
+
+    if constants.AFKO_START_COLUMN in df_IW29.columns:
+        planned_start = pd.to_datetime(df_IW29[constants.AFKO_START_COLUMN], errors="coerce")
+    elif order_starts is not None:
+        # inizio cardine dell'ordine associato all'avviso
+        planned_start = pd.to_datetime(df_IW29["Ordine"].map(order_starts), errors="coerce")
+    else:
+        planned_start = pd.Series(pd.NaT, index=df_IW29.index, dtype="datetime64[ns]")
+    is_ofa = _is_ofa(df_IW29, "Avviso", notification_ids)
+    planned = planned_start.between(pd.Timestamp(start), pd.Timestamp(end)).to_numpy(dtype=bool)
+    counts["Avvisi"][:n_notifications] = 1
+    counts["Avvisi OFA"][:n_notifications] = is_ofa
+    counts["Avvisi pianificati"][:n_notifications] = planned
+    counts["Avvisi pianificati OFA"][:n_notifications] = planned & is_ofa
+    counts["Ordini"][n_notifications:] = 1
+    counts["Ordini OFA"][n_notifications:] = _is_ofa(df_IW39, "Ordine", order_ids)
+
+    sites = pd.concat([df_IW29["Sede tecnica"].astype(object), df_IW39["Sede tecnica"].astype(object)],
+                      ignore_index=True)
+    flags = site_groups(sites, tech_config)
+    for column, values in counts.items():
+        flags[column] = values
+    return flags
+
+
+def add_rates(table: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggiunge le percentuali di RATE_COLUMNS (una cifra decimale, vuote se il denominatore è zero)
+    """
+    for column, (numerator, denominator) in RATE_COLUMNS.items():
+        total = table[denominator].where(table[denominator] > 0)
+        table[column] = (table[numerator] / total * 100).round(1)
+    return table
+
+
+def aggregate(flags: pd.DataFrame, by: List[str], total: bool = False) -> pd.DataFrame:
+    """
+    Somma gli indicatori per gruppo e calcola le percentuali
+
+    Args:
+        flags: Risultato di item_flags
+        by: Colonne dei gruppi
+        total: Se True aggiunge la riga dei totali (constants.KPI_TOTAL_LABEL)
+
+    Returns:
+        DataFrame con una riga per gruppo
+    """
+    table = flags.groupby(by, observed=True, sort=True)[COUNT_COLUMNS].sum().reset_index()
+    if total:
+        totals = pd.DataFrame([{**{column: "" for column in by}, **table[COUNT_COLUMNS].sum().to_dict()}])
+        totals[by[0]] = constants.KPI_TOTAL_LABEL
+        table = pd.concat([table.astype({column: object for column in by}), totals], ignore_index=True)
+    return add_rates(table)
+
+
+def compute_kpi(df_IW29: Optional[pd.DataFrame], df_IW39: Optional[pd.DataFrame], df_ofa: Union[pd.DataFrame, OFATrace],
+                tech_config: Dict[str, List[str]], start: date, end: date,
+                order_starts: Optional[pd.Series] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Calcola le tabelle dei KPI OFA
+
+    Args:
+        df_IW29: Avvisi (extract_IW29, oppure IW29_AdM.xlsx)
+        df_IW39: Ordini (extract_IW39, oppure IW39_OdM.xlsx)
+        df_ofa: Trace OFA (sheet constants.required_sheet), oppure OFATrace già normalizzata
+        tech_config: Prefissi configurati per ogni tecnologia
+        start: Data di inizio del periodo
+        end: Data di fine del periodo
+        order_starts: Inizio cardine degli ordini (extract_AFKO)
+
+    Returns:
+        dict: {'Tecnologia', 'Paese', 'Prefisso', 'Utenti', 'Azioni'} -> DataFrame
+    """
+    # la normalizzazione degli idItem viene eseguita una sola volta per tutti i KPI
+    trace = df_ofa if isinstance(df_ofa, OFATrace) else OFATrace(df_ofa)
+    if (df_IW29 is not None and order_starts is not None
+            and constants.AFKO_START_COLUMN not in df_IW29.columns):
+        df_IW29 = df_IW29.assign(**{constants.AFKO_START_COLUMN: df_IW29["Ordine"].map(order_starts)})
+    flags = item_flags(df_IW29, df_IW39, trace.notification_ids, trace.order_ids, tech_config, start, end)
+    joined = trace.join(df_IW29, df_IW39, columns=[constants.AFKO_START_COLUMN])
+    tables = {
+        "Tecnologia": aggregate(flags, ["Tecnologia"], total=True),
+        "Paese": aggregate(flags, ["Tecnologia", "Paese"]),
+        "Prefisso": aggregate(flags, GROUP_COLUMNS),
+        "Utenti": OFATrace.slice_kpi(joined, USER_COLUMNS, start, end),
+        "Azioni": OFATrace.slice_kpi(joined, ["action"], start, end),
+    }
+    logger.info(f"KPI calcolati: {int(flags['Avvisi'].sum())} avvisi, {int(flags['Ordini'].sum())} ordini, "
+                f"{len(tables['Prefisso'])} prefissi, {len(tables['Utenti'])} utenti")
+    return tables
+
+
+def save_kpi(tables: Dict[str, pd.DataFrame], output_path: str) -> tuple[bool, str]:
+    """
+    Salva le tabelle dei KPI in un file Excel, un foglio per tabella
+
+    Returns:
+        tuple: (successo, messaggio)
+    """
+    try:
+        with pd.ExcelWriter(output_path) as writer:
+            for sheet_name, table in tables.items():
+                table.to_excel(writer, sheet_name=sheet_name, index=False)
+    except Exception as e:
+        return False, f"Errore durante il salvataggio dei KPI in {output_path}: {str(e)}"
+    return True, f"KPI salvati in: {output_path}"
@@ -0,0 +1,414 @@
+"""
+Esecuzione delle estrazioni SAP da riga di comando, senza interfaccia grafica (es. esecuzioni mensili pianificate).
+
+Esempi:
+    python -m kpi_ofa extract --from 2025-04-01 --to 2025-04-30 --ofa file.xlsx --out dir
+    python -m kpi_ofa extract --from 2025-04-01 --to 2025-04-30 --ofa file.xlsx --out dir --dry-run
+    python -m kpi_ofa batch --months 2025-03 2025-04 --ofa marzo.xlsx aprile.xlsx --out dir --dry-run
+    python -m kpi_ofa kpi --from 2025-04-01 --to 2025-04-30 --ofa file.xlsx --out dir
+
+Con --dry-run le estrazioni vengono eseguite su una sessione SAP simulata (SAP_Fake), senza SAP GUI:
+i file prodotti contengono dati sintetici e l'archivio avvisi utilizzato è un database temporaneo, eliminato al termine.
+Il comando batch estrae più mesi (--window per finestre mobili di più mesi) con un'unica serie di chiamate SAP
+sull'intervallo complessivo, suddivide localmente le righe per periodo e salva i file di ogni periodo in una
+sottodirectory; al termine riporta le chiamate SAP eseguite e la stima di quelle delle estrazioni separate per periodo.
+Il comando kpi calcola i KPI OFA (modulo kpi) dai file IW29_AdM.xlsx e IW39_OdM.xlsx prodotti da extract.
+"""
+import argparse
+import functools
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+
+import pandas as pd
+from PyQt5.QtCore import QDate, Qt
+
+import Config.constants as constants
+import Config.settings as settings
+import DF_Tools
+import OFA_Cache
+import SAP_Fake
+import extraction_worker
+import kpi
+import ofa_trace
+
+# Logger specifico per questo modulo
+logger = logging.getLogger("kpi_ofa")
+
+# Codici di uscita
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_INVALID_INPUT = 2
+EXIT_CANCELLED = 130
+
+
+def parse_date(value: str) -> date:
+    """
+    Converte una data in formato ISO (aaaa-mm-gg) per argparse
+    """
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Data non valida: {value} (formato atteso aaaa-mm-gg)")
+
+
+def parse_month(value: str) -> date:
+    """
+    Converte un mese in formato aaaa-mm per argparse (primo giorno del mese)
+    """
+    try:
+        return date.fromisoformat(f"{value}-01")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Mese non valido: {value} (formato atteso aaaa-mm)")
+
+
+def validate_date_range(start: date, end: date) -> tuple[bool, str]:
+    """
+    Verifica l'intervallo di date con le stesse regole della finestra principale
+
+    Returns:
+        tuple: (valido, messaggio di errore)
+    """
+    if start > end:
+        return False, "La data di inizio non può essere successiva alla data di fine"
+    if start == end:
+        return False, "La data di inizio non può essere uguale alla data di fine"
+    if (end - start).days > 366:
+        return False, "L'intervallo di date non può superare un anno (366 giorni)"
+    return True, ""
+
+
+def load_ofa_lists(file_path: str, cache_dir: str) -> tuple[bool, pd.DataFrame | None, pd.DataFrame | None]:
+    """
+    Legge il file Excel della trace OFA e restituisce gli AdM e gli OdM (idItem normalizzati),
+    utilizzando la stessa cache della finestra principale
+
+    Args:
+        file_path: Percorso del file Excel
+        cache_dir: Cartella della cache OFA
+
+    Returns:
+        tuple: (successo, DataFrame AdM, DataFrame OdM)
+    """
+    ofa_cache = OFA_Cache.OFACache(cache_dir)
+    start_time = time.perf_counter()
+    cached = ofa_cache.load(file_path)
+    if cached is not None and "AdM" in cached and "OdM" in cached:
+        logger.info(f"File excel letto dalla cache in {time.perf_counter() - start_time:.3f} s")
+        return True, cached["AdM"], cached["OdM"]
+
+    df = read_ofa_trace(file_path)
+    if df is None:
+        return False, None, None
+
+    # Normalizzazione degli idItem (come MainWindow.normalize_df)
+    ids, invalid = DF_Tools.DataFrameTools.extract_base_ids(df["idItem"].dropna())
+    if not invalid.empty:
+        examples = ", ".join(f"'{value}'" for value in invalid.unique()[:10])
+        logger.error(f"Impossibile convertire {len(invalid)} idItem in intero (es. {examples})")
+    id_items_df = pd.DataFrame({"idItem": ids}).dropna().drop_duplicates().reset_index(drop=True)
+    df_AdM = id_items_df[id_items_df["idItem"] < constants.OdM_THRESHOLD].reset_index(drop=True)
+    df_OdM = id_items_df[id_items_df["idItem"] > constants.OdM_THRESHOLD].reset_index(drop=True)
+    logger.info(f"idItem unici: {len(id_items_df)} - AdM: {len(df_AdM)}, OdM: {len(df_OdM)}")
+    ofa_cache.store(file_path, {"AdM": df_AdM, "OdM": df_OdM})
+    return True, df_AdM, df_OdM
+
+
+def read_ofa_trace(file_path: str) -> pd.DataFrame | None:
+    """
+    Legge lo sheet della trace OFA verificando le colonne richieste
+
+    Returns:
+        DataFrame della trace oppure None se lo sheet o alcune colonne mancano
+    """
+    result, df, info = DF_Tools.DataFrameTools.read_excel_sheet(
+        file_path, constants.required_sheet, constants.required_columns,
+        constants.required_columns_dtypes, constants.EXCEL_READER_ENGINE)
+    timings = ", ".join(f"{phase} {seconds:.2f} s" for phase, seconds in info["timings"].items())
+    logger.info(f"Lettura file Excel ({info['engine']}): {timings}")
+    if df is None:
+        logger.error(f"Lo sheet '{constants.required_sheet}' non è presente nel file")
+        return None
+    if info["missing_columns"]:
+        logger.error(f"Colonne mancanti: {', '.join(info['missing_columns'])}")
+        return None
+    return df
+
+
+def load_extraction_config(args: argparse.Namespace) -> tuple[dict | None, str]:
+    """
+    Legge la configurazione e prepara la directory di salvataggio (comandi extract e batch)
+
+    Returns:
+        tuple: (configurazione oppure None se non valida, directory di salvataggio)
+    """
+    config, level, message = settings.load_config(args.config)
+    getattr(logger, level, logger.info)(message)
+    tech_config = config.get("technologies", {})
+    if not any(prefixes for prefixes in tech_config.values()):
+        logger.error("Nessun prefisso configurato per le tecnologie")
+        return None, ""
+
+    save_dir = args.out or config.get("save_directory", "")
+    if not save_dir:
+        logger.error("Directory di salvataggio non indicata")
+        return None, ""
+    os.makedirs(save_dir, exist_ok=True)
+    return config, save_dir
+
+
+def connection_options(args: argparse.Namespace, work_dir: str) -> tuple:
+    """
+    Connessione SAP e archivio avvisi da utilizzare: con --dry-run sessione simulata e archivio temporaneo
+    nella directory work_dir, eliminata al termine dal chiamante
+
+    Returns:
+        tuple: (classe della connessione oppure None per SAP GUI, database dell'archivio oppure None)
+    """
+    if not args.dry_run:
+        return None, None
+    recordings = SAP_Fake.ListRecordings(args.replay) if args.replay else None
+    logger.info(f"Esecuzione simulata (dry-run): "
+                f"{f'{len(recordings)} liste registrate' if recordings else f'{args.fake_rows} righe per ogni lista SAP'}, "
+                f"tempo di risposta {args.fake_latency} s")
+    connection_factory = functools.partial(SAP_Fake.FakeSAPConnection, rows_per_list=args.fake_rows,
+                                           latency=args.fake_latency, recordings=recordings)
+    # l'archivio avvisi reale non deve ricevere dati sintetici
+    return connection_factory, os.path.join(work_dir, "dry_run_notifications.sqlite")
+
+
+def run_worker(worker: extraction_worker.ExtractionWorker) -> int:
+    """
+    Esegue le estrazioni del worker in un thread separato e attende il risultato
+
+    Returns:
+        int: Codice di uscita
+    """
+    outcome = {}
+    # Senza event loop Qt il segnale deve essere ricevuto direttamente nel thread di estrazione
+    worker.finished.connect(lambda success, message: outcome.update(success=success, message=message), Qt.DirectConnection)
+
+    # Le estrazioni sono eseguite in un thread separato: Ctrl+C richiede l'annullamento come il pulsante "Annulla"
+    start_time = time.perf_counter()
+    thread = threading.Thread(target=worker.run, name="ExtractionWorker")
+    thread.start()
+    try:
+        while thread.is_alive():
+            thread.join(0.2)
+    except KeyboardInterrupt:
+        worker.cancel()
+        thread.join()
+        logger.warning("Estrazione annullata dall'utente")
+        return EXIT_CANCELLED
+
+    elapsed = time.perf_counter() - start_time
+    success = outcome.get("success", False)
+    message = outcome.get("message", "Estrazione terminata senza esito")
+    (logger.info if success else logger.error)(f"{message} ({elapsed:.1f} s)")
+    return EXIT_OK if success else EXIT_FAILED
+
+
+def run_extract(args: argparse.Namespace) -> int:
+    """
+    Comando extract: lettura del file OFA, estrazioni IW29/IW39 e salvataggio dei file Excel
+
+    Returns:
+        int: Codice di uscita
+    """
+    valid, message = validate_date_range(args.date_from, args.date_to)
+    if not valid:
+        logger.error(message)
+        return EXIT_INVALID_INPUT
+    if not os.path.isfile(args.ofa):
+        logger.error(f"File OFA non trovato: {args.ofa}")
+        return EXIT_INVALID_INPUT
+    config, save_dir = load_extraction_config(args)
+    if config is None:
+        return EXIT_INVALID_INPUT
+
+    result, df_AdM, df_OdM = load_ofa_lists(args.ofa, os.path.join(save_dir, constants.OFA_CACHE_DIRNAME))
+    if not result:
+        return EXIT_INVALID_INPUT
+
+    with tempfile.TemporaryDirectory(prefix="kpi_ofa_") as work_dir:
+        connection_factory, store_path = connection_options(args, work_dir)
+        worker = extraction_worker.ExtractionWorker(
+            QDate(args.date_from.year, args.date_from.month, args.date_from.day),
+            QDate(args.date_to.year, args.date_to.month, args.date_to.day),
+            config.get("technologies", {}), df_AdM["idItem"].copy(), df_OdM.copy(), save_dir,
+            config.get("operations"), connection_factory, args.sessions, store_path)
+        return run_worker(worker)
+
+
+def build_periods(months: list, window: int) -> list:
+    """
+    Periodi della modalità batch: per ogni mese un periodo che termina l'ultimo giorno del mese
+    e comprende i window mesi precedenti (1 = solo il mese, 3 = trimestre mobile)
+
+    Args:
+        months: Mesi (datetime.date del primo giorno del mese)
+        window: Numero di mesi di ogni periodo
+
+    Returns:
+        list: Dizionari {'label', 'start', 'end'} in ordine di mese
+    """
+    periods = []
+    for month in sorted(set(months)):
+        first = pd.Timestamp(month) - pd.DateOffset(months=window - 1)
+        end = (pd.Timestamp(month) + pd.offsets.MonthEnd(0)).date()
+        label = f"{month:%Y-%m}" if window == 1 else f"{first:%Y-%m}_{month:%Y-%m}"
+        periods.append({"label": label, "start": first.date(), "end": end})
+    return periods
+
+
+def run_batch(args: argparse.Namespace) -> int:
+    """
+    Comando batch: estrazioni di più mesi (o finestre mobili di più mesi) con un'unica serie di chiamate SAP
+    e salvataggio dei file Excel di ogni periodo in una sottodirectory della directory di output.
+    Gli avvisi e gli ordini della trace OFA sono assegnati ai periodi in base alla data dell'azione (creationDate).
+
+    Returns:
+        int: Codice di uscita
+    """
+    if args.window < 1:
+        logger.error("La finestra deve comprendere almeno un mese")
+        return EXIT_INVALID_INPUT
+    periods = build_periods(args.months, args.window)
+    valid, message = validate_date_range(min(period["start"] for period in periods), max(period["end"] for period in periods))
+    if not valid:
+        logger.error(f"Periodo complessivo non valido: {message}")
+        return EXIT_INVALID_INPUT
+    missing = [file_path for file_path in args.ofa if not os.path.isfile(file_path)]
+    if missing:
+        logger.error(f"File OFA non trovati: {', '.join(missing)}")
+        return EXIT_INVALID_INPUT
+    config, save_dir = load_extraction_config(args)
+    if config is None:
+        return EXIT_INVALID_INPUT
+
+    traces = [read_ofa_trace(file_path) for file_path in args.ofa]
+    if any(df is None for df in traces):
+        return EXIT_INVALID_INPUT
+    trace = ofa_trace.OFATrace(pd.concat(traces, ignore_index=True))
+    # data dell'azione (UTC) senza orario, per il confronto con i limiti dei periodi
+    action_dates = trace.frame["creationDate"].dt.tz_localize(None).dt.normalize()
+    undated = int(action_dates.isna().sum())
+    if undated:
+        logger.warning(f"{undated} azioni della trace OFA senza data non assegnate ad alcun periodo")
+    item_type = trace.frame["Tipo"].to_numpy()
+    for period in periods:
+        in_period = action_dates.between(pd.Timestamp(period["start"]), pd.Timestamp(period["end"])).to_numpy(dtype=bool)
+        period["AdM"] = trace.frame.index[in_period & (item_type == ofa_trace.ITEM_NOTIFICATION)].unique()
+        period["OdM"] = trace.frame.index[in_period & (item_type == ofa_trace.ITEM_ORDER)].unique()
+        logger.info(f"Periodo {period['label']} ({period['start']:%d.%m.%Y}-{period['end']:%d.%m.%Y}): "
+                    f"AdM: {len(period['AdM'])}, OdM: {len(period['OdM'])}")
+
+    with tempfile.TemporaryDirectory(prefix="kpi_ofa_") as work_dir:
+        connection_factory, store_path = connection_options(args, work_dir)
+        worker = extraction_worker.ExtractionWorker(
+            None, None, config.get("technologies", {}), None, None, save_dir,
+            config.get("operations"), connection_factory, args.sessions, store_path, periods)
+        return run_worker(worker)
+
+
+def run_kpi(args: argparse.Namespace) -> int:
+    """
+    Comando kpi: calcolo dei KPI OFA dai file Excel delle estrazioni e dalla trace OFA
+
+    Returns:
+        int: Codice di uscita
+    """
+    valid, message = validate_date_range(args.date_from, args.date_to)
+    if not valid:
+        logger.error(message)
+        return EXIT_INVALID_INPUT
+    if not os.path.isfile(args.ofa):
+        logger.error(f"File OFA non trovato: {args.ofa}")
+        return EXIT_INVALID_INPUT
+    config, level, message = settings.load_config(args.config)
+    getattr(logger, level, logger.info)(message)
+    save_dir = args.out or config.get("save_directory", "")
+
+    # le estrazioni non eseguite (es. OdM disabilitati) non contribuiscono ai KPI
+    frames = {}
+    for name in ("IW29_AdM.xlsx", "IW39_OdM.xlsx"):
+        file_path = os.path.join(save_dir, name)
+        if os.path.isfile(file_path):
+            frames[name] = pd.read_excel(file_path)
+        else:
+            logger.warning(f"File {file_path} non trovato")
+    if not frames:
+        logger.error(f"Nessun file delle estrazioni SAP in {save_dir}")
+        return EXIT_INVALID_INPUT
+    df_ofa = read_ofa_trace(args.ofa)
+    if df_ofa is None:
+        return EXIT_INVALID_INPUT
+
+    start_time = time.perf_counter()
+    tables = kpi.compute_kpi(frames.get("IW29_AdM.xlsx"), frames.get("IW39_OdM.xlsx"), df_ofa,
+                             config.get("technologies", {}), args.date_from, args.date_to)
+    success, message = kpi.save_kpi(tables, os.path.join(save_dir, constants.KPI_FILE_NAME))
+    (logger.info if success else logger.error)(f"{message} ({time.perf_counter() - start_time:.1f} s)")
+    return EXIT_OK if success else EXIT_FAILED
+
+
+def add_extraction_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Opzioni comuni ai comandi che eseguono estrazioni SAP (extract, batch)
+    """
+    parser.add_argument("--out", help="Directory dei file prodotti (default: save_directory della configurazione)")
+    parser.add_argument("--config", default=constants.configuration_json, help="File di configurazione JSON")
+    parser.add_argument("--sessions", type=int, default=constants.SAP_PARALLEL_SESSIONS,
+                        help="Numero di sessioni SAP in parallelo")
+    parser.add_argument("--dry-run", action="store_true", help="Utilizza una sessione SAP simulata")
+    parser.add_argument("--fake-rows", type=int, default=200, help="Righe di ogni lista SAP simulata (con --dry-run)")
+    parser.add_argument("--fake-latency", type=float, default=0.0, help="Tempo di risposta SAP simulato in secondi (con --dry-run)")
+    parser.add_argument("--replay", nargs="+", help="Liste SAP registrate da riprodurre (con --dry-run)")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="kpi_ofa", description="Estrazioni SAP per i KPI OFA senza interfaccia grafica")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    extract = subparsers.add_parser("extract", help="Esegue le estrazioni SAP per un intervallo di date")
+    extract.add_argument("--from", dest="date_from", type=parse_date, required=True, help="Data di inizio (aaaa-mm-gg)")
+    extract.add_argument("--to", dest="date_to", type=parse_date, required=True, help="Data di fine (aaaa-mm-gg)")
+    extract.add_argument("--ofa", required=True, help="File Excel della trace OFA")
+    add_extraction_arguments(extract)
+    extract.set_defaults(handler=run_extract)
+
+    batch = subparsers.add_parser("batch", help="Esegue le estrazioni SAP di più mesi con chiamate SAP condivise")
+    batch.add_argument("--months", type=parse_month, nargs="+", required=True, help="Mesi da estrarre (aaaa-mm)")
+    batch.add_argument("--window", type=int, default=1,
+                       help="Mesi di ogni periodo, terminante con il mese indicato (es. 3 = trimestre mobile)")
+    batch.add_argument("--ofa", nargs="+", required=True, help="File Excel della trace OFA (anche più file)")
+    add_extraction_arguments(batch)
+    batch.set_defaults(handler=run_batch)
+
+    kpi_parser = subparsers.add_parser("kpi", help="Calcola i KPI OFA dai file prodotti dal comando extract")
+    kpi_parser.add_argument("--from", dest="date_from", type=parse_date, required=True, help="Data di inizio (aaaa-mm-gg)")
+    kpi_parser.add_argument("--to", dest="date_to", type=parse_date, required=True, help="Data di fine (aaaa-mm-gg)")
+    kpi_parser.add_argument("--ofa", required=True, help="File Excel della trace OFA")
+    kpi_parser.add_argument("--out", help="Directory dei file delle estrazioni e del file dei KPI "
+                                          "(default: save_directory della configurazione)")
+    kpi_parser.add_argument("--config", default=constants.configuration_json, help="File di configurazione JSON")
+    kpi_parser.set_defaults(handler=run_kpi)
+    return parser
+
+
+def main(argv=None) -> int:
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stderr)]
+    )
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+from collections import deque
+from typing import Dict, List
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt
+from PyQt5.QtGui import QIcon
+from PyQt5.QtWidgets import QListView
+import Config.constants as constants
+
+
+def configure_view(view: QListView) -> None:
+    """
+    Imposta la vista dei messaggi di log per molte righe (da chiamare prima di setModel)
+    """
+    # Righe di altezza uniforme: la vista non deve misurare ogni riga
+    view.setUniformItemSizes(True)
+    # Disposizione delle righe a blocchi: con la modalità predefinita ogni inserimento ricalcola
+    # la disposizione di tutte le righe e lo scorrimento all'ultima riga diventa sempre più lento
+    view.setLayoutMode(QListView.Batched)
+    view.setBatchSize(constants.LOG_VIEW_BATCH_SIZE)
+
+
+class LogListModel(QAbstractListModel):
+    """
+    Modello dei messaggi di log visualizzati nella finestra principale (QListView).
+
+    I messaggi vengono accumulati in un buffer e inseriti nel modello solo alla chiamata di flush()
+    (eseguita da un timer), così la vista viene aggiornata al massimo una volta per intervallo
+    anche quando arrivano migliaia di messaggi. I messaggi identici consecutivi vengono uniti
+    in una sola riga con il numero di ripetizioni; oltre max_entries le righe più vecchie vengono eliminate.
+    """
+
+    def __init__(self, icons: Dict[str, QIcon], max_entries: int = constants.LOG_MAX_ENTRIES, parent=None):
+        """
+        Args:
+            icons: Icone per tipo di messaggio {'info': QIcon, 'error': QIcon, ...}
+            max_entries: Numero massimo di righe mantenute
+            parent: Oggetto genitore Qt
+        """
+        super().__init__(parent)
+        self.icons = icons
+        self.max_entries = max_entries
+        # Ogni riga è una lista [messaggio, tipo icona, ripetizioni]
+        self._rows = deque()
+        self._pending: List[list] = []
+
+    def append(self, message: str, icon_type: str = 'info') -> None:
+        """
+        Aggiunge un messaggio al buffer (visualizzato al successivo flush)
+        """
+        if self._pending and self._pending[-1][0] == message and self._pending[-1][1] == icon_type:
+            self._pending[-1][2] += 1
+        else:
+            self._pending.append([message, icon_type, 1])
+
+    def flush(self) -> int:
+        """
+        Inserisce nel modello i messaggi accumulati
+
+        Returns:
+            int: Numero di messaggi inseriti
+        """
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, []
+        # Il primo messaggio può essere la ripetizione dell'ultima riga già visualizzata
+        if self._rows and pending[0][:2] == self._rows[-1][:2]:
+            self._rows[-1][2] += pending.pop(0)[2]
+            index = self.index(len(self._rows) - 1)
+            self.dataChanged.emit(index, index, [Qt.DisplayRole])
+        if not pending:
+            return 0
+        pending = pending[-self.max_entries:]
+        # Elimina le righe più vecchie per rispettare il limite
+        overflow = len(self._rows) + len(pending) - self.max_entries
+        if overflow > 0:
+            self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+            for _ in range(overflow):
+                self._rows.popleft()
+            self.endRemoveRows()
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(pending) - 1)
+        self._rows.extend(pending)
+        self.endInsertRows()
+        return len(pending)
+
+    def clear(self) -> None:
+        """
+        Elimina tutti i messaggi
+        """
+        self.beginResetModel()
+        self._rows.clear()
+        self._pending = []
+        self.endResetModel()
+
+    def text(self, row: int) -> str:
+        """
+        Restituisce il testo visualizzato per una riga
+        """
+        message, _, count = self._rows[row]
+        return message if count == 1 else f"{message} (x{count})"
+
+    def texts(self) -> List[str]:
+        """
+        Restituisce il testo di tutte le righe
+        """
+        return [self.text(row) for row in range(len(self._rows))]
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._rows):
+            return None
+        if role == Qt.DisplayRole:
+            return self.text(index.row())
+        if role == Qt.DecorationRole:
+            return self.icons.get(self._rows[index.row()][1])
+        return None
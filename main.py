@@ -1,17 +1,19 @@
 import sys
 import os
-import json
 import pandas as pd
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                             QHBoxLayout, QLabel, QDateEdit, QFileDialog, QLineEdit,
                             QSizePolicy, QPushButton, QStatusBar, QMessageBox,
-                            QListWidget, QGroupBox, QProgressBar, QMenu, QAction,
-                            QListWidgetItem, QStyle)
+                            QGroupBox, QProgressBar, QMenu, QAction,
+                            QStyle, QListView, QAbstractItemView)
 from PyQt5.QtGui import QCursor
-from PyQt5.QtCore import QDate, Qt
-import SAP_Connection
-import SAP_Transactions
+from PyQt5.QtCore import QDate, Qt, QThread, QTimer, pyqtSlot
+import DF_Tools
+import OFA_Cache
+import extraction_worker
+import log_model
 import Config.constants as constants
+import Config.settings as settings
 import openpyxl
 import logging
 import time
@@ -44,6 +46,9 @@ class MainWindow(QMainWindow):
         self.df_AdM = None
         self.df_OdM = None
         self.excel_file_path = None  # Percorso del file Excel selezionato
+        # Thread e worker delle estrazioni SAP (None quando non ci sono estrazioni in corso)
+        self.extraction_thread = None
+        self.extraction_worker = None
 
         # Imposta i flag della finestra per mostrare solo il pulsante di chiusura
         #self.setWindowFlags(self.windowFlags() & ~Qt.WindowMaximizeButtonHint & ~Qt.WindowMinimizeButtonHint)
@@ -143,7 +148,17 @@ class MainWindow(QMainWindow):
         content_layout.addWidget(left_group, 0)
 
         # Aggiungi un'area di testo per il log delle operazioni
-        self.log_list = QListWidget()
+        self.log_model = log_model.LogListModel({
+            'info': self.style().standardIcon(QStyle.SP_MessageBoxInformation),
+            'error': self.style().standardIcon(QStyle.SP_MessageBoxCritical),
+            'success': self.style().standardIcon(QStyle.SP_DialogApplyButton),
+            'warning': self.style().standardIcon(QStyle.SP_MessageBoxWarning),
+            'loading': self.style().standardIcon(QStyle.SP_BrowserReload),
+        }, parent=self)
+        self.log_list = QListView()
+        log_model.configure_view(self.log_list)
+        self.log_list.setModel(self.log_model)
+        self.log_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.log_list.setMinimumWidth(200)
         # Imposta la policy di dimensionamento per il campo di testo
         self.log_list.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)        
@@ -156,6 +171,13 @@ class MainWindow(QMainWindow):
         self.log_list.setContextMenuPolicy(Qt.CustomContextMenu)
         self.log_list.customContextMenuRequested.connect(self.show_context_menu) 
 
+        # I messaggi di log e la statusBar vengono aggiornati a intervalli regolari
+        self._pending_status_message = None
+        self.log_flush_timer = QTimer(self)
+        self.log_flush_timer.setInterval(constants.LOG_FLUSH_INTERVAL_MS)
+        self.log_flush_timer.timeout.connect(self.flush_log)
+        self.log_flush_timer.start()
+
         # Imposta l'allineamento in alto per il gruppo di sinistra
         content_layout.setAlignment(left_group, Qt.AlignTop)
 
@@ -175,6 +197,11 @@ class MainWindow(QMainWindow):
         self.reset_button.setFixedWidth(80)
         self.reset_button.clicked.connect(self.on_reset_clicked)
         button_layout.addWidget(self.reset_button)
+        # Pulsante per svuotare la cache dei file Excel elaborati
+        self.clear_cache_button = QPushButton("Svuota cache")
+        self.clear_cache_button.setFixedWidth(80)
+        self.clear_cache_button.clicked.connect(self.on_clear_cache_clicked)
+        button_layout.addWidget(self.clear_cache_button)
         # Pulsante per l'uscita
         self.exit_button = QPushButton("Esci")          
         self.exit_button.setFixedWidth(80)
@@ -235,13 +262,27 @@ class MainWindow(QMainWindow):
         self.file_text.clear()
         self.start_date_picker.setDate(QDate.currentDate())
         self.end_date_picker.setDate(QDate.currentDate())
-        self.log_list.clear()
+        self.log_model.clear()
         self.log_unified("Eseguito reset dell'applicativo", "info")
         self.start_button.setEnabled(False)
         self.excel_file_path = None  # Resetta il percorso del file Excel   
 
+    def on_clear_cache_clicked(self):
+        """Elimina i DataFrame dei file Excel salvati nella cache"""
+        removed = self.get_ofa_cache().clear()
+        self.log_unified(f"Cache svuotata: eliminati {removed} file elaborati", "info")
+
+    def get_ofa_cache(self) -> OFA_Cache.OFACache:
+        """Restituisce la cache dei file Excel, posizionata nella cartella di salvataggio configurata"""
+        save_directory = self.config.get("save_directory", constants.default_config["save_directory"])
+        return OFA_Cache.OFACache(os.path.join(save_directory, constants.OFA_CACHE_DIRNAME))
+
     def closeEvent(self, event):
         """Gestisce l'evento di chiusura della finestra"""
+        # Attende il termine dell'estrazione in corso prima di chiudere
+        if self.extraction_thread is not None:
+            self.extraction_worker.cancel()
+            self.extraction_thread.wait()
         self.log_unified("Applicazione terminata", "info")
         event.accept()
         # Chiude l'applicazione
@@ -270,6 +311,18 @@ class MainWindow(QMainWindow):
             # Salva il percorso completo come attributo dell'oggetto
             self.excel_file_path = file_path
             
+            # Verifica se il file è già stato elaborato: in tal caso i DataFrame sono letti dalla cache
+            ofa_cache = self.get_ofa_cache()
+            start_time = time.perf_counter()
+            cached = ofa_cache.load(file_path)
+            if cached is not None and "AdM" in cached and "OdM" in cached:
+                self.df_AdM, self.df_OdM = cached["AdM"], cached["OdM"]
+                msg = (f"File excel letto dalla cache in {time.perf_counter() - start_time:.3f} s - "
+                       f"AdM: {len(self.df_AdM)}, OdM: {len(self.df_OdM)}")
+                self.log_unified(msg, "success")
+                self.start_button.setEnabled(True)
+                return True
+
             # Verifica lo sheet
             self.log_unified("Verifico file excel", "loading", update_status=False, update_log=True)
             result, df = self.check_excel_file()
@@ -295,6 +348,9 @@ class MainWindow(QMainWindow):
                     return False
                 msg = f"OdM estratti: {len(self.df_OdM)}"
                 self.log_unified(msg)
+                # Salva i DataFrame nella cache per le selezioni successive dello stesso file
+                if ofa_cache.store(file_path, {"AdM": self.df_AdM, "OdM": self.df_OdM}):
+                    self.log_unified("DataFrame AdM/OdM salvati nella cache", "info")
                 # Abilita il pulsante di avvio
                 self.start_button.setEnabled(True)
                 self.log_unified("File excel caricato correttamente", "success")
@@ -313,23 +369,9 @@ class MainWindow(QMainWindow):
 
     def load_config(self):
         """Carica la configurazione dal file o utilizza valori predefiniti"""
-        default_config = constants.default_config        
-        if not os.path.exists(self.config_file):
-            msg = "File di configurazione non trovato, utilizzo valori predefiniti"
-            self.log_unified("msg", 'warning')
-            return default_config
-        
-        try:
-            with open(self.config_file, 'r') as f:
-                config = json.load(f)
-            msg = "Configurazione caricata con successo"
-            self.log_unified(msg, 'success')
-            return config
-        except Exception as e:
-            # Se c'è un errore nel caricamento, restituisco la configurazione predefinita
-            msg = f"Errore nel caricamento della configurazione: {str(e)}"
-            self.log_unified(msg, 'warning')
-            return default_config        
+        config, level, msg = settings.load_config(self.config_file)
+        self.log_unified(msg, level)
+        return config
     
     def on_date_changed(self):
         start_date = self.start_date_picker.date()
@@ -344,6 +386,10 @@ class MainWindow(QMainWindow):
             self.start_button.setEnabled(True)
     
     def on_start_clicked(self):
+        # Durante un'estrazione il pulsante funziona da annullamento
+        if self.extraction_worker is not None:
+            self.extraction_worker.cancel()
+            return
         self.log_unified("Avvio estrazioni SAP")
         # Verifico se è stato selezionato un file
         self.log_unified("Verifico selezione file excel")
@@ -370,62 +416,48 @@ class MainWindow(QMainWindow):
                 self.log_unified("Errore nella verifica dei codici tecnologia", "critical")
                 return  # Esce dal metodo se la configurazione non è valida
 
-            # estraggo i dati da SAP
+            # Verifica della directory di salvataggio
+            save_dir = self.config.get("save_directory", "")
+            if not save_dir or not os.path.exists(save_dir):
+                self.log_unified("Errore: Directory di salvataggio non valida", "critical")
+                return
+
+            # estraggo i dati da SAP in un thread secondario
             self.log_unified("Avvio estrazione SAP...")
-            try:
-                # Verifica della directory di salvataggio
-                save_dir = self.config.get("save_directory", "")
-                if not save_dir or not os.path.exists(save_dir):
-                    self.log_unified("Errore: Directory di salvataggio non valida", "critical")
-                    return
-                with SAP_Connection.SAPGuiConnection() as sap:
-                    if sap.is_connected():
-                        session = sap.get_session()
-                        if session:
-                            self.log_unified("Connessione SAP attiva")
-                            extractor = SAP_Transactions.SAPDataExtractor(session, self)
-                            # Connetti il segnale a una lambda che gestisce i parametri, incluso origin
-                            extractor.logMessage.connect(
-                                lambda msg, lvl, upd_status, upd_log, min_time, origin, args, kwargs: 
-                                    self.log_unified(msg, lvl, upd_status, upd_log, min_time, origin, *args, **kwargs)
-                            )
-                            # Estrazione dati AdM
-                            self.log_unified("Estrazione dati IW29", "info", True, True, 0)
-                            result, df_IW29 = extractor.extract_IW29(start_date, end_date, tech_config, self.df_AdM["idItem"] )
-                            if not result:
-                                self.log_unified("Errore: Estrazione IW29 fallita", "error", True, True, 0)
-                                return
-                            # Salva il DataFrame in un file Excel
-                            output_file = os.path.join(save_dir, "IW29_AdM.xlsx")
-                            if df_IW29.to_excel(output_file, index=False):
-                                self.log_unified(f"File salvato in: {output_file}", "success", True, True, 0)
-                            else:
-                                self.log_unified("Errore: Salvataggio file IW29 fallito", "error", True, True, 0)
-                                return
-                            # Estrazione dati OdM
-                            self.statusBar.showMessage("Estrazione dati IW39")
-                            result, df_IW39 = extractor.extract_IW39(start_date, end_date, tech_config, self.df_OdM)
-                            if not result:
-                                self.log_unified("Errore: Estrazione IW39 fallita", "error", True, True, 0)
-                                return
-                            # Salva il DataFrame in un file Excel
-                            output_file = os.path.join(save_dir, "IW39_OdM.xlsx")
-                            if df_IW39.to_excel(output_file, index=False):
-                                self.log_unified(f"File salvato in: {output_file}", "success", True, True, 0)
-                            else:
-                                self.log_unified("Errore: Salvataggio file IW39 fallito", "error", True, True, 0)
-                                return
-                            # Estrazione dati completata
-                            self.log_unified("Estrazione completata con successo", "success", True, True, 0)
-                    else:
-                        self.log_unified("Connessione SAP NON attiva", "error", True, True, 0)
-                        return
-            except Exception as e:
-                msg = (f"Estrazione dati SAP: Errore: {str(e)}")
-                self.log_unified(msg, "error", True, True, 0)
-                return           
-            # ------------estrazione SAP completata---------------            
-        
+            self.extraction_thread = QThread(self)
+            self.extraction_worker = extraction_worker.ExtractionWorker(
+                start_date, end_date, tech_config, self.df_AdM["idItem"].copy(), self.df_OdM.copy(), save_dir,
+                self.config.get("operations"))
+            self.extraction_worker.moveToThread(self.extraction_thread)
+            self.extraction_thread.started.connect(self.extraction_worker.run)
+            self.extraction_worker.logMessage.connect(self.on_worker_log)
+            self.extraction_worker.finished.connect(self.on_extraction_finished)
+            self.extraction_worker.finished.connect(self.extraction_thread.quit)
+            self.extraction_thread.finished.connect(self.extraction_worker.deleteLater)
+            self.extraction_thread.finished.connect(self.extraction_thread.deleteLater)
+            self.set_extraction_running(True)
+            self.extraction_thread.start()
+            # ------------estrazione SAP avviata---------------            
+        
+    def set_extraction_running(self, running):
+        """Aggiorna i pulsanti durante l'esecuzione delle estrazioni"""
+        self.start_button.setText("Annulla" if running else "Avvia")
+        self.browse_button.setEnabled(not running)
+        self.reset_button.setEnabled(not running)
+
+    @pyqtSlot(str, str, bool, bool, object, str, tuple, dict)
+    def on_worker_log(self, msg, lvl, upd_status, upd_log, min_time, origin, args, kwargs):
+        """Riceve nel thread della GUI i messaggi di log del thread di estrazione"""
+        self.log_unified(msg, lvl, upd_status, upd_log, min_time, origin, *args, **kwargs)
+
+    @pyqtSlot(bool, str)
+    def on_extraction_finished(self, success, message):
+        """Termine del thread di estrazione"""
+        self.log_unified(message, "success" if success else "error", True, True, 0)
+        self.extraction_worker = None
+        self.extraction_thread = None
+        self.set_extraction_running(False)
+
     def normalize_df(self, df) -> tuple[bool, pd.DataFrame | None]:
         """
         Estrae i dati AdM dal DataFrame fornito, elaborando i dati presenti nella colonna "idItem"
@@ -450,39 +482,12 @@ class MainWindow(QMainWindow):
             # Rimuovi eventuali valori nulli
             id_items_df = id_items_df.dropna(subset=["idItem"])
             
-            # Funzione per estrarre la parte prima del primo - o / e convertire in intero
-            def extract_base_id(id_text):
-                if not isinstance(id_text, str):
-                    try:
-                        # Se è già un numero, prova a convertirlo direttamente
-                        return int(id_text)
-                    except (ValueError, TypeError):
-                        return None
-                        
-                # Cerca il primo trattino o slash
-                dash_pos = id_text.find('-')
-                slash_pos = id_text.find('/')
-                
-                # Determina quale carattere appare per primo (se presente)
-                if dash_pos >= 0 and (slash_pos < 0 or dash_pos < slash_pos):
-                    base_id = id_text[:dash_pos]
-                elif slash_pos >= 0:
-                    base_id = id_text[:slash_pos]
-                else:
-                    base_id = id_text  # Nessun trattino o slash trovato
-                    
-                # Converti in intero se possibile
-                try:
-                    return int(base_id)
-                except ValueError:
-                    # Se non può essere convertito, mantieni come stringa
-                    self.log_unified(f"Impossibile convertire '{base_id}' in intero", "error", True, True, 0)
-            
-            # Applica la funzione a tutti i valori nella colonna idItem
-            # Crea un nuovo DataFrame con entrambe le colonne per verificare il funzionamento
-            new_df = id_items_df.copy()
-            new_df['idItem_base'] = id_items_df['idItem'].apply(extract_base_id)
-            id_items_df['idItem'] = id_items_df['idItem'].apply(extract_base_id)
+            # Estrae la parte prima del primo - o / e la converte in intero (operazione vettoriale)
+            id_items_df['idItem'], invalid = DF_Tools.DataFrameTools.extract_base_ids(id_items_df['idItem'])
+            if not invalid.empty:
+                # Un unico messaggio riepilogativo per tutti i valori non convertibili
+                examples = ", ".join(f"'{value}'" for value in invalid.unique()[:10])
+                self.log_unified(f"Impossibile convertire {len(invalid)} idItem in intero (es. {examples})", "error", True, True, 0)
             
             # Rimuovi eventuali duplicati
             id_items_df = id_items_df.drop_duplicates()
@@ -540,12 +545,12 @@ class MainWindow(QMainWindow):
                 return False, None
                 
             # Filtra il DataFrame per ottenere solo i valori minori di 2000000000
-            AdM_df = df_numeric[df_numeric["idItem"] < 2000000000]
+            AdM_df = df_numeric[df_numeric["idItem"] < constants.OdM_THRESHOLD]
             
             # Resetta l'indice
             AdM_df = AdM_df.reset_index(drop=True)
             
-            msg = (f"Filtrati {len(AdM_df)} record con idItem < 2000000000 su {len(df)} totali")
+            msg = (f"Filtrati {len(AdM_df)} record con idItem < {constants.OdM_THRESHOLD} su {len(df)} totali")
             self.log_unified(msg, "success", True, True, 0)
             return True, AdM_df
             
@@ -589,12 +594,12 @@ class MainWindow(QMainWindow):
                 return False, None
                 
             # Filtra il DataFrame per ottenere solo i valori maggiori di 2000000000
-            OdM_df = df_numeric[df_numeric["idItem"] > 2000000000]
+            OdM_df = df_numeric[df_numeric["idItem"] > constants.OdM_THRESHOLD]
             
             # Resetta l'indice
             OdM_df = OdM_df.reset_index(drop=True)
             
-            msg = (f"Filtrati {len(OdM_df)} record con idItem > 2000000000 su {len(df)} totali")
+            msg = (f"Filtrati {len(OdM_df)} record con idItem > {constants.OdM_THRESHOLD} su {len(df)} totali")
             self.log_unified(msg, "success", True, True, 0)
             return True, OdM_df
             
@@ -621,37 +626,34 @@ class MainWindow(QMainWindow):
             msg = (f"Verifica del file Excel: {self.excel_file_path}")
             self.log_unified(msg, "info", True, True, 0)
 
-            # Ottieni la lista degli sheet nel file
-            excel_file = pd.ExcelFile(self.excel_file_path)
-            sheet_names = excel_file.sheet_names
-            msg = (f"Sheet presenti nel file: {', '.join(sheet_names)}")
-            self.log_unified(msg, "info", True, True, 0)
-            
-            # Definisci il nome dello sheet da cercare
+            # Apre il file una sola volta e legge solo le colonne richieste
             required_sheet = constants.required_sheet
+            required_columns = constants.required_columns
+            result, df, info = DF_Tools.DataFrameTools.read_excel_sheet(
+                self.excel_file_path, required_sheet, required_columns,
+                constants.required_columns_dtypes, constants.EXCEL_READER_ENGINE)
+            msg = (f"Sheet presenti nel file: {', '.join(info['sheet_names'])}")
+            self.log_unified(msg, "info", True, True, 0)
+            timings = ", ".join(f"{phase} {seconds:.2f} s" for phase, seconds in info["timings"].items())
+            self.log_unified(f"Lettura file Excel ({info['engine']}): {timings}", "info", True, True, 0)
             
             # Verifica se lo sheet esiste
-            if required_sheet in sheet_names:
+            if df is not None:
                 msg = (f"Sheet '{required_sheet}' trovato nel file")
                 self.log_unified(msg, "success", True, True, 0)
-                # Leggi i dati dallo sheet
-                df = pd.read_excel(self.excel_file_path, sheet_name=required_sheet)
-                
-                # Definisci le colonne richieste
-                required_columns = constants.required_columns
                 
-                msg = (f"Colonne presenti nel file: {', '.join(df.columns)}")
+                msg = (f"Colonne presenti nel file: {', '.join(map(str, info['columns']))}")
                 self.log_unified(msg, "info", True, True, 0)
                 
                 # Verifica se tutte le colonne richieste sono presenti
-                missing_columns = [col for col in required_columns if col not in df.columns]
+                missing_columns = info["missing_columns"]
                 
                 if missing_columns:
                     # Alcune colonne sono mancanti
                     missing_cols_str = ", ".join(missing_columns)
                     msg = f"Errore: Colonne mancanti: {missing_cols_str}"
                     self.log_unified(msg, "error", True, True, 0)
-                    msg = (f"Colonne disponibili: {', '.join(df.columns)}")
+                    msg = (f"Colonne disponibili: {', '.join(map(str, info['columns']))}")
                     self.log_unified(msg, "error", True, True, 0)
                     return False, None
                 else:
@@ -768,28 +770,23 @@ class MainWindow(QMainWindow):
         self.log_unified("Verifica tecnologie configurate - OK", "success")
         return True
     # --------------------------------------------------------------------------------------------------------
-    # Funzioni per scrivere messaggi nel log nel QListWidget con icona appropriata
+    # Funzioni per scrivere messaggi nel log (modello della QListView) con icona appropriata
     # --------------------------------------------------------------------------------------------------------
     def log_message(self, message, icon_type='info'):
         """
-        Aggiunge un messaggio al log con un'icona Qt
+        Aggiunge un messaggio al log con un'icona Qt (visualizzato al successivo aggiornamento della finestra)
+        """
+        self.log_model.append(message, icon_type)
+
+    def flush_log(self):
+        """
+        Aggiorna la finestra di log e la statusBar con i messaggi ricevuti dall'ultimo aggiornamento
         """
-        item = QListWidgetItem(message)
-        
-        # Imposta l'icona in base al tipo
-        if icon_type == 'info':
-            item.setIcon(self.style().standardIcon(QStyle.SP_MessageBoxInformation))
-        elif icon_type == 'error':
-            item.setIcon(self.style().standardIcon(QStyle.SP_MessageBoxCritical))
-        elif icon_type == 'success':
-            item.setIcon(self.style().standardIcon(QStyle.SP_DialogApplyButton))
-        elif icon_type == 'warning':
-            item.setIcon(self.style().standardIcon(QStyle.SP_MessageBoxWarning))
-        elif icon_type == 'loading':
-            item.setIcon(self.style().standardIcon(QStyle.SP_BrowserReload))
-        
-        self.log_list.addItem(item)
-        self.log_list.scrollToBottom()
+        if self.log_model.flush():
+            self.log_list.scrollToBottom()
+        if self._pending_status_message is not None:
+            self.statusBar.showMessage(self._pending_status_message)
+            self._pending_status_message = None
 
     # --------------------------------------------------------------------------------------------------------
     # Metodo unificato per gestire log attraverso tutti i canali disponibili.
@@ -831,7 +828,7 @@ class MainWindow(QMainWindow):
         }
         icon_type = icon_map.get(level, "info")  # default a info se il livello non è mappato
         
-        # 2. Registra nel QListWidget di log con l'icona appropriata (se richiesto)
+        # 2. Registra nella finestra di log con l'icona appropriata (se richiesto)
         if update_log:
             self.log_message(formatted_message, icon_type)
         
@@ -913,7 +910,8 @@ class MainWindow(QMainWindow):
                 prefix = prefix_map.get(level, "")
                 status_message = f"{prefix}{formatted_message}"
                 
-                self.statusBar.showMessage(status_message)
+                # Il messaggio viene mostrato al successivo aggiornamento (flush_log)
+                self._pending_status_message = status_message
                 
                 # Aggiorna le informazioni sull'ultimo stato
                 self._last_status_level = level
@@ -942,17 +940,15 @@ class MainWindow(QMainWindow):
 
     def copy_selected_items(self):
         # Copia solo gli elementi selezionati
-        selected_items = self.log_list.selectedItems()
-        if selected_items:
-            text = "\n".join(item.text() for item in selected_items)
+        selected_rows = sorted(index.row() for index in self.log_list.selectionModel().selectedRows())
+        if selected_rows:
+            text = "\n".join(self.log_model.text(row) for row in selected_rows)
             QApplication.clipboard().setText(text)
             print("Elementi selezionati copiati negli appunti")        
 
     def copy_all_items(self):
         # Copia tutti gli elementi
-        all_items = []
-        for i in range(self.log_list.count()):
-            all_items.append(self.log_list.item(i).text())
+        all_items = self.log_model.texts()
         
         text = "\n".join(all_items)
         QApplication.clipboard().setText(text)
@@ -0,0 +1,161 @@
+"""
+Trace delle azioni degli utenti OFA indicizzata sull'id di base degli idItem, per il collegamento
+con le estrazioni SAP (avvisi IW29, ordini IW39).
+
+A differenza di MainWindow.normalize_df, che conserva solo gli idItem distinti, la trace mantiene
+tutte le azioni con il loro contesto (utente, paese, tecnologia, azione, data): la normalizzazione
+degli idItem viene eseguita una sola volta alla creazione e riutilizzata da tutti i collegamenti e i KPI.
+"""
+import logging
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+import Config.constants as constants
+from DF_Tools import DataFrameTools
+
+# Logger specifico per questo modulo
+logger = logging.getLogger("OFA_Trace")
+
+# Nome dell'indice della trace (id di base dell'idItem)
+INDEX_NAME = "id"
+# Tipo di elemento SAP a cui si riferisce ogni azione
+ITEM_NOTIFICATION = "Avviso"
+ITEM_ORDER = "Ordine"
+ITEM_OTHER = "Altro"
+# Colonne aggiunte da join per indicare l'estrazione SAP in cui è presente l'elemento
+SOURCE_COLUMN = "Estrazione"
+
+
+class OFATrace:
+    """
+    Trace OFA tipizzata: una riga per azione, indice int64 ordinato con l'id di base dell'idItem
+    (es. '210001141411/0010' -> 210001141411). Le azioni con idItem mancante o non convertibile
+    sono escluse e conteggiate in invalid_count.
+    """
+
+    def __init__(self, df_ofa: pd.DataFrame):
+        """
+        Args:
+            df_ofa: Trace OFA letta dal file Excel (colonne constants.required_columns)
+        """
+        base_ids, invalid = DataFrameTools.extract_base_ids(df_ofa["idItem"])
+        valid = base_ids.notna().to_numpy(dtype=bool)
+        self.invalid_count = int((~valid).sum())
+        self.invalid_examples = list(invalid.unique()[:10])
+
+        ids = base_ids.to_numpy(dtype="float64", na_value=np.nan)[valid].astype("int64")
+        # ordinamento stabile: le azioni dello stesso id restano nell'ordine del file
+        order = np.argsort(ids, kind="stable")
+        ids = ids[order]
+        rows = np.flatnonzero(valid)[order]
+
+        columns = {}
+        for column in df_ofa.columns:
+            values = df_ofa[column].iloc[rows]
+            if column == "creationDate":
+                # formato della trace: 2025-04-01T00:13:05.091Z
+                values = pd.to_datetime(values, errors="coerce", utc=True, format="ISO8601")
+            elif column == "idItem":
+                # valori originali (numeri e stringhe con suffisso)
+                pass
+            elif not isinstance(values.dtype, pd.CategoricalDtype):
+                # colonne con pochi valori distinti ripetuti su molte azioni
+                values = values.astype("category")
+            columns[column] = values.array
+        lower = 10 ** (constants.KPI_NOTIFICATION_DIGITS - 1)
+        is_notification = (ids >= lower) & (ids < lower * 10) & (ids < constants.OdM_THRESHOLD)
+        is_order = ids > constants.OdM_THRESHOLD
+        columns["Tipo"] = pd.Categorical(
+            np.where(is_notification, ITEM_NOTIFICATION, np.where(is_order, ITEM_ORDER, ITEM_OTHER)),
+            categories=[ITEM_NOTIFICATION, ITEM_ORDER, ITEM_OTHER])
+        self.frame = pd.DataFrame(columns, index=pd.Index(ids, name=INDEX_NAME))
+        logger.info(f"Trace OFA: {len(self.frame)} azioni, {self.frame.index.nunique()} idItem distinti, "
+                    f"{self.invalid_count} idItem non convertibili")
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def item_ids(self, item_type: str) -> pd.Index:
+        """
+        Restituisce gli id distinti (Index int64 ordinato) delle azioni di un tipo (ITEM_NOTIFICATION, ITEM_ORDER)
+        """
+        index = self.frame.index[self.frame["Tipo"].to_numpy() == item_type]
+        return index.unique()
+
+    @property
+    def notification_ids(self) -> pd.Index:
+        return self.item_ids(ITEM_NOTIFICATION)
+
+    @property
+    def order_ids(self) -> pd.Index:
+        return self.item_ids(ITEM_ORDER)
+
+    def join(self, df_IW29: Optional[pd.DataFrame] = None, df_IW39: Optional[pd.DataFrame] = None,
+             columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Collega alle azioni della trace gli attributi degli avvisi e degli ordini estratti da SAP.
+        Le tabelle SAP vengono indicizzate sull'identificativo (Avviso, Ordine) e unite con un merge
+        sull'indice della trace; le azioni senza elemento SAP corrispondente hanno attributi mancanti.
+
+        Args:
+            df_IW29: Avvisi (extract_IW29, oppure IW29_AdM.xlsx)
+            df_IW39: Ordini (extract_IW39, oppure IW39_OdM.xlsx)
+            columns: Colonne SAP da collegare (default: tutte le colonne presenti)
+
+        Returns:
+            DataFrame della trace con le colonne SAP e la colonna SOURCE_COLUMN (IW29, IW39 o mancante),
+            con lo stesso indice ordinato
+        """
+        parts = []
+        for df, key, source in ((df_IW29, "Avviso", "IW29"), (df_IW39, "Ordine", "IW39")):
+            if df is None or df.empty or key not in df.columns:
+                continue
+            part = df[df[key].notna()]
+            if columns is not None:
+                part = part[[key, *[column for column in columns if column in part.columns and column != key]]]
+            # un avviso/ordine per riga: le righe ripetute delle estrazioni non moltiplicano le azioni
+            part = part.drop_duplicates(subset=key).set_index(part[key].astype("int64").rename(INDEX_NAME))
+            part[SOURCE_COLUMN] = source
+            parts.append(part)
+        if not parts:
+            return self.frame.assign(**{SOURCE_COLUMN: pd.Series(pd.NA, index=self.frame.index, dtype=object)})
+        # avvisi e ordini hanno id disgiunti (constants.OdM_THRESHOLD): un'unica tabella ordinata
+        sap = pd.concat(parts, sort=False).sort_index()
+        sap = sap.drop(columns=[column for column in sap.columns if column in self.frame.columns])
+        return self.frame.merge(sap, how="left", left_index=True, right_index=True)
+
+    @staticmethod
+    def slice_kpi(joined: pd.DataFrame, by: List[str], start=None, end=None) -> pd.DataFrame:
+        """
+        KPI delle azioni per gruppo (es. per utente o per azione) sul risultato di join
+
+        Args:
+            joined: Trace collegata alle estrazioni SAP (join)
+            by: Colonne della trace utilizzate come gruppi (es. ['user'], ['action'])
+            start: Data di inizio del periodo per gli avvisi pianificati (colonna Inizio card.)
+            end: Data di fine del periodo per gli avvisi pianificati
+
+        Returns:
+            DataFrame con una riga per gruppo: Azioni, Azioni su SAP e avvisi/ordini distinti presenti in SAP
+        """
+        source = joined[SOURCE_COLUMN].astype(object)
+        notifications = source.eq("IW29").to_numpy(dtype=bool)
+        orders = source.eq("IW39").to_numpy(dtype=bool)
+        on_sap = notifications | orders
+        ids = joined.index.to_numpy()
+        flags = joined[by].copy()
+        flags["Azioni"] = 1
+        flags["Azioni su SAP"] = on_sap.astype("int64")
+        # elementi distinti: l'id viene conteggiato solo nelle righe dello stesso tipo
+        flags["Avvisi"] = np.where(notifications, ids, np.nan)
+        flags["Ordini"] = np.where(orders, ids, np.nan)
+        aggregations = {"Azioni": "sum", "Azioni su SAP": "sum", "Avvisi": "nunique", "Ordini": "nunique"}
+        if start is not None and end is not None and constants.AFKO_START_COLUMN in joined.columns:
+            planned_start = pd.to_datetime(joined[constants.AFKO_START_COLUMN], errors="coerce")
+            planned = planned_start.between(pd.Timestamp(start), pd.Timestamp(end)).to_numpy(dtype=bool)
+            flags["Avvisi pianificati"] = np.where(notifications & planned, ids, np.nan)
+            aggregations["Avvisi pianificati"] = "nunique"
+        table = flags.groupby(by, observed=True, sort=True).agg(aggregations)
+        return table.reset_index()
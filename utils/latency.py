@@ -0,0 +1,86 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List
+
+
+class LatencyRecorder:
+    """
+    Raccoglie i tempi delle chiamate verso SAP distinguendo il tempo di elaborazione
+    effettivo di SAP dal tempo perso nell'attesa (intervalli di polling, pause fisse).
+
+    Può essere condiviso fra più estrattori che lavorano in parallelo su sessioni diverse.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records: Dict[str, List[tuple]] = defaultdict(list)
+
+    def record(self, label: str, sap_seconds: float, overhead_seconds: float = 0.0, polls: int = 0) -> None:
+        """
+        Registra una chiamata
+
+        Args:
+            label: Nome dell'operazione (es. 'Esecuzione lista')
+            sap_seconds: Tempo attribuito all'elaborazione SAP
+            overhead_seconds: Tempo di attesa in eccesso (limite superiore)
+            polls: Numero di controlli eseguiti durante l'attesa
+        """
+        with self._lock:
+            self._records[label].append((sap_seconds, overhead_seconds, polls))
+
+    @contextmanager
+    def measure(self, label: str):
+        """
+        Misura la durata di un blocco di codice e la registra come tempo SAP
+
+        Args:
+            label: Nome dell'operazione
+        """
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(label, time.perf_counter() - start_time)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Restituisce le statistiche aggregate per operazione
+
+        Returns:
+            dict: {label: {'calls', 'sap_total', 'overhead_total', 'sap_avg', 'sap_max', 'polls'}}
+        """
+        with self._lock:
+            result = {}
+            for label, records in self._records.items():
+                sap_times = [r[0] for r in records]
+                result[label] = {
+                    "calls": len(records),
+                    "sap_total": sum(sap_times),
+                    "overhead_total": sum(r[1] for r in records),
+                    "sap_avg": sum(sap_times) / len(records),
+                    "sap_max": max(sap_times),
+                    "polls": sum(r[2] for r in records),
+                }
+            return result
+
+    def report_lines(self) -> List[str]:
+        """
+        Restituisce il riepilogo delle statistiche in forma testuale, una riga per operazione
+        """
+        lines = []
+        for label, stats in sorted(self.summary().items(), key=lambda item: -item[1]["sap_total"]):
+            lines.append(
+                f"{label}: {stats['calls']} chiamate, SAP {stats['sap_total']:.2f} s "
+                f"(media {stats['sap_avg']:.2f} s, max {stats['sap_max']:.2f} s), "
+                f"attesa in eccesso {stats['overhead_total']:.2f} s"
+            )
+        return lines
+
+    def reset(self) -> None:
+        """
+        Elimina tutte le registrazioni
+        """
+        with self._lock:
+            self._records.clear()